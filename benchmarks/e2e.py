@@ -0,0 +1,470 @@
+"""
+End-to-end endpoint benchmark
+Drives the FastAPI app in-process through the interactive flow (start-session,
+select-*, captcha, submit-case-search, process-case-results, download-pdf)
+against a stand-in portal, normally mock_portal.py replaying a recording.
+Reports p50/p95/p99 latency per endpoint, WebDriver commands per endpoint,
+peak RSS of Python and Chrome, and lookups per minute. Each run is appended
+to a JSONL history file; compare mode flags regressions against an earlier run.
+
+Usage:
+    python -m benchmarks.e2e run --recordings recordings/ --flow benchmarks/flow.example.json
+    python -m benchmarks.e2e run --portal-url http://localhost:8001/ecourtindia_v6/ --compare
+    python -m benchmarks.e2e run --recordings recordings/ --one-shot
+    python -m benchmarks.e2e compare --baseline <commit or label>
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import process_memory
+
+HISTORY_FILE = Path(__file__).with_name("history.jsonl")
+
+# Relative increase that counts as a regression in compare mode
+DEFAULT_THRESHOLD = 0.15
+# Latency changes smaller than this are noise whatever the ratio (seconds)
+MIN_LATENCY_DELTA = 0.05
+RSS_SAMPLE_INTERVAL = 0.5
+
+# ---------------------------------------------------------------- measurement
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+class CommandCounter:
+    """Counts WebDriver commands by name by wrapping WebDriver.execute"""
+
+    def __init__(self):
+        self.by_command = {}
+        self.total = 0
+        self._lock = threading.Lock()
+        self._original = None
+
+    def install(self):
+        from selenium.webdriver.remote.webdriver import WebDriver
+        original = self._original = WebDriver.execute
+        counter = self
+
+        def execute(driver, driver_command, params=None):
+            with counter._lock:
+                counter.total += 1
+                counter.by_command[driver_command] = counter.by_command.get(driver_command, 0) + 1
+            return original(driver, driver_command, params)
+
+        WebDriver.execute = execute
+
+    def uninstall(self):
+        if self._original is not None:
+            from selenium.webdriver.remote.webdriver import WebDriver
+            WebDriver.execute = self._original
+            self._original = None
+
+def python_peak_rss():
+    """Peak RSS of this process in bytes, or None where resource is unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class RssSampler:
+    """Tracks the peak combined RSS of child processes in a background thread"""
+
+    def __init__(self, exclude=(), interval=RSS_SAMPLE_INTERVAL):
+        self.exclude = set(exclude)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="rss-sampler")
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_memory.tree_rss(pid, include_root=False, exclude=self.exclude) or 0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+class Recorder:
+    """Latency samples and WebDriver command deltas per endpoint"""
+
+    def __init__(self, client, commands):
+        self.client = client
+        self.commands = commands
+        self.latencies = {}
+        self.command_counts = {}
+        self.errors = {}
+
+    def call(self, name, method, url, **kwargs):
+        before = self.commands.total
+        started = time.perf_counter()
+        try:
+            response = self.client.request(method, url, **kwargs)
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+        except Exception as e:
+            body = {"success": False, "error": str(e)}
+        elapsed = time.perf_counter() - started
+
+        if name == "download-pdf" and "local store" in str(body.get("message", "")):
+            # Served from pdf_store without touching the portal - a different hot path
+            name = "download-pdf (stored)"
+        self.latencies.setdefault(name, []).append(elapsed)
+        self.command_counts.setdefault(name, []).append(self.commands.total - before)
+        if not body.get("success", True):
+            self.errors[name] = self.errors.get(name, 0) + 1
+            print(f"⚠️ {name}: {body.get('error')}")
+        return body
+
+    def summary(self):
+        endpoints = {}
+        for name, samples in self.latencies.items():
+            counts = self.command_counts[name]
+            endpoints[name] = {
+                "calls": len(samples),
+                "errors": self.errors.get(name, 0),
+                "p50": round(percentile(samples, 50), 4),
+                "p95": round(percentile(samples, 95), 4),
+                "p99": round(percentile(samples, 99), 4),
+                "mean": round(sum(samples) / len(samples), 4),
+                "webdriver_commands": round(sum(counts) / len(counts), 1),
+            }
+        return endpoints
+
+# ---------------------------------------------------------------- flow
+
+def solve_captcha(rec, attempts=3):
+    """Fetch and OCR a captcha, returning the recognised text or None"""
+    for _ in range(attempts):
+        captcha = rec.call("fetch-captcha", "POST", "/fetch-captcha")
+        if not captcha.get("success"):
+            continue
+        ocr = rec.call("recognize-captcha", "POST", "/recognize-captcha",
+                       data={"image_data": captcha["captcha_url"]})
+        if ocr.get("success") and ocr.get("text"):
+            return ocr["text"]
+        rec.call("refresh-captcha", "POST", "/refresh-captcha")
+    return None
+
+def run_lookup(rec, flow):
+    """One full interactive lookup. Returns True when case details were extracted."""
+    try:
+        if not rec.call("start-session", "POST", "/start-session").get("success"):
+            return False
+        rec.call("select-state", "POST", "/select-state", data={"state_value": flow["state"]})
+        rec.call("select-district", "POST", "/select-district", data={"district_value": flow["district"]})
+        rec.call("select-court", "POST", "/select-court", data={"court_value": flow["court"]})
+        rec.call("click-case-number", "POST", "/click-case-number")
+        rec.call("get-case-types", "POST", "/get-case-types")
+
+        submitted = False
+        for _ in range(flow.get("captcha_attempts", 3)):
+            answer = solve_captcha(rec) or flow.get("captcha_answer")
+            if not answer:
+                break
+            result = rec.call("submit-case-search", "POST", "/submit-case-search", data={
+                "case_type": flow["case_type"],
+                "case_number": flow["case_number"],
+                "case_year": flow["case_year"],
+                "captcha_code": answer,
+            })
+            if result.get("success"):
+                submitted = True
+                break
+            if result.get("error_type") != "invalid_captcha":
+                break
+        if not submitted:
+            return False
+
+        details = rec.call("process-case-results", "POST", "/process-case-results")
+        if not details.get("success") or not details.get("cases"):
+            return False
+
+        case = details["cases"][0]
+        for order in case.get("orders", [])[:flow.get("max_orders", 1)]:
+            rec.call("download-pdf", "GET", f"/download-pdf/{case['case_index']}/{order['order_number']}")
+        return True
+    finally:
+        rec.call("stop-session", "POST", "/stop-session")
+
+def run_one_shot_lookup(rec, flow):
+    """One lookup through the single /search endpoint. Returns True when case details were extracted."""
+    result = rec.call("search", "POST", "/search", data={
+        "state": flow["state"],
+        "district": flow["district"],
+        "court": flow["court"],
+        "case_type": flow["case_type"],
+        "case_number": flow["case_number"],
+        "case_year": flow["case_year"],
+        "use_cache": "0",
+    })
+    return bool(result.get("success") and result.get("cases"))
+
+# ---------------------------------------------------------------- runner
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_mock_portal(args):
+    """Launch mock_portal.py on a free port and wait until it answers"""
+    import requests
+
+    port = free_port()
+    command = [sys.executable, "mock_portal.py", "--recordings", args.recordings, "--port", str(port),
+               "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    stats_url = f"http://127.0.0.1:{port}/__mock__/stats"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"mock_portal.py exited with code {process.returncode}")
+        try:
+            requests.get(stats_url, timeout=1)
+            return process, f"http://127.0.0.1:{port}/ecourtindia_v6/"
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("mock_portal.py did not start within 30s")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(args):
+    with open(args.flow, encoding="utf-8") as f:
+        flow = json.load(f)
+
+    mock = None
+    if args.portal_url:
+        portal_url = args.portal_url
+    else:
+        mock, portal_url = start_mock_portal(args)
+
+    # Must be set before main (and portal/rate_limiter) are imported
+    os.environ["ECOURTS_BASE_URL"] = portal_url
+    if args.no_rate_limit:
+        for name in ("PORTAL_RATE", "PORTAL_MAX_RATE", "PORTAL_COURT_RATE", "PORTAL_COURT_MAX_RATE"):
+            os.environ[name] = "1000"
+
+    commands = CommandCounter()
+    commands.install()
+    try:
+        from fastapi.testclient import TestClient
+        import main
+
+        # The mock portal is our child too but isn't part of the app's footprint
+        with TestClient(main.app) as client, RssSampler(exclude=[mock.pid] if mock else []) as chrome_rss:
+            lookup = run_one_shot_lookup if args.one_shot else run_lookup
+            rec = Recorder(client, commands)
+            for i in range(args.warmup):
+                print(f"🔥 Warm-up lookup {i + 1}/{args.warmup}")
+                lookup(rec, flow)
+            # Warm-up samples are discarded
+            rec = Recorder(client, commands)
+            commands_before = dict(commands.by_command)
+
+            completed = 0
+            started = time.perf_counter()
+            for i in range(args.iterations):
+                print(f"⏱️ Lookup {i + 1}/{args.iterations}")
+                completed += lookup(rec, flow)
+            wall = time.perf_counter() - started
+    finally:
+        commands.uninstall()
+        if mock is not None:
+            mock.terminate()
+            mock.wait(timeout=10)
+
+    by_command = {name: count - commands_before.get(name, 0) for name, count in commands.by_command.items()
+                  if count - commands_before.get(name, 0)}
+    python_peak = python_peak_rss()
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label,
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "config": {
+            "mode": "one-shot" if args.one_shot else "interactive",
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "rate_limited": not args.no_rate_limit,
+            "portal": "mock" if mock is not None else portal_url,
+        },
+        "endpoints": rec.summary(),
+        "webdriver_commands": {"total": sum(by_command.values()), "by_command": by_command},
+        "peak_rss_mb": {
+            "python": round(python_peak / 2**20, 1) if python_peak else None,
+            "chrome": round(chrome_rss.peak / 2**20, 1),
+        },
+        "lookups": completed,
+        "lookups_per_min": round(completed / (wall / 60), 2) if wall else 0,
+        "wall_seconds": round(wall, 2),
+    }
+
+# ---------------------------------------------------------------- history
+
+def load_history(path):
+    if not Path(path).exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_history(path, result):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+def find_baseline(history, current, ref=None):
+    """The run to compare against: the latest matching ref (commit or label), else the previous run in the same mode"""
+    earlier = [entry for entry in history if entry is not current]
+    if ref:
+        matches = [entry for entry in earlier if ref in (entry.get("commit"), entry.get("label"))]
+        return matches[-1] if matches else None
+    mode = current.get("config", {}).get("mode", "interactive")
+    earlier = [entry for entry in earlier if entry.get("config", {}).get("mode", "interactive") == mode]
+    return earlier[-1] if earlier else None
+
+def _worse(before, after, threshold, higher_is_better=False, min_delta=0.0):
+    if before is None or after is None:
+        return False
+    if higher_is_better:
+        before, after = after, before
+    return after - before > min_delta and after > before * (1 + threshold)
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Print a side-by-side comparison. Returns the list of regressions found."""
+    regressions = []
+    print(f"\n📊 {baseline.get('commit') or baseline.get('label')} ({baseline['timestamp']})"
+          f" → {current.get('commit') or current.get('label')} ({current['timestamp']})")
+    print(f"{'endpoint':<24}{'p50':>16}{'p95':>16}{'p99':>16}{'cmds':>12}")
+
+    for name, after in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<24}{'(new)':>16}")
+            continue
+        cells = []
+        for key in ("p50", "p95", "p99"):
+            worse = _worse(before[key], after[key], threshold, min_delta=MIN_LATENCY_DELTA)
+            cells.append(f"{before[key]:.2f}→{after[key]:.2f}{'!' if worse else ' '}")
+            if worse:
+                regressions.append(f"{name} {key} {before[key]:.3f}s → {after[key]:.3f}s")
+        # WebDriver commands are deterministic against a replay: any increase is real
+        more_commands = after["webdriver_commands"] > before["webdriver_commands"]
+        if more_commands:
+            regressions.append(f"{name} WebDriver commands {before['webdriver_commands']} → "
+                               f"{after['webdriver_commands']}")
+        cells.append(f"{before['webdriver_commands']:g}→{after['webdriver_commands']:g}{'!' if more_commands else ' '}")
+        print(f"{name:<24}" + "".join(f"{cell:>16}" for cell in cells[:3]) + f"{cells[3]:>12}")
+
+    for process in ("python", "chrome"):
+        before, after = baseline["peak_rss_mb"].get(process), current["peak_rss_mb"].get(process)
+        print(f"peak RSS {process:<15}{before}→{after} MB")
+        if _worse(before, after, threshold):
+            regressions.append(f"peak RSS {process} {before} → {after} MB")
+
+    before, after = baseline["lookups_per_min"], current["lookups_per_min"]
+    print(f"lookups/min{'':<13}{before}→{after}")
+    if _worse(before, after, threshold, higher_is_better=True):
+        regressions.append(f"lookups/min {before} → {after}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+    else:
+        print("\n✅ No regressions")
+    return regressions
+
+def print_result(result):
+    print(f"\n{'endpoint':<24}{'calls':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'cmds':>7}")
+    for name, stats in result["endpoints"].items():
+        print(f"{name:<24}{stats['calls']:>6}{stats['errors']:>5}{stats['p50']:>9.3f}"
+              f"{stats['p95']:>9.3f}{stats['p99']:>9.3f}{stats['webdriver_commands']:>7g}")
+    print(f"\nWebDriver commands: {result['webdriver_commands']['total']}")
+    print(f"Peak RSS: python {result['peak_rss_mb']['python']} MB, chrome {result['peak_rss_mb']['chrome']} MB")
+    print(f"Lookups: {result['lookups']} in {result['wall_seconds']}s ({result['lookups_per_min']}/min)")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the case lookup endpoints")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmark and append the result to the history")
+    run_parser.add_argument("--flow", default=str(Path(__file__).with_name("flow.example.json")),
+                            help="JSON file with the location, case and orders to look up")
+    run_parser.add_argument("--recordings", default=os.environ.get("MOCK_RECORDINGS_DIR", "recordings"),
+                            help="Recording replayed by the mock portal")
+    run_parser.add_argument("--portal-url", help="Use an already running stand-in portal instead")
+    run_parser.add_argument("--iterations", type=int, default=5)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--latency-ms", type=float, default=300)
+    run_parser.add_argument("--jitter-ms", type=float, default=100)
+    run_parser.add_argument("--no-rate-limit", action="store_true",
+                            help="Raise the portal rate limits so only the app's own cost is measured")
+    run_parser.add_argument("--one-shot", action="store_true",
+                            help="Look cases up through the single /search endpoint instead of the step-wise flow")
+    run_parser.add_argument("--label", help="Name for this run in the history (e.g. a branch)")
+    run_parser.add_argument("--compare", action="store_true", help="Compare with the previous run afterwards")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    run_parser.add_argument("--history", default=str(HISTORY_FILE))
+
+    compare_parser = sub.add_parser("compare", help="Compare the latest run with an earlier one")
+    compare_parser.add_argument("--baseline", help="Commit or label of the run to compare against")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.add_argument("--history", default=str(HISTORY_FILE))
+
+    args = parser.parse_args()
+    history = load_history(args.history)
+
+    if args.command == "run":
+        current = run(args)
+        print_result(current)
+        append_history(args.history, current)
+        print(f"\n💾 Appended to {args.history}")
+        if not args.compare:
+            return 0
+    else:
+        if not history:
+            print(f"❌ No runs in {args.history}")
+            return 1
+        current = history[-1]
+
+    baseline = find_baseline(history, current, getattr(args, "baseline", None))
+    if baseline is None:
+        print("ℹ️ No earlier run to compare against")
+        return 0
+    return 1 if compare(baseline, current, args.threshold) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
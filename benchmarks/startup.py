@@ -0,0 +1,94 @@
+"""
+Cold-start benchmark for STARTUP_MODE=lazy vs eager
+Each sample is a fresh interpreter that imports main, runs the startup hooks
+and serves one request (by default a captcha OCR, which is where lazily
+loaded modules are first needed). Reports the median and worst import,
+startup and first-request times per mode and appends them to a history file.
+
+Usage:
+    python -m benchmarks.startup --samples 5
+    python -m benchmarks.startup --modes lazy --first-request /cases
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.e2e import append_history, git_commit, percentile
+
+HISTORY_FILE = Path(__file__).with_name("startup_history.jsonl")
+CAPTCHA_IMAGE = "test_captcha.png"
+
+# Runs in the child interpreter; prints one JSON line with its timings
+CHILD = r"""
+import base64, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+path = sys.argv[1]
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    if path == "/recognize-captcha":
+        with open(sys.argv[2], "rb") as f:
+            image = "data:image/png;base64," + base64.b64encode(f.read()).decode()
+        client.post(path, data={"image_data": image})
+    else:
+        client.get(path)
+    done = time.perf_counter()
+print("@@" + json.dumps({"import": imported - started, "startup": ready - imported,
+                         "first_request": done - ready}))
+"""
+
+def sample(mode, path):
+    env = dict(os.environ, STARTUP_MODE=mode)
+    output = subprocess.run([sys.executable, "-c", CHILD, path, CAPTCHA_IMAGE], env=env,
+                            capture_output=True, text=True, timeout=300).stdout
+    for line in output.splitlines():
+        if line.startswith("@@"):
+            return json.loads(line[2:])
+    raise RuntimeError(f"Startup sample in {mode} mode produced no timings:\n{output[-2000:]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import, startup and first-request time per STARTUP_MODE")
+    parser.add_argument("--modes", nargs="+", default=["lazy", "eager"])
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--first-request", default="/recognize-captcha")
+    parser.add_argument("--history", default=str(HISTORY_FILE))
+    args = parser.parse_args()
+
+    modes = {}
+    for mode in args.modes:
+        runs = []
+        for i in range(args.samples):
+            print(f"🚀 {mode} sample {i + 1}/{args.samples}")
+            runs.append(sample(mode, args.first_request))
+        modes[mode] = {
+            phase: {"p50": round(percentile(values, 50), 4), "max": round(max(values), 4)}
+            for phase in ("import", "startup", "first_request")
+            for values in [[run[phase] for run in runs]]
+        }
+
+    print(f"\n{'mode':<8}{'phase':<15}{'p50 (s)':>10}{'max (s)':>10}")
+    for mode, phases in modes.items():
+        for phase, stats in phases.items():
+            print(f"{mode:<8}{phase:<15}{stats['p50']:>10.3f}{stats['max']:>10.3f}")
+
+    append_history(args.history, {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "first_request": args.first_request,
+        "samples": args.samples,
+        "modes": modes,
+    })
+    print(f"\n💾 Appended to {args.history}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Pool of headless browsers for background work
+Each checkout gets exclusive use of one driver; broken drivers are discarded
+and replaced on the next checkout. Drivers are also recycled between
+checkouts once they grow too big (RSS of chromedriver + Chrome), collect too
+many tabs, get too old or have served too many lookups, so memory stays
+bounded in long batch runs. A checkout may ask for a higher limit than the
+pool size (fan-out searches); the extra browsers are closed when returned.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import process_memory
+
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+
+# Recycling thresholds; 0 disables a check
+MAX_RSS_MB = int(os.environ.get("BROWSER_MAX_RSS_MB", "1500"))
+MAX_TABS = int(os.environ.get("BROWSER_MAX_TABS", "4"))
+MAX_AGE = int(os.environ.get("BROWSER_MAX_AGE", "3600"))
+MAX_LOOKUPS = int(os.environ.get("BROWSER_MAX_LOOKUPS", "200"))
+
+class RecyclePolicy:
+    def __init__(self, max_rss_mb=MAX_RSS_MB, max_tabs=MAX_TABS, max_age=MAX_AGE, max_lookups=MAX_LOOKUPS):
+        self.max_rss_mb = max_rss_mb
+        self.max_tabs = max_tabs
+        self.max_age = max_age
+        self.max_lookups = max_lookups
+
+    def expired(self, info):
+        """Reason to retire a browser that needs no WebDriver round trip (checked on checkout)"""
+        if self.max_age and time.monotonic() - info.launched > self.max_age:
+            return "age"
+        return None
+
+    def check(self, driver, info):
+        """Measure a returned browser; returns the reason to recycle it, or None"""
+        info.lookups += 1
+        if self.max_lookups and info.lookups >= self.max_lookups:
+            return "lookups"
+        reason = self.expired(info)
+        if reason:
+            return reason
+        if self.max_tabs:
+            info.tabs = len(driver.window_handles)
+            if info.tabs > self.max_tabs:
+                return "tabs"
+        if self.max_rss_mb:
+            rss = process_memory.driver_rss(driver)
+            if rss is not None:
+                info.rss_mb = round(rss / 2**20, 1)
+                if info.rss_mb > self.max_rss_mb:
+                    return "rss"
+        return None
+
+class BrowserInfo:
+    """What the pool knows about one driver"""
+
+    def __init__(self):
+        self.launched = time.monotonic()
+        self.lookups = 0
+        self.tabs = None
+        self.rss_mb = None
+
+    def as_dict(self):
+        return {"age": round(time.monotonic() - self.launched), "lookups": self.lookups,
+                "tabs": self.tabs, "rss_mb": self.rss_mb}
+
+class BrowserPool:
+    def __init__(self, factory, size=POOL_SIZE, policy=None):
+        self.factory = factory
+        self.size = size
+        self.policy = policy or RecyclePolicy()
+        self._idle = []
+        self._in_use = set()
+        self._info = {}
+        self.recycled = {}
+        self._condition = threading.Condition()
+
+    def _acquire(self, timeout=None, limit=None):
+        limit = max(limit or self.size, self.size)
+        while True:
+            with self._condition:
+                while not self._idle and len(self._in_use) >= limit:
+                    if not self._condition.wait(timeout):
+                        raise TimeoutError("No browser available in pool")
+                if not self._idle:
+                    # Reserve the slot before the slow launch
+                    placeholder = object()
+                    self._in_use.add(placeholder)
+                    break
+                driver = self._idle.pop()
+                reason = self.policy.expired(self._info[driver])
+                if not reason:
+                    self._in_use.add(driver)
+                    return driver
+                self._forget(driver, reason)
+            # Too old while idle: retire it and look again
+            _quit(driver)
+
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._condition:
+                self._in_use.discard(placeholder)
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            self._in_use.discard(placeholder)
+            self._in_use.add(driver)
+            self._info[driver] = BrowserInfo()
+        print(f"🧩 Launched pooled browser ({len(self._in_use)}/{self.size} in use)")
+        return driver
+
+    def _forget(self, driver, reason):
+        """Drop a driver's bookkeeping (caller holds the condition and quits it)"""
+        info = self._info.pop(driver, None)
+        if reason:
+            self.recycled[reason] = self.recycled.get(reason, 0) + 1
+            details = info.as_dict() if info else {}
+            print(f"♻️ Recycling pooled browser ({reason}): {details}")
+
+    def _release(self, driver, broken=False, measure=True):
+        reason = None
+        if not broken and measure:
+            # Between operations: measure outside the lock, the driver is still ours
+            try:
+                reason = self.policy.check(driver, self._info[driver])
+            except Exception:
+                broken = True
+
+        with self._condition:
+            self._in_use.discard(driver)
+            # Launched above the pool size for a burst: don't keep it around
+            surplus = len(self._idle) + len(self._in_use) >= self.size
+            if broken or reason or surplus:
+                self._forget(driver, reason)
+            else:
+                self._idle.append(driver)
+            # Waiters may have different limits, so wake them all
+            self._condition.notify_all()
+
+        if broken or reason or surplus:
+            _quit(driver)
+
+    @contextmanager
+    def browser(self, timeout=None, limit=None):
+        """
+        Check out a browser; it is discarded if the block raises and recycled if it has outgrown the policy.
+        limit lets this checkout wait only until fewer than that many browsers are in use (default: the pool size).
+        """
+        driver = self._acquire(timeout, limit)
+        try:
+            yield driver
+        except Exception:
+            self._release(driver, broken=True)
+            raise
+        else:
+            self._release(driver)
+
+    def in_use(self, driver):
+        with self._condition:
+            return driver in self._in_use
+
+    def discard(self, driver, reason="crashed"):
+        """Forget a driver that was killed from outside (watchdog). Returns True if it was idle."""
+        with self._condition:
+            was_idle = driver in self._idle
+            if was_idle:
+                self._idle.remove(driver)
+            self._in_use.discard(driver)
+            if driver in self._info:
+                self._forget(driver, reason)
+            self._condition.notify_all()
+        return was_idle
+
+    def warm(self, count=None):
+        """Launch browsers up front so the first checkouts don't wait for Chrome. Returns how many are idle."""
+        drivers = []
+        try:
+            for _ in range(min(count or self.size, self.size)):
+                drivers.append(self._acquire(timeout=0))
+        except TimeoutError:
+            pass
+        finally:
+            for driver in drivers:
+                self._release(driver, measure=False)
+        return len(drivers)
+
+    def stats(self):
+        with self._condition:
+            return {"size": self.size, "idle": len(self._idle), "in_use": len(self._in_use),
+                    "recycled": dict(self.recycled),
+                    "browsers": [info.as_dict() for info in self._info.values()]}
+
+    def close_all(self):
+        """Quit idle browsers (busy ones are quit when released as broken)"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            for driver in idle:
+                self._info.pop(driver, None)
+        for driver in idle:
+            _quit(driver)
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"⚠️ Error quitting pooled browser: {str(e)}")
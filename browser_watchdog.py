@@ -0,0 +1,274 @@
+"""
+Watchdog for browser sessions
+Every tracked driver is checked every few seconds: a dead chromedriver, or a
+chromedriver whose Chrome has gone, is caught without any WebDriver call, and
+idle drivers are pinged with a cheap command under a short timeout. Dead or
+hung drivers have their process tree killed and their owner's on_dead
+callback brings up a replacement. Chrome/chromedriver processes left behind
+by crashed runs or lost drivers are reaped at startup and periodically.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import chrome_profile
+import process_memory
+
+INTERVAL = float(os.environ.get("WATCHDOG_INTERVAL", "5"))
+PING_TIMEOUT = float(os.environ.get("WATCHDOG_PING_TIMEOUT", "5"))
+# Consecutive failed pings before an idle driver counts as hung
+MAX_FAILURES = int(os.environ.get("WATCHDOG_FAILURES", "2"))
+REAP_INTERVAL = float(os.environ.get("WATCHDOG_REAP_INTERVAL", "300"))
+
+_lock = threading.Lock()
+_tracked = {}
+_thread = None
+_stats = {"checks": 0, "killed": {}, "reaped": 0}
+# Untracked chromedrivers of this process seen on the last reap (may have been mid-launch then)
+_suspects = set()
+
+class Tracked:
+    def __init__(self, driver, label, is_busy, on_dead):
+        self.driver = driver
+        self.label = label
+        self.is_busy = is_busy or (lambda: False)
+        self.on_dead = on_dead
+        self.failures = 0
+        self.pid = _service_pid(driver)
+
+def _service_pid(driver):
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return process.pid if process is not None else None
+
+def track(driver, label, is_busy=None, on_dead=None):
+    """
+    Watch a driver until it is quit. is_busy() returning True skips the ping
+    (a command would queue behind the running one); on_dead(driver, reason)
+    is called from the watchdog thread after the driver has been killed.
+    """
+    with _lock:
+        _tracked[driver] = Tracked(driver, label, is_busy, on_dead)
+
+    # Quitting normally ends the watch
+    quit_driver = driver.quit
+    def quit():
+        untrack(driver)
+        quit_driver()
+    driver.quit = quit
+
+def untrack(driver):
+    with _lock:
+        _tracked.pop(driver, None)
+
+def _processes_alive(entry):
+    """False if chromedriver has exited or no longer has a browser under it"""
+    process = getattr(entry.driver.service, "process", None)
+    if process is None or process.poll() is not None:
+        return False
+    if process_memory.available() and not process_memory.descendants(process.pid):
+        return False
+    return True
+
+def _ping(driver, timeout):
+    """A cheap round trip to the browser, abandoned after timeout seconds"""
+    outcome = {}
+    def run():
+        try:
+            driver.title
+            outcome["ok"] = True
+        except Exception as e:
+            outcome["error"] = e
+    thread = threading.Thread(target=run, daemon=True, name="watchdog-ping")
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        return "hung"
+    # Alerts and similar still prove the browser answers
+    error = outcome.get("error")
+    if error is not None and type(error).__name__ not in ("UnexpectedAlertPresentException", "NoSuchWindowException"):
+        return "unresponsive"
+    return None
+
+def check(entry):
+    """Problem with a tracked driver ("dead", "hung", "unresponsive") or None"""
+    if not _processes_alive(entry):
+        return "dead"
+    if entry.is_busy():
+        entry.failures = 0
+        return None
+    problem = _ping(entry.driver, PING_TIMEOUT)
+    if problem is None:
+        entry.failures = 0
+        return None
+    entry.failures += 1
+    return problem if entry.failures >= MAX_FAILURES else None
+
+def kill_tree(pid):
+    """Kill a process and everything below it, children first"""
+    if pid is None:
+        return
+    pids = list(reversed(process_memory.descendants(pid))) + [pid]
+    for target in pids:
+        try:
+            if sys.platform == "win32":
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(target)], capture_output=True, timeout=10)
+            else:
+                os.kill(target, signal.SIGKILL)
+        except (OSError, subprocess.SubprocessError):
+            continue
+
+def _kill(entry, reason):
+    with _lock:
+        _stats["killed"][reason] = _stats["killed"].get(reason, 0) + 1
+    print(f"🩺 {entry.label} browser {reason} - killing process tree {entry.pid}")
+    kill_tree(entry.pid)
+
+    # Let Selenium clean up (and release the Chrome profile) without blocking the watchdog
+    quitter = threading.Thread(target=_quiet_quit, args=(entry.driver,), daemon=True, name="watchdog-quit")
+    quitter.start()
+    quitter.join(10)
+
+def _quiet_quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def check_all():
+    with _lock:
+        entries = list(_tracked.values())
+        _stats["checks"] += 1
+    for entry in entries:
+        try:
+            problem = check(entry)
+        except Exception as e:
+            print(f"⚠️ Watchdog check failed for {entry.label} browser: {str(e)}")
+            continue
+        if problem is None:
+            continue
+        with _lock:
+            # Quit while we were checking: not a crash
+            if _tracked.get(entry.driver) is not entry:
+                continue
+            del _tracked[entry.driver]
+        _kill(entry, problem)
+        if entry.on_dead is not None:
+            try:
+                entry.on_dead(entry.driver, problem)
+            except Exception as e:
+                print(f"⚠️ Could not replace {entry.label} browser: {str(e)}")
+
+def _process_table():
+    """[(pid, ppid, cmdline)] for every process we can see"""
+    if process_memory.psutil is not None:
+        psutil = process_memory.psutil
+        table = []
+        for process in psutil.process_iter(["pid", "ppid", "cmdline"]):
+            info = process.info
+            table.append((info["pid"], info["ppid"], info["cmdline"] or []))
+        return table
+
+    table = []
+    if not os.path.isdir("/proc"):
+        return table
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/cmdline", "rb") as f:
+                cmdline = [part.decode(errors="replace") for part in f.read().split(b"\0") if part]
+            with open(f"/proc/{name}/stat") as f:
+                # The process name may contain spaces; fields after it are fixed
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        table.append((int(name), ppid, cmdline))
+    return table
+
+def _is_our_driver(cmdline):
+    return bool(cmdline) and os.path.basename(cmdline[0]).startswith("chromedriver") and \
+        os.path.abspath(cmdline[0]).startswith(os.getcwd())
+
+def _is_our_browser(cmdline):
+    """Main Chrome process using one of our cloned profiles (helpers carry --type=)"""
+    marker = f"--user-data-dir={chrome_profile.PROFILES_DIR}"
+    return any(arg.startswith(marker) for arg in cmdline) and not any(arg.startswith("--type=") for arg in cmdline)
+
+def reap_orphans():
+    """
+    Kill chromedriver processes from this checkout that no live driver owns
+    (their app process died, or the driver was dropped without quit()) and
+    Chrome processes on our profiles whose chromedriver is gone. Returns the count.
+    """
+    table = _process_table()
+    if not table:
+        return 0
+    by_pid = {pid: (ppid, cmdline) for pid, ppid, cmdline in table}
+    me = os.getpid()
+    with _lock:
+        owned = {entry.pid for entry in _tracked.values()}
+
+    global _suspects
+    orphans = []
+    suspects = set()
+    for pid, ppid, cmdline in table:
+        parent = by_pid.get(ppid)
+        if _is_our_driver(cmdline):
+            if ppid == me:
+                # Ours, but no tracked driver uses it any more - on two passes in a row,
+                # so a driver that is still launching isn't mistaken for a lost one
+                if pid not in owned:
+                    suspects.add(pid)
+                    if pid in _suspects:
+                        orphans.append(pid)
+            elif parent is None or ppid == 1:
+                # The app process that started it is gone
+                orphans.append(pid)
+        elif _is_our_browser(cmdline):
+            if parent is None or not _is_our_driver(parent[1]):
+                orphans.append(pid)
+
+    _suspects = suspects - set(orphans)
+    for pid in orphans:
+        kill_tree(pid)
+    if orphans:
+        with _lock:
+            _stats["reaped"] += len(orphans)
+        print(f"🧹 Reaped {len(orphans)} orphaned Chrome/chromedriver process tree(s)")
+    return len(orphans)
+
+def _loop():
+    last_reap = time.monotonic()
+    while True:
+        time.sleep(INTERVAL)
+        try:
+            check_all()
+            if time.monotonic() - last_reap >= REAP_INTERVAL:
+                last_reap = time.monotonic()
+                reap_orphans()
+        except Exception as e:
+            print(f"⚠️ Watchdog error: {str(e)}")
+
+def start():
+    """Reap leftovers from earlier runs, then watch tracked drivers in a daemon thread"""
+    global _thread
+    if _thread is not None:
+        return
+    reap_orphans()
+    _thread = threading.Thread(target=_loop, daemon=True, name="browser-watchdog")
+    _thread.start()
+    print(f"🩺 Browser watchdog started (every {INTERVAL:g}s, ping timeout {PING_TIMEOUT:g}s)")
+
+def stats():
+    with _lock:
+        return {
+            "tracked": [{"label": entry.label, "pid": entry.pid, "failures": entry.failures}
+                        for entry in _tracked.values()],
+            "checks": _stats["checks"],
+            "killed": dict(_stats["killed"]),
+            "reaped": _stats["reaped"],
+        }
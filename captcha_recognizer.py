@@ -3,24 +3,51 @@ Captcha OCR Recognition Script
 Simplified approach based on pht_tsr.py analysis
 """
 
-import cv2
-import pytesseract
-import numpy as np
 import base64
-from PIL import Image
 import io
 import os
 import sys
+import threading
 
-# Add tes_port to PATH and set tesseract command
-os.environ['PATH'] = os.path.abspath('tes_port') + os.pathsep + os.environ.get('PATH', '')
-pytesseract.tesseract_cmd = os.path.abspath('tes_port/tesseract.exe')
+import metrics
 
+_lock = threading.Lock()
+_modules = None
+
+def ocr_modules():
+    """
+    Import OpenCV, NumPy, PIL and pytesseract on first use and point pytesseract
+    at the bundled tes_port/ engine. Returns (cv2, np, Image, pytesseract).
+    """
+    global _modules
+    if _modules is None:
+        with _lock:
+            if _modules is None:
+                import cv2
+                import numpy as np
+                import pytesseract
+                from PIL import Image
+
+                # Add tes_port to PATH and set tesseract command
+                os.environ['PATH'] = os.path.abspath('tes_port') + os.pathsep + os.environ.get('PATH', '')
+                pytesseract.tesseract_cmd = os.path.abspath('tes_port/tesseract.exe')
+                _modules = (cv2, np, Image, pytesseract)
+    return _modules
+
+def warm_up():
+    """Load the OCR libraries and run Tesseract once so the first real captcha doesn't pay for it"""
+    cv2, np, Image, pytesseract = ocr_modules()
+    blank = np.full((40, 120, 3), 255, dtype=np.uint8)
+    pytesseract.image_to_string(blank)
+
+@metrics.timed("captcha_ocr")
 def recognize_captcha(image_data, method='base64'):
     """
     Simple captcha recognition using the same approach as pht_tsr.py
     """
     try:
+        cv2, np, Image, pytesseract = ocr_modules()
+        
         # Convert base64 to image file (like pht_tsr.py expects)
         if method == 'base64':
             # Remove data URL prefix if present
@@ -0,0 +1,260 @@
+"""
+Streaming bulk export of stored cases
+Cases and their acts, orders and history are written as related tables keyed
+by CNR, as CSV, JSONL or Parquet (when pyarrow is installed), optionally
+gzip-compressed. Rows are read from SQLite in batches and written as they
+arrive, so memory stays flat however many cases are exported.
+
+Usage:
+    python case_export.py --format csv --gzip --out exports/
+    python case_export.py --format parquet --court-code 1 --from 2025-08-01 --to 2025-08-31
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+
+import case_model
+import case_store
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = ("csv", "jsonl", "parquet")
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+# Rows fetched from SQLite per batch
+BATCH_SIZE = 1000
+# Rows per Parquet row group (buffered in memory before each write)
+ROW_GROUP_SIZE = 20000
+PARQUET_COMPRESSION = os.environ.get("EXPORT_PARQUET_COMPRESSION", "zstd")
+
+CASE_COLUMNS = [
+    "cnr", "state_code", "district_code", "court_code", "case_type", "filing_number", "filing_date",
+    "registration_number", "registration_date", "first_hearing_date", "next_hearing_date",
+    "next_hearing_on", "case_stage", "court_and_judge",
+]
+
+# table -> (columns, SELECT ... FROM ...); child tables are aliased t and joined to cases as c
+TABLES = {
+    "cases": (
+        CASE_COLUMNS + ["petitioner", "respondent", "created", "updated"],
+        "SELECT " + ", ".join(f"c.{column}" for column in CASE_COLUMNS) + ", "
+        "(SELECT details FROM parties p WHERE p.case_id = c.id AND p.role = 'petitioner' LIMIT 1), "
+        "(SELECT details FROM parties p WHERE p.case_id = c.id AND p.role = 'respondent' LIMIT 1), "
+        "c.created, c.updated FROM cases c"
+    ),
+    "acts": (
+        ["cnr", "act", "section"],
+        "SELECT c.cnr, t.act, t.section FROM acts t JOIN cases c ON c.id = t.case_id"
+    ),
+    "orders": (
+        ["cnr", "order_number", "order_date", "order_details", "pdf_link"],
+        "SELECT c.cnr, t.order_number, t.order_date, t.order_details, t.pdf_link "
+        "FROM orders t JOIN cases c ON c.id = t.case_id"
+    ),
+    "history": (
+        ["cnr", "judge", "business_date", "hearing_date", "purpose"],
+        "SELECT c.cnr, t.judge, t.business_date, t.hearing_date, t.purpose "
+        "FROM history t JOIN cases c ON c.id = t.case_id"
+    ),
+}
+
+def _case_filter(court_code=None, court=None, case_stage=None, hearing_from=None, hearing_to=None):
+    """WHERE clause on the cases table (as c) and its parameters"""
+    clauses = []
+    params = []
+    if court_code:
+        clauses.append("c.court_code = ?")
+        params.append(court_code)
+    if court:
+        clauses.append("c.court_and_judge LIKE ?")
+        params.append(f"%{court}%")
+    if case_stage:
+        clauses.append("c.case_stage = ?")
+        params.append(case_stage)
+    if hearing_from:
+        clauses.append("c.next_hearing_on >= ?")
+        params.append(case_model.iso_date(hearing_from) or hearing_from)
+    if hearing_to:
+        clauses.append("c.next_hearing_on <= ?")
+        params.append(case_model.iso_date(hearing_to) or hearing_to)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def iter_batches(table, filters=None, batch_size=BATCH_SIZE):
+    """Rows of one export table as lists of tuples, batch_size at a time"""
+    _, select = TABLES[table]
+    where, params = _case_filter(**(filters or {}))
+    order = " ORDER BY c.id" if table == "cases" else " ORDER BY c.id, t.id"
+    conn = case_store.open_reader()
+    try:
+        cursor = conn.execute(select + where + order, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    finally:
+        conn.close()
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def jsonl_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+                      for row in rows).encode("utf-8")
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter; bytes written are handed back to the caller by drain()"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def parquet_chunks(columns, batches, compression=PARQUET_COMPRESSION):
+    if pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = pyarrow.schema([(column, pyarrow.float64() if column in ("created", "updated") else pyarrow.string())
+                             for column in columns])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression=compression)
+    pending = []
+
+    def write_group():
+        values = list(zip(*pending))
+        writer.write_table(pyarrow.Table.from_arrays([pyarrow.array(column, type=field.type)
+                                                      for column, field in zip(values, schema)], schema=schema))
+        pending.clear()
+
+    try:
+        for rows in batches:
+            pending.extend(rows)
+            if len(pending) >= ROW_GROUP_SIZE:
+                write_group()
+                yield sink.drain()
+        if pending:
+            write_group()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export(table, fmt="csv", filters=None, compress=False, batch_size=BATCH_SIZE):
+    """
+    Byte chunks of one table in the given format, plus its file name and media type.
+    Parquet is compressed internally, so compress only applies to CSV and JSONL.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r} (expected one of {', '.join(TABLES)})")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    columns, _ = TABLES[table]
+    batches = iter_batches(table, filters, batch_size)
+    if fmt == "csv":
+        chunks = csv_chunks(columns, batches)
+    elif fmt == "jsonl":
+        chunks = jsonl_chunks(columns, batches)
+    else:
+        chunks = parquet_chunks(columns, batches)
+
+    filename = f"{table}.{fmt}"
+    media_type = MEDIA_TYPES[fmt]
+    if compress and fmt != "parquet":
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return chunks, filename, media_type
+
+def export_to_dir(out_dir, fmt="csv", filters=None, compress=False, tables=None):
+    """Write every table to out_dir (each via a temporary file). Returns {file name: bytes written}."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = {}
+    for table in tables or TABLES:
+        chunks, filename, _ = export(table, fmt, filters, compress)
+        target = out_dir / filename
+        temp = target.with_name(target.name + ".tmp")
+        size = 0
+        try:
+            with open(temp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(temp, target)
+        finally:
+            if temp.exists():
+                temp.unlink()
+        written[filename] = size
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored cases as related CSV/JSONL/Parquet tables")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--out", default="exports")
+    parser.add_argument("--gzip", action="store_true", help="Compress CSV/JSONL output")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES))
+    parser.add_argument("--court-code")
+    parser.add_argument("--court", help="Substring of the court and judge name")
+    parser.add_argument("--stage", help="Exact case stage")
+    parser.add_argument("--from", dest="hearing_from", help="Next hearing on or after this date")
+    parser.add_argument("--to", dest="hearing_to", help="Next hearing on or before this date")
+    args = parser.parse_args()
+
+    filters = {"court_code": args.court_code, "court": args.court, "case_stage": args.stage,
+               "hearing_from": args.hearing_from, "hearing_to": args.hearing_to}
+    started = time.perf_counter()
+    written = export_to_dir(args.out, args.format, filters, args.gzip, args.tables)
+    for filename, size in written.items():
+        print(f"📦 {Path(args.out) / filename}: {size / 2**20:.1f} MB")
+    print(f"✅ Export finished in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
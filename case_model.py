@@ -0,0 +1,173 @@
+"""
+Compact typed case records
+extract_case_details() returns dicts of raw strings with "Not found"
+sentinels and dates in mixed formats. Case converts such a dict once:
+sentinels become None, dates become date ordinals (as_dict() gives ISO
+strings) and strings that repeat across cases are interned.
+"""
+
+import re
+import sys
+from datetime import date, datetime
+from functools import lru_cache
+
+SENTINELS = ("", "Not found", "N/A", "NA", "-")
+
+DATE_FORMATS = ("%d %B %Y", "%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d %b %Y", "%d.%m.%Y", "%B %d %Y",
+                "%b %d %Y", "%d-%m-%y", "%d/%m/%y")
+
+_ORDINAL_SUFFIX = re.compile(r"(\d+)(st|nd|rd|th)\b", re.IGNORECASE)
+
+def clean(value):
+    """Stripped text, or None for blanks and the extractor's 'Not found' sentinels"""
+    if value is None:
+        return None
+    value = " ".join(str(value).split())
+    return None if value in SENTINELS else value
+
+def interned(value):
+    """clean() for strings that repeat across cases (judges, purposes, stages, courts, acts)"""
+    value = clean(value)
+    return None if value is None else sys.intern(value)
+
+def parse_date(value):
+    """Portal date ('18th July 2025', '07-07-2025', 'July 18, 2025') as a date ordinal, or None"""
+    if isinstance(value, int):
+        return value
+    value = clean(value)
+    return _parse_text(value) if value else None
+
+# The same few thousand dates recur across every case's history
+@lru_cache(maxsize=1 << 16)
+def _parse_text(value):
+    value = _ORDINAL_SUFFIX.sub(r"\1", value).replace(",", "")
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).toordinal()
+        except ValueError:
+            continue
+    return None
+
+@lru_cache(maxsize=1 << 16)
+def _iso(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+def iso(ordinal):
+    return None if ordinal is None else _iso(ordinal)
+
+def iso_date(value):
+    """Portal date as YYYY-MM-DD, or None"""
+    return iso(parse_date(value))
+
+def display(ordinal):
+    """Date ordinal in the portal's own DD-MM-YYYY form, or None"""
+    return None if ordinal is None else date.fromordinal(ordinal).strftime("%d-%m-%Y")
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _restore(cls, values, interned_positions):
+    """A row object from as_row() values, skipping __init__'s cleaning"""
+    record = cls.__new__(cls)
+    for position, (name, value) in enumerate(zip(cls.__slots__, values)):
+        setattr(record, name, _intern(value) if position in interned_positions else value)
+    return record
+
+class Act:
+    __slots__ = ("act", "section")
+
+    def __init__(self, act=None, section=None):
+        self.act = interned(act)
+        self.section = interned(section)
+
+    def as_dict(self):
+        return {"act": self.act, "section": self.section}
+
+class Order:
+    __slots__ = ("order_number", "order_date", "order_details", "pdf_link")
+
+    def __init__(self, order_number=None, order_date=None, order_details=None, pdf_link=None):
+        self.order_number = clean(order_number)
+        self.order_date = parse_date(order_date)
+        self.order_details = interned(order_details)
+        self.pdf_link = clean(pdf_link)
+
+    def as_dict(self):
+        return {"order_number": self.order_number, "order_date": iso(self.order_date),
+                "order_details": self.order_details, "pdf_link": self.pdf_link}
+
+class HistoryEntry:
+    __slots__ = ("judge", "business_date", "hearing_date", "purpose")
+
+    def __init__(self, judge=None, business_date=None, hearing_date=None, purpose=None):
+        self.judge = interned(judge)
+        self.business_date = parse_date(business_date)
+        self.hearing_date = parse_date(hearing_date)
+        self.purpose = interned(purpose)
+
+    def as_dict(self):
+        return {"judge": self.judge, "business_date": iso(self.business_date),
+                "hearing_date": iso(self.hearing_date), "purpose": self.purpose}
+
+class Case:
+    """One case; dates are ordinals, acts/orders/history are tuples of the classes above"""
+
+    TEXT_FIELDS = ("cnr_number", "filing_number", "registration_number", "petitioner", "respondent")
+    INTERNED_FIELDS = ("case_type", "case_stage", "court_and_judge")
+    DATE_FIELDS = ("filing_date", "registration_date", "first_hearing_date", "next_hearing_date")
+
+    __slots__ = TEXT_FIELDS + INTERNED_FIELDS + DATE_FIELDS + ("acts", "orders", "case_history")
+
+    def __init__(self, **fields):
+        for field in self.TEXT_FIELDS:
+            setattr(self, field, clean(fields.get(field)))
+        for field in self.INTERNED_FIELDS:
+            setattr(self, field, interned(fields.get(field)))
+        for field in self.DATE_FIELDS:
+            setattr(self, field, parse_date(fields.get(field)))
+        self.acts = tuple(Act(row.get("act"), row.get("section")) for row in fields.get("acts") or ())
+        self.orders = tuple(Order(row.get("order_number"), row.get("order_date"), row.get("order_details"),
+                                  row.get("pdf_link")) for row in fields.get("orders") or ())
+        self.case_history = tuple(HistoryEntry(row.get("judge"), row.get("business_date"),
+                                               row.get("hearing_date"), row.get("purpose"))
+                                  for row in fields.get("case_history") or ())
+
+    @classmethod
+    def from_dict(cls, case_data):
+        """Build from an extract_case_details() dict (or a stored record); returns None for error dicts"""
+        if not case_data or "error" in case_data:
+            return None
+        return cls(**case_data)
+
+    def as_dict(self):
+        """Plain dict with the extractor's field names, ISO dates and None for missing values"""
+        data = {field: getattr(self, field) for field in self.TEXT_FIELDS + self.INTERNED_FIELDS}
+        data.update((field, iso(getattr(self, field))) for field in self.DATE_FIELDS)
+        data["acts"] = [act.as_dict() for act in self.acts]
+        data["orders"] = [order.as_dict() for order in self.orders]
+        data["case_history"] = [entry.as_dict() for entry in self.case_history]
+        return data
+
+    def as_row(self):
+        """Compact JSON-ready form: field values in __slots__ order, ordinals for dates, lists for child rows"""
+        return [getattr(self, field) for field in self.TEXT_FIELDS + self.INTERNED_FIELDS + self.DATE_FIELDS] + [
+            [[act.act, act.section] for act in self.acts],
+            [[order.order_number, order.order_date, order.order_details, order.pdf_link] for order in self.orders],
+            [[entry.judge, entry.business_date, entry.hearing_date, entry.purpose] for entry in self.case_history],
+        ]
+
+    @classmethod
+    def from_row(cls, row):
+        """Inverse of as_row(); the values are already clean, so they are only re-interned"""
+        names = cls.TEXT_FIELDS + cls.INTERNED_FIELDS + cls.DATE_FIELDS
+        case = cls.__new__(cls)
+        for field, value in zip(names, row):
+            setattr(case, field, _intern(value) if field in cls.INTERNED_FIELDS else value)
+        acts, orders, history = row[len(names):]
+        case.acts = tuple(_restore(Act, values, (0, 1)) for values in acts)
+        case.orders = tuple(_restore(Order, values, (2,)) for values in orders)
+        case.case_history = tuple(_restore(HistoryEntry, values, (0, 3)) for values in history)
+        return case
+
+    def __repr__(self):
+        return f"Case({self.cnr_number!r})"
@@ -0,0 +1,256 @@
+"""
+SQLite persistence for extracted case records
+Normalized tables for cases, parties, acts, orders and history, upserted on CNR number
+"""
+
+import threading
+import time
+
+import case_model
+import db
+import hearing_calendar
+
+DB_PATH = db.DATA_DIR / "cases.db"
+
+CASE_FIELDS = [
+    "case_type", "filing_number", "filing_date", "registration_number",
+    "registration_date", "first_hearing_date", "next_hearing_date",
+    "case_stage", "court_and_judge",
+]
+
+_lock = threading.Lock()
+_conn = None
+
+def _db():
+    """Lazily open the database and create its tables"""
+    global _conn
+    if _conn is None:
+        _conn = db.connect(DB_PATH)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cases (
+                id INTEGER PRIMARY KEY,
+                cnr TEXT UNIQUE NOT NULL,
+                state_code TEXT,
+                district_code TEXT,
+                court_code TEXT,
+                case_type TEXT,
+                filing_number TEXT,
+                filing_date TEXT,
+                registration_number TEXT,
+                registration_date TEXT,
+                first_hearing_date TEXT,
+                next_hearing_date TEXT,
+                next_hearing_on TEXT,
+                case_stage TEXT,
+                court_and_judge TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cases_registration ON cases(registration_number);
+            CREATE INDEX IF NOT EXISTS idx_cases_court ON cases(court_code, court_and_judge);
+            CREATE INDEX IF NOT EXISTS idx_cases_next_hearing ON cases(next_hearing_on);
+
+            CREATE TABLE IF NOT EXISTS parties (
+                id INTEGER PRIMARY KEY,
+                case_id INTEGER NOT NULL REFERENCES cases(id) ON DELETE CASCADE,
+                role TEXT NOT NULL,
+                details TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_parties_case ON parties(case_id);
+
+            CREATE TABLE IF NOT EXISTS acts (
+                id INTEGER PRIMARY KEY,
+                case_id INTEGER NOT NULL REFERENCES cases(id) ON DELETE CASCADE,
+                act TEXT,
+                section TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_acts_case ON acts(case_id);
+
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY,
+                case_id INTEGER NOT NULL REFERENCES cases(id) ON DELETE CASCADE,
+                order_number TEXT,
+                order_date TEXT,
+                order_details TEXT,
+                pdf_link TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_orders_case ON orders(case_id);
+
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY,
+                case_id INTEGER NOT NULL REFERENCES cases(id) ON DELETE CASCADE,
+                judge TEXT,
+                business_date TEXT,
+                hearing_date TEXT,
+                purpose TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_case ON history(case_id);
+        """)
+    return _conn
+
+def _date_text(raw, field, ordinal):
+    """The portal's text for a date when the raw dict is at hand, else DD-MM-YYYY from the ordinal"""
+    if raw is not None:
+        return case_model.clean(raw.get(field))
+    return case_model.display(ordinal)
+
+def open_reader():
+    """A separate connection for long reads such as exports, so they don't hold the store lock (WAL allows both)"""
+    with _lock:
+        _db()
+    return db.connect(DB_PATH)
+
+def _save_one(conn, case, raw, location, now):
+    """Upsert one Case; raw is the extractor dict it was built from (None for a Case passed in directly)"""
+    if not case.cnr_number:
+        return None
+
+    values = {field: getattr(case, field) for field in CASE_FIELDS}
+    values.update((field, _date_text(raw, field, getattr(case, field))) for field in case.DATE_FIELDS)
+    conn.execute(
+        "INSERT INTO cases (cnr, state_code, district_code, court_code, case_type, filing_number, "
+        "filing_date, registration_number, registration_date, first_hearing_date, next_hearing_date, "
+        "next_hearing_on, case_stage, court_and_judge, created, updated) "
+        "VALUES (:cnr, :state, :district, :court, :case_type, :filing_number, :filing_date, "
+        ":registration_number, :registration_date, :first_hearing_date, :next_hearing_date, "
+        ":next_hearing_on, :case_stage, :court_and_judge, :now, :now) "
+        "ON CONFLICT (cnr) DO UPDATE SET "
+        "state_code = COALESCE(excluded.state_code, state_code), "
+        "district_code = COALESCE(excluded.district_code, district_code), "
+        "court_code = COALESCE(excluded.court_code, court_code), "
+        "case_type = excluded.case_type, filing_number = excluded.filing_number, "
+        "filing_date = excluded.filing_date, registration_number = excluded.registration_number, "
+        "registration_date = excluded.registration_date, first_hearing_date = excluded.first_hearing_date, "
+        "next_hearing_date = excluded.next_hearing_date, next_hearing_on = excluded.next_hearing_on, "
+        "case_stage = excluded.case_stage, court_and_judge = excluded.court_and_judge, "
+        "updated = excluded.updated",
+        dict(values, cnr=case.cnr_number, now=now, next_hearing_on=case_model.iso(case.next_hearing_date),
+             state=location.get("state"), district=location.get("district"), court=location.get("court"))
+    )
+    case_id = conn.execute("SELECT id FROM cases WHERE cnr = ?", (case.cnr_number,)).fetchone()["id"]
+
+    # Child rows are replaced wholesale - the portal always returns the full lists
+    for table in ("parties", "acts", "orders", "history"):
+        conn.execute(f"DELETE FROM {table} WHERE case_id = ?", (case_id,))
+
+    parties = [(case_id, role, getattr(case, role)) for role in ("petitioner", "respondent") if getattr(case, role)]
+    conn.executemany("INSERT INTO parties (case_id, role, details) VALUES (?, ?, ?)", parties)
+
+    conn.executemany(
+        "INSERT INTO acts (case_id, act, section) VALUES (?, ?, ?)",
+        [(case_id, act.act, act.section) for act in case.acts]
+    )
+    # Case keeps one child object per raw row, in order
+    raw_orders = (raw.get("orders") or []) if raw is not None else [None] * len(case.orders)
+    raw_history = (raw.get("case_history") or []) if raw is not None else [None] * len(case.case_history)
+    conn.executemany(
+        "INSERT INTO orders (case_id, order_number, order_date, order_details, pdf_link) VALUES (?, ?, ?, ?, ?)",
+        [(case_id, order.order_number, _date_text(raw_order, "order_date", order.order_date),
+          order.order_details, order.pdf_link) for order, raw_order in zip(case.orders, raw_orders)]
+    )
+    conn.executemany(
+        "INSERT INTO history (case_id, judge, business_date, hearing_date, purpose) VALUES (?, ?, ?, ?, ?)",
+        [(case_id, entry.judge, _date_text(raw_entry, "business_date", entry.business_date),
+          _date_text(raw_entry, "hearing_date", entry.hearing_date), entry.purpose)
+         for entry, raw_entry in zip(case.case_history, raw_history)]
+    )
+    return case.cnr_number
+
+def save_cases(cases, location=None):
+    """
+    Upsert a batch of extract_case_details() dicts (or Case objects) in one transaction.
+    Sentinels are stored as NULL. Date columns keep the portal's text; next_hearing_on
+    holds the next hearing as YYYY-MM-DD for sorting and range queries.
+    location is the selected {"state", "district", "court"} codes, if known.
+    Returns the CNR numbers that were stored (cases without a CNR are skipped).
+    """
+    location = location or {}
+    now = time.time()
+    saved = []
+    with _lock:
+        conn = _db()
+        with conn:
+            for case_data in cases:
+                if isinstance(case_data, case_model.Case):
+                    case, raw = case_data, None
+                else:
+                    case, raw = case_model.Case.from_dict(case_data), case_data
+                if case is None:
+                    continue
+                if _save_one(conn, case, raw, location, now):
+                    saved.append(case)
+
+    if saved:
+        print(f"💾 Saved {len(saved)} case(s) to database")
+        try:
+            hearing_calendar.index_cases(saved, location)
+        except Exception as e:
+            print(f"⚠️ Could not update hearing calendar: {str(e)}")
+    return [case.cnr_number for case in saved]
+
+def _case_row(row):
+    data = dict(row)
+    data.pop("id", None)
+    data["cnr_number"] = data.pop("cnr")
+    return data
+
+def get_case(cnr):
+    """Full case record with parties, acts, orders and history, or None"""
+    with _lock:
+        conn = _db()
+        row = conn.execute("SELECT * FROM cases WHERE cnr = ?", (cnr,)).fetchone()
+        if not row:
+            return None
+        case_id = row["id"]
+        parties = conn.execute("SELECT role, details FROM parties WHERE case_id = ?", (case_id,)).fetchall()
+        acts = conn.execute("SELECT act, section FROM acts WHERE case_id = ? ORDER BY id", (case_id,)).fetchall()
+        orders = conn.execute(
+            "SELECT order_number, order_date, order_details, pdf_link FROM orders WHERE case_id = ? ORDER BY id",
+            (case_id,)
+        ).fetchall()
+        history = conn.execute(
+            "SELECT judge, business_date, hearing_date, purpose FROM history WHERE case_id = ? ORDER BY id",
+            (case_id,)
+        ).fetchall()
+
+    case_data = _case_row(row)
+    for party in parties:
+        case_data[party["role"]] = party["details"]
+    case_data["acts"] = [dict(act) for act in acts]
+    case_data["orders"] = [dict(order) for order in orders]
+    case_data["case_history"] = [dict(entry) for entry in history]
+    return case_data
+
+def find_cases(registration_number=None, court_code=None, court=None, case_stage=None,
+               next_hearing_from=None, next_hearing_to=None, limit=50, offset=0):
+    """Filtered case summaries (no child rows)"""
+    clauses = []
+    params = []
+    if registration_number:
+        clauses.append("registration_number = ?")
+        params.append(registration_number)
+    if court_code:
+        clauses.append("court_code = ?")
+        params.append(court_code)
+    if court:
+        clauses.append("court_and_judge LIKE ?")
+        params.append(f"%{court}%")
+    if case_stage:
+        clauses.append("case_stage = ?")
+        params.append(case_stage)
+    if next_hearing_from:
+        clauses.append("next_hearing_on >= ?")
+        params.append(case_model.iso_date(next_hearing_from) or next_hearing_from)
+    if next_hearing_to:
+        clauses.append("next_hearing_on <= ?")
+        params.append(case_model.iso_date(next_hearing_to) or next_hearing_to)
+
+    sql = "SELECT * FROM cases"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY next_hearing_on IS NULL, next_hearing_on, cnr LIMIT ? OFFSET ?"
+    params += [limit, offset]
+
+    with _lock:
+        rows = _db().execute(sql, params).fetchall()
+    return [_case_row(row) for row in rows]
@@ -0,0 +1,315 @@
+"""
+Daily cause lists
+Cause lists are fetched per court complex and date, parsed into one row per
+listed case and indexed by CNR and case number, so "which of my cases are
+listed on date X" is a local query instead of one portal lookup per case
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+
+import db
+from case_model import iso_date
+
+DB_PATH = db.DATA_DIR / "cause_lists.db"
+
+# Courts fetched when a run doesn't name any: [{"state", "district", "court", "court_no"?}, ...]
+CONFIG_PATH = Path(os.environ.get("CAUSE_LIST_CONFIG", os.path.join(os.getcwd(), "cause_list_courts.json")))
+# Cause lists fetched at the same time (each one holds a pooled browser)
+WORKERS = int(os.environ.get("CAUSE_LIST_WORKERS", "2"))
+
+# Portal button suffixes: civil and criminal lists
+LIST_TYPES = ("civ", "cri")
+
+CNR_PATTERN = re.compile(r"\b([A-Z]{4}\d{12})\b")
+CASE_NUMBER_PATTERN = re.compile(r"([A-Za-z][A-Za-z.()\-]*)\s*/\s*(\d+)\s*/\s*(\d{4})")
+
+_lock = threading.Lock()
+_conn = None
+
+def _db():
+    """Lazily open the database and create its tables"""
+    global _conn
+    if _conn is None:
+        _conn = db.connect(DB_PATH)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cause_lists (
+                id INTEGER PRIMARY KEY,
+                state TEXT NOT NULL,
+                district TEXT NOT NULL,
+                court TEXT NOT NULL,
+                court_no TEXT NOT NULL,
+                court_name TEXT,
+                list_date TEXT NOT NULL,
+                list_type TEXT NOT NULL,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                fetched REAL NOT NULL,
+                UNIQUE (state, district, court, court_no, list_date, list_type)
+            );
+            CREATE INDEX IF NOT EXISTS idx_cause_lists_date ON cause_lists(list_date, court);
+
+            CREATE TABLE IF NOT EXISTS listings (
+                id INTEGER PRIMARY KEY,
+                list_id INTEGER NOT NULL REFERENCES cause_lists(id) ON DELETE CASCADE,
+                list_date TEXT NOT NULL,
+                sr_no INTEGER,
+                section TEXT,
+                cnr TEXT,
+                case_text TEXT,
+                case_type TEXT,
+                case_number TEXT,
+                case_year TEXT,
+                parties TEXT,
+                advocate TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_listings_list ON listings(list_id);
+            CREATE INDEX IF NOT EXISTS idx_listings_cnr ON listings(cnr, list_date);
+            CREATE INDEX IF NOT EXISTS idx_listings_case ON listings(case_number, case_year, list_date);
+            CREATE INDEX IF NOT EXISTS idx_listings_date ON listings(list_date);
+        """)
+    return _conn
+
+def portal_date(value):
+    """dd-mm-yyyy as the cause list date picker expects"""
+    list_date = iso_date(value)
+    if list_date is None:
+        raise ValueError(f"Unrecognised cause list date: {value!r}")
+    return date.fromisoformat(list_date).strftime("%d-%m-%Y")
+
+def tomorrow():
+    return (date.today() + timedelta(days=1)).isoformat()
+
+def load_config():
+    """Configured courts, or [] if there is no config file"""
+    if not CONFIG_PATH.exists():
+        return []
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def make_jobs(courts, dates, list_types=LIST_TYPES):
+    """
+    One job per court complex and date; each job fetches every list type in one browser.
+    Raises ValueError for dates that cannot be read, before any job reaches a browser.
+    """
+    list_dates = [iso_date(value) for value in dates]
+    bad_dates = [value for value, list_date in zip(dates, list_dates) if list_date is None]
+    if bad_dates:
+        raise ValueError(f"Unrecognised cause list date(s): {', '.join(map(str, bad_dates))} "
+                         "(use YYYY-MM-DD or DD-MM-YYYY)")
+    return [
+        {
+            "state": str(court["state"]),
+            "district": str(court["district"]),
+            "court": str(court["court"]),
+            "court_no": str(court["court_no"]) if court.get("court_no") else None,
+            "list_date": list_date,
+            "list_types": list(list_types),
+        }
+        for court in courts
+        for list_date in list_dates
+    ]
+
+def parse_case_number(text):
+    """Split 'R.C.S./123/2020' into (case_type, number, year)"""
+    match = CASE_NUMBER_PATTERN.search(text or "")
+    if not match:
+        return None, None, None
+    return match.group(1).strip(), match.group(2).lstrip("0") or "0", match.group(3)
+
+def parse_cause_list(html):
+    """
+    Parse the portal's cause list table into rows of
+    {"sr_no", "section", "cnr", "case_text", "case_type", "case_number", "case_year", "parties", "advocate"}
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    rows = []
+    section = None
+
+    for tr in soup.find_all("tr"):
+        cells = tr.find_all("td")
+        if not cells:
+            continue
+
+        # Section headings ("Evidence", "Arguments", ...) span the whole table
+        if len(cells) == 1 or cells[0].get("colspan"):
+            heading = cells[0].get_text(" ", strip=True)
+            if heading:
+                section = heading
+            continue
+
+        sr_no = cells[0].get_text(strip=True)
+        if len(cells) < 3 or not sr_no.isdigit():
+            continue
+
+        case_text = cells[1].get_text(" ", strip=True)
+        cnr = CNR_PATTERN.search(str(cells[1]))
+        case_type, case_number, case_year = parse_case_number(case_text)
+        rows.append({
+            "sr_no": int(sr_no),
+            "section": section,
+            "cnr": cnr.group(1) if cnr else None,
+            "case_text": case_text,
+            "case_type": case_type,
+            "case_number": case_number,
+            "case_year": case_year,
+            "parties": cells[2].get_text(" ", strip=True),
+            "advocate": cells[3].get_text(" ", strip=True) if len(cells) > 3 else None,
+        })
+    return rows
+
+def is_fetched(job, list_type):
+    """True if every court of this job already has a successfully fetched list"""
+    sql = ("SELECT COUNT(*) AS lists, SUM(error IS NOT NULL) AS failed FROM cause_lists "
+           "WHERE state = ? AND district = ? AND court = ? AND list_date = ? AND list_type = ?")
+    params = [job["state"], job["district"], job["court"], job["list_date"], list_type]
+    if job.get("court_no"):
+        sql += " AND court_no = ?"
+        params.append(job["court_no"])
+    with _lock:
+        row = _db().execute(sql, params).fetchone()
+    return row["lists"] > 0 and not row["failed"]
+
+def save_cause_list(job, court_no, court_name, list_type, rows, error=None):
+    """Replace the stored list for one court, date and list type"""
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "INSERT INTO cause_lists (state, district, court, court_no, court_name, list_date, list_type, "
+                "row_count, error, fetched) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (state, district, court, court_no, list_date, list_type) DO UPDATE SET "
+                "court_name = excluded.court_name, row_count = excluded.row_count, "
+                "error = excluded.error, fetched = excluded.fetched",
+                (job["state"], job["district"], job["court"], court_no, court_name, job["list_date"],
+                 list_type, len(rows), error, time.time())
+            )
+            list_id = conn.execute(
+                "SELECT id FROM cause_lists WHERE state = ? AND district = ? AND court = ? AND court_no = ? "
+                "AND list_date = ? AND list_type = ?",
+                (job["state"], job["district"], job["court"], court_no, job["list_date"], list_type)
+            ).fetchone()["id"]
+
+            conn.execute("DELETE FROM listings WHERE list_id = ?", (list_id,))
+            conn.executemany(
+                "INSERT INTO listings (list_id, list_date, sr_no, section, cnr, case_text, case_type, "
+                "case_number, case_year, parties, advocate) "
+                "VALUES (:list_id, :list_date, :sr_no, :section, :cnr, :case_text, :case_type, "
+                ":case_number, :case_year, :parties, :advocate)",
+                [dict(row, list_id=list_id, list_date=job["list_date"]) for row in rows]
+            )
+    return list_id
+
+def _run_job(job, fetch_fn, force):
+    list_types = [list_type for list_type in job["list_types"] if force or not is_fetched(job, list_type)]
+    if not list_types:
+        return {"job": job, "skipped": True, "lists": 0, "rows": 0}
+
+    result = fetch_fn(dict(job, list_types=list_types))
+    if not result.get("success"):
+        return {"job": job, "error": result.get("error"), "lists": 0, "rows": 0}
+
+    total_rows = 0
+    for fetched in result["lists"]:
+        rows = parse_cause_list(fetched["html"]) if fetched.get("html") else []
+        save_cause_list(job, fetched["court_no"], fetched.get("court_name"), fetched["list_type"],
+                        rows, error=fetched.get("error"))
+        total_rows += len(rows)
+    return {"job": job, "lists": len(result["lists"]), "rows": total_rows}
+
+def run_pipeline(jobs, fetch_fn, max_workers=None, force=False):
+    """
+    Fetch, parse and index cause lists for every job, at most max_workers at a time.
+    fetch_fn(job) returns {"success", "lists": [{"court_no", "court_name", "list_type", "html"|"error"}]}.
+    Lists already fetched without errors are skipped unless force is set.
+    """
+    started = time.time()
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max_workers or WORKERS) as executor:
+        futures = [executor.submit(_run_job, job, fetch_fn, force) for job in jobs]
+        for future in as_completed(futures):
+            try:
+                summaries.append(future.result())
+            except Exception as e:
+                summaries.append({"error": f"{type(e).__name__}: {str(e)}", "lists": 0, "rows": 0})
+
+    print(f"📅 Cause list run: {len(jobs)} job(s), {sum(s['rows'] for s in summaries)} row(s) "
+          f"in {time.time() - started:.1f}s")
+    return summaries
+
+def list_cause_lists(list_date=None, court=None):
+    """Fetched lists (without rows), newest date first"""
+    clauses = []
+    params = []
+    if list_date:
+        clauses.append("list_date = ?")
+        params.append(iso_date(list_date) or list_date)
+    if court:
+        clauses.append("court = ?")
+        params.append(court)
+
+    sql = "SELECT * FROM cause_lists"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY list_date DESC, court, court_no, list_type"
+
+    with _lock:
+        rows = _db().execute(sql, params).fetchall()
+    return [dict(row) for row in rows]
+
+def find_listings(list_date=None, cnrs=None, case_number=None, case_year=None, limit=200):
+    """Listed cases, matched by CNR and/or case number and year"""
+    clauses = []
+    params = []
+    if list_date:
+        clauses.append("l.list_date = ?")
+        params.append(iso_date(list_date) or list_date)
+    if cnrs:
+        clauses.append(f"l.cnr IN ({', '.join('?' * len(cnrs))})")
+        params.extend(cnrs)
+    if case_number:
+        clauses.append("l.case_number = ?")
+        params.append(str(case_number).lstrip("0") or "0")
+    if case_year:
+        clauses.append("l.case_year = ?")
+        params.append(str(case_year))
+
+    sql = ("SELECT l.list_date, l.sr_no, l.section, l.cnr, l.case_text, l.case_type, l.case_number, "
+           "l.case_year, l.parties, l.advocate, c.court, c.court_no, c.court_name, c.list_type "
+           "FROM listings l JOIN cause_lists c ON c.id = l.list_id")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY l.list_date, c.court, c.court_no, l.sr_no LIMIT ?"
+    params.append(limit)
+
+    with _lock:
+        rows = _db().execute(sql, params).fetchall()
+    return [dict(row) for row in rows]
+
+def listed_cases(list_date, cases):
+    """
+    Which of the given cases are listed on list_date.
+    cases are {"cnr", "court", "case_number", "case_year"} dicts; CNR is preferred,
+    court, case number and year are the fallback for lists that don't carry CNRs.
+    """
+    cnrs = [case["cnr"] for case in cases if case.get("cnr")]
+    listings = find_listings(list_date=list_date, cnrs=cnrs, limit=10000) if cnrs else []
+    found = {listing["cnr"] for listing in listings}
+
+    for case in cases:
+        if case.get("cnr") in found or not case.get("case_number"):
+            continue
+        listings.extend(
+            listing for listing in find_listings(list_date=list_date, case_number=case["case_number"],
+                                                 case_year=case.get("case_year"))
+            if (not case.get("cnr") or listing["cnr"] in (None, case["cnr"]))
+            and (not case.get("court") or listing["court"] == case["court"])
+        )
+    return listings
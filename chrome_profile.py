@@ -0,0 +1,197 @@
+"""
+Persistent Chrome profiles
+Each browser gets its own user data dir cloned from a template profile that
+holds a warm HTTP disk cache (portal JS, CSS, jQuery, fonts) and Chrome's
+initialised profile state. Clones use copy-on-write (reflink/clonefile)
+where the filesystem supports it; elsewhere only the small profile state is
+copied and the caches start cold, since a full copy of them costs more than
+it saves. Sessions never share cookies or storage. When a browser quits, its caches are
+harvested back into the template every CHROME_PROFILE_REFRESH seconds.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import db
+import process_memory
+
+ENABLED = os.environ.get("CHROME_PERSISTENT_PROFILE", "1") == "1"
+TEMPLATE_DIR = Path(os.environ.get("CHROME_PROFILE_TEMPLATE", db.DATA_DIR / "chrome" / "template"))
+PROFILES_DIR = Path(os.environ.get("CHROME_PROFILES_DIR", db.DATA_DIR / "chrome" / "profiles"))
+# Set to 0 to keep a hand-made template as is
+HARVEST = os.environ.get("CHROME_PROFILE_HARVEST", "1") == "1"
+# Seconds between template refreshes from finished sessions
+REFRESH = int(os.environ.get("CHROME_PROFILE_REFRESH", str(6 * 3600)))
+DISK_CACHE_BYTES = int(os.environ.get("CHROME_DISK_CACHE_MB", "200")) * 1024 * 1024
+# Clones left behind by crashed processes are removed after this long (seconds),
+# once the process that made them is gone
+STALE_AFTER = 24 * 3600
+
+# What a template keeps: caches and profile bootstrap state, never cookies or site storage
+TEMPLATE_PATHS = (
+    "Local State",
+    "Default/Preferences",
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "ShaderCache",
+    "GrShaderCache",
+)
+# Only worth cloning when the copy shares blocks with the template
+CACHE_PATHS = TEMPLATE_PATHS[2:]
+
+_lock = threading.Lock()
+
+def _clone_tree(src, dst):
+    """Copy a directory tree, sharing blocks with the source where the filesystem allows"""
+    if sys.platform.startswith("linux"):
+        command = ["cp", "-a", "--reflink=auto", str(src), str(dst)]
+    elif sys.platform == "darwin":
+        command = ["cp", "-Rc", str(src), str(dst)]
+    else:
+        command = None
+
+    if command:
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=120)
+            return
+        except (OSError, subprocess.SubprocessError):
+            shutil.rmtree(dst, ignore_errors=True)
+    shutil.copytree(src, dst)
+
+def _reflink_tree(src, dst):
+    """Copy-on-write copy of a directory tree; False where the filesystem can't share blocks"""
+    if sys.platform.startswith("linux"):
+        command = ["cp", "-a", "--reflink=always", str(src), str(dst)]
+    elif sys.platform == "darwin":
+        command = ["cp", "-Rc", str(src), str(dst)]
+    else:
+        return False
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=120)
+        return True
+    except (OSError, subprocess.SubprocessError):
+        shutil.rmtree(dst, ignore_errors=True)
+        return False
+
+def _skip_caches(directory, names):
+    relative = Path(directory).relative_to(TEMPLATE_DIR)
+    return [name for name in names if (relative / name).as_posix() in CACHE_PATHS]
+
+def clone():
+    """A fresh user data dir for one browser, seeded from the template when there is one"""
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    profile_dir = PROFILES_DIR / f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+    if TEMPLATE_DIR.exists():
+        started = time.perf_counter()
+        try:
+            if _reflink_tree(TEMPLATE_DIR, profile_dir):
+                kind = "template"
+            else:
+                shutil.copytree(TEMPLATE_DIR, profile_dir, ignore=_skip_caches)
+                kind = "template state (no copy-on-write, caches left out)"
+            print(f"🧬 Cloned Chrome profile {kind} in {(time.perf_counter() - started) * 1000:.0f} ms")
+            return profile_dir
+        except (OSError, shutil.Error) as e:
+            print(f"⚠️ Could not clone Chrome profile template: {str(e)}")
+            shutil.rmtree(profile_dir, ignore_errors=True)
+    profile_dir.mkdir()
+    return profile_dir
+
+def configure(chrome_options, profile_dir):
+    chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    chrome_options.add_argument(f"--disk-cache-size={DISK_CACHE_BYTES}")
+
+def _template_due():
+    if not HARVEST:
+        return False
+    try:
+        return time.time() - TEMPLATE_DIR.stat().st_mtime > REFRESH
+    except FileNotFoundError:
+        return True
+
+def harvest(profile_dir):
+    """Make a finished profile's caches the new template (built aside, then swapped in)"""
+    # Nothing worth keeping from a browser that never cached anything (or was already released)
+    if not (Path(profile_dir) / "Default" / "Cache").is_dir():
+        return False
+    with _lock:
+        if not _template_due():
+            return False
+        staging = TEMPLATE_DIR.with_name(f"{TEMPLATE_DIR.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            staging.mkdir(parents=True)
+            for relative in TEMPLATE_PATHS:
+                source = Path(profile_dir) / relative
+                target = staging / relative
+                if source.is_dir():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    _clone_tree(source, target)
+                elif source.is_file():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(source, target)
+
+            old = TEMPLATE_DIR.with_name(f"{TEMPLATE_DIR.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.old")
+            if TEMPLATE_DIR.exists():
+                os.replace(TEMPLATE_DIR, old)
+            os.replace(staging, TEMPLATE_DIR)
+            shutil.rmtree(old, ignore_errors=True)
+        except (OSError, shutil.Error) as e:
+            print(f"⚠️ Could not refresh Chrome profile template: {str(e)}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+    print(f"🧬 Chrome profile template refreshed from {Path(profile_dir).name}")
+    return True
+
+def release(profile_dir):
+    """Call after the browser has quit: refresh the template if due, then delete the clone"""
+    try:
+        harvest(profile_dir)
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+def _owner_alive(path):
+    """Whether the process named in a clone or staging dir ("<pid>-<id>") is still running"""
+    name = path.name
+    if path.parent != PROFILES_DIR:
+        name = name[len(TEMPLATE_DIR.name) + 1:]
+    match = re.match(r"(\d+)-", name)
+    if not match:
+        return False
+    pid = int(match.group(1))
+    if process_memory.psutil is not None:
+        return process_memory.psutil.pid_exists(pid)
+    if sys.platform == "win32":
+        # os.kill would terminate the process here; go by age alone
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def remove_stale():
+    """Delete clones (and half-built templates) left behind by processes that didn't shut down cleanly"""
+    cutoff = time.time() - STALE_AFTER
+    removed = 0
+    leftovers = list(PROFILES_DIR.iterdir()) if PROFILES_DIR.exists() else []
+    if TEMPLATE_DIR.parent.exists():
+        leftovers += [path for path in TEMPLATE_DIR.parent.glob(f"{TEMPLATE_DIR.name}.*")
+                      if path.suffix in (".tmp", ".old")]
+    for path in leftovers:
+        try:
+            if path.stat().st_mtime < cutoff and not _owner_alive(path):
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
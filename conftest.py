@@ -0,0 +1,83 @@
+"""
+Shared pytest fixtures: every local store is pointed at a fresh directory
+under tmp_path, so tests never touch ./data or ./downloads
+"""
+
+import pytest
+
+import browser_pool
+import case_store
+import cause_list
+import hearing_calendar
+import main
+import pdf_store
+import rate_limiter
+import result_cache
+import watchlist
+
+# test_ocr.py is a manual script that needs OpenCV and a Tesseract install
+collect_ignore = ["test_ocr.py"]
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits(monkeypatch):
+    """Portal rate limit buckets start full in every test"""
+    monkeypatch.setattr(rate_limiter, "_buckets", {})
+    monkeypatch.setattr(rate_limiter, "_kinds", {})
+
+@pytest.fixture
+def pdf_store_dir(tmp_path, monkeypatch):
+    """pdf_store with its index and blobs under tmp_path"""
+    monkeypatch.setattr(pdf_store, "DOWNLOADS_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(pdf_store, "STORE_DIR", tmp_path / "downloads" / "store")
+    monkeypatch.setattr(pdf_store, "INDEX_PATH", tmp_path / "pdf_store.db")
+    monkeypatch.setattr(pdf_store, "_conn", None)
+    return tmp_path
+
+@pytest.fixture
+def hearings_db(tmp_path, monkeypatch):
+    """hearing_calendar with a fresh index under tmp_path"""
+    monkeypatch.setattr(hearing_calendar, "DB_PATH", tmp_path / "hearings.db")
+    monkeypatch.setattr(hearing_calendar, "_conn", None)
+    return hearing_calendar
+
+@pytest.fixture
+def case_db(tmp_path, monkeypatch, hearings_db):
+    """case_store backed by a fresh database under tmp_path (saves also index hearings there)"""
+    monkeypatch.setattr(case_store, "DB_PATH", tmp_path / "cases.db")
+    monkeypatch.setattr(case_store, "_conn", None)
+    return case_store
+
+@pytest.fixture
+def cache_db(tmp_path, monkeypatch):
+    """result_cache with an empty memory tier and a fresh disk tier under tmp_path"""
+    monkeypatch.setattr(result_cache, "DB_PATH", tmp_path / "cache.db")
+    monkeypatch.setattr(result_cache, "_conn", None)
+    monkeypatch.setattr(result_cache, "_memory", result_cache.OrderedDict())
+    return result_cache
+
+@pytest.fixture
+def watchlist_db(tmp_path, monkeypatch, pdf_store_dir):
+    """watchlist with a fresh database, checking new orders against an empty PDF store"""
+    monkeypatch.setattr(watchlist, "DB_PATH", tmp_path / "watchlist.db")
+    monkeypatch.setattr(watchlist, "_conn", None)
+    return watchlist
+
+@pytest.fixture
+def cause_list_db(tmp_path, monkeypatch):
+    """cause_list with a fresh database under tmp_path"""
+    monkeypatch.setattr(cause_list, "DB_PATH", tmp_path / "cause_lists.db")
+    monkeypatch.setattr(cause_list, "_conn", None)
+    return cause_list
+
+class FakeDriver:
+    """Stands in for a pooled Chrome; lookups are faked at a higher level"""
+
+    def quit(self):
+        pass
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    """main.pool handing out FakeDrivers, with recycling checks off"""
+    pool = browser_pool.BrowserPool(FakeDriver, size=2, policy=browser_pool.RecyclePolicy(0, 0, 0, 0))
+    monkeypatch.setattr(main, "pool", pool)
+    return pool
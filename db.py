@@ -0,0 +1,22 @@
+"""
+SQLite helpers shared by the local stores
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+# All local databases live next to the app in ./data
+DATA_DIR = Path(os.getcwd()) / "data"
+
+def connect(path):
+    """Open a SQLite database in WAL mode, usable from worker threads"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
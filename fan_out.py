@@ -0,0 +1,145 @@
+"""
+Fan-out search of one case across many courts
+The same case type/number/year is looked up in every court complex of a
+district at once, one pooled browser per court (FAN_OUT_WORKERS at a time,
+even past BROWSER_POOL_SIZE), and the hits are merged.
+Courts with a fresh cached answer are served from the result cache, so only
+the misses reach the portal and the total time stays close to one lookup.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import result_cache
+
+# Court complexes of a district rarely change; their list is kept this long (seconds)
+COURTS_TTL = int(os.environ.get("FAN_OUT_COURTS_TTL", str(24 * 3600)))
+# Courts searched at once; browsers beyond the pool size are launched for the search and closed after it
+WORKERS = int(os.environ.get("FAN_OUT_WORKERS", "4"))
+
+_lock = threading.Lock()
+_courts = {}
+
+def cached_courts(state, district):
+    """Court complexes listed for a district within COURTS_TTL, or None"""
+    with _lock:
+        entry = _courts.get((str(state), str(district)))
+    if entry and time.time() - entry[0] < COURTS_TTL:
+        return entry[1]
+    return None
+
+def remember_courts(state, district, courts):
+    if courts:
+        with _lock:
+            _courts[(str(state), str(district))] = (time.time(), courts)
+
+def make_specs(state, district, courts, case_type, case_number, case_year):
+    """One lookup spec per court; courts are {"value", "text"} dicts or bare court values"""
+    specs = []
+    for court in courts:
+        value, name = (court["value"], court.get("text")) if isinstance(court, dict) else (court, None)
+        specs.append({"state": str(state), "district": str(district), "court": str(value),
+                      "court_name": name, "case_type": str(case_type),
+                      "case_number": str(case_number).strip(), "case_year": str(case_year).strip()})
+    return specs
+
+def from_cache(spec):
+    """A lookup result rebuilt from the result cache, or None on a miss"""
+    location = {"state": spec["state"], "district": spec["district"], "court": spec["court"]}
+    args = (location, spec["case_type"], spec["case_number"], spec["case_year"])
+    hit, results = result_cache.get_search_results(result_cache.make_key("search", *args))
+    if not hit:
+        return None
+    if results is None:
+        return {"success": False, "error": "No cases found in search results", "no_cases": True}
+    cases = result_cache.get_case_details(result_cache.make_key("details", *args))
+    if cases is None:
+        # Search results alone are not enough - the caller wants the case details
+        return None
+    return {"success": True, "results": results, "cases": cases}
+
+def _court_result(spec, result, cached, seconds=None):
+    return {
+        "court": spec["court"],
+        "court_name": spec.get("court_name"),
+        "success": bool(result.get("success")),
+        "no_cases": bool(result.get("no_cases")),
+        "cached": cached,
+        "seconds": None if seconds is None else round(seconds, 2),
+        "error": None if result.get("success") or result.get("no_cases") else result.get("error"),
+        "error_type": result.get("error_type"),
+        "total_cases": (result.get("results") or {}).get("total_cases", 0),
+        "cases": [case.as_dict() for case in result.get("cases") or []],
+    }
+
+def _timed_lookup(lookup_fn, spec):
+    started = time.perf_counter()
+    return lookup_fn(spec), time.perf_counter() - started
+
+def merge(court_results):
+    """Hits from every court, tagged with the court they came from (deduplicated by CNR)"""
+    hits = []
+    seen = set()
+    for court_result in court_results:
+        for case in court_result["cases"]:
+            cnr = case["cnr_number"]
+            if cnr:
+                if cnr in seen:
+                    continue
+                seen.add(cnr)
+            hits.append(dict(case, court=court_result["court"], court_name=court_result["court_name"]))
+    return hits
+
+def run(specs, lookup_fn, max_workers, use_cache=True, stop_on_first=False):
+    """
+    Look up every spec, at most max_workers at a time, and merge the hits.
+    lookup_fn(spec) returns a run_case_lookup() dict. With stop_on_first,
+    courts not started yet are cancelled once one court has a hit (lookups
+    already running finish in the background and still fill the cache).
+    """
+    started = time.perf_counter()
+    court_results = []
+    pending = []
+    for spec in specs:
+        cached = from_cache(spec) if use_cache else None
+        if cached is None:
+            pending.append(spec)
+        else:
+            court_results.append(_court_result(spec, cached, cached=True))
+
+    found = stop_on_first and any(court_result["cases"] for court_result in court_results)
+    if pending and not found:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending))))
+        futures = {executor.submit(_timed_lookup, lookup_fn, spec): spec for spec in pending}
+        try:
+            for future in as_completed(futures):
+                spec = futures[future]
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    result, seconds = {"success": False, "error": f"{type(e).__name__}: {str(e)}",
+                                       "error_type": "browser_error"}, None
+                court_results.append(_court_result(spec, result, cached=False, seconds=seconds))
+                if stop_on_first and court_results[-1]["cases"]:
+                    found = True
+                    break
+        finally:
+            executor.shutdown(wait=not found, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    hits = merge(court_results)
+    searched = {court_result["court"] for court_result in court_results}
+    skipped = [spec["court"] for spec in specs if spec["court"] not in searched]
+    print(f"🌐 Fan-out search: {len(specs)} court(s), {len(hits)} hit(s), "
+          f"{sum(1 for r in court_results if r['cached'])} from cache, in {elapsed:.1f}s")
+    return {
+        "success": bool(hits),
+        "hits": hits,
+        "count": len(hits),
+        "courts": sorted(court_results, key=lambda court_result: court_result["court"]),
+        "skipped": skipped,
+        "errors": [f"{r['court']}: {r['error']}" for r in court_results if r["error"]],
+        "seconds": round(elapsed, 2),
+    }
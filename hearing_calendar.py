@@ -0,0 +1,221 @@
+"""
+Hearing calendar index
+Every saved case adds its next hearing date and the hearings in its history
+(normalised to YYYY-MM-DD, with court, judge and purpose) to an indexed table,
+replacing what was there for that CNR. "What is listed in the next 14 days?"
+is then a range query on the index instead of a re-scrape of every case.
+"""
+
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+import case_model
+import db
+
+DB_PATH = db.DATA_DIR / "hearings.db"
+
+# Days shown by default, starting today
+DEFAULT_DAYS = 14
+ICAL_PRODID = "-//Court Data Fetcher//Hearing Calendar//EN"
+
+_lock = threading.Lock()
+_conn = None
+
+def _db():
+    """Lazily open the database and create its tables"""
+    global _conn
+    if _conn is None:
+        _conn = db.connect(DB_PATH)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS hearings (
+                id INTEGER PRIMARY KEY,
+                cnr TEXT NOT NULL,
+                hearing_on TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                state_code TEXT,
+                district_code TEXT,
+                court_code TEXT,
+                court_and_judge TEXT,
+                judge TEXT,
+                purpose TEXT,
+                case_type TEXT,
+                registration_number TEXT,
+                case_stage TEXT,
+                parties TEXT,
+                indexed REAL NOT NULL,
+                UNIQUE (cnr, hearing_on, kind)
+            );
+            CREATE INDEX IF NOT EXISTS idx_hearings_on ON hearings(hearing_on, court_code);
+            CREATE INDEX IF NOT EXISTS idx_hearings_cnr ON hearings(cnr);
+        """)
+    return _conn
+
+def _parties(case):
+    if case.petitioner and case.respondent:
+        return f"{case.petitioner} vs {case.respondent}"
+    return case.petitioner or case.respondent
+
+def hearings_of(case):
+    """(hearing_on, kind, judge, purpose) for a Case: its next hearing and every hearing in its history"""
+    found = {}
+    for entry in case.case_history:
+        if entry.business_date is not None:
+            found[(entry.business_date, "heard")] = (entry.judge, entry.purpose)
+        if entry.hearing_date is not None:
+            found.setdefault((entry.hearing_date, "listed"), (entry.judge, entry.purpose))
+    if case.next_hearing_date is not None:
+        # The case's own next date wins over the same date taken from its history
+        judge, purpose = found.pop((case.next_hearing_date, "listed"), (None, None))
+        found[(case.next_hearing_date, "next")] = (judge, purpose or case.case_stage)
+    return [(case_model.iso(ordinal), kind, judge, purpose) for (ordinal, kind), (judge, purpose) in found.items()]
+
+def _index_one(conn, case, location, now):
+    conn.execute("DELETE FROM hearings WHERE cnr = ?", (case.cnr_number,))
+    conn.executemany(
+        "INSERT INTO hearings (cnr, hearing_on, kind, state_code, district_code, court_code, court_and_judge, "
+        "judge, purpose, case_type, registration_number, case_stage, parties, indexed) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(case.cnr_number, hearing_on, kind, location.get("state"), location.get("district"),
+          location.get("court"), case.court_and_judge, judge, purpose, case.case_type,
+          case.registration_number, case.case_stage, _parties(case), now)
+         for hearing_on, kind, judge, purpose in hearings_of(case)]
+    )
+
+def index_cases(cases, location=None):
+    """Replace the calendar entries of each case_model.Case (called as cases are saved). Returns how many were indexed."""
+    location = location or {}
+    now = time.time()
+    indexed = 0
+    with _lock:
+        conn = _db()
+        with conn:
+            for case in cases:
+                if case.cnr_number:
+                    _index_one(conn, case, location, now)
+                    indexed += 1
+    return indexed
+
+def is_empty():
+    with _lock:
+        return _db().execute("SELECT 1 FROM hearings LIMIT 1").fetchone() is None
+
+def rebuild(store):
+    """Index every case already in the case store (store is the case_store module). Returns the count."""
+    conn = store.open_reader()
+    try:
+        rows = conn.execute("SELECT cnr, state_code, district_code, court_code FROM cases").fetchall()
+    finally:
+        conn.close()
+
+    started = time.perf_counter()
+    for row in rows:
+        case = case_model.Case.from_dict(store.get_case(row["cnr"]))
+        if case is not None:
+            index_cases([case], {"state": row["state_code"], "district": row["district_code"],
+                                 "court": row["court_code"]})
+    print(f"📆 Hearing calendar rebuilt from {len(rows)} stored case(s) in {time.perf_counter() - started:.1f}s")
+    return len(rows)
+
+def rebuild_in_background_if_empty(store):
+    """Backfill the calendar from the case store once, e.g. on first start after upgrading"""
+    if not is_empty():
+        return False
+    threading.Thread(target=rebuild, args=(store,), daemon=True, name="hearing-calendar-rebuild").start()
+    return True
+
+def _bound(value, name):
+    ordinal = case_model.parse_date(value)
+    if ordinal is None:
+        raise ValueError(f"Unrecognised '{name}' date: {value!r} (use YYYY-MM-DD or DD-MM-YYYY)")
+    return ordinal
+
+def find_hearings(date_from=None, date_to=None, court_code=None, court=None, judge=None, cnr=None,
+                  kinds=None, limit=1000):
+    """
+    Hearings between two dates (inclusive, default today + DEFAULT_DAYS), earliest first.
+    Raises ValueError for a date that cannot be read or a range that ends before it starts.
+    """
+    start = _bound(date_from, "from") if date_from else date.today().toordinal()
+    end = _bound(date_to, "to") if date_to else start + DEFAULT_DAYS
+    if end < start:
+        raise ValueError(f"'to' ({case_model.iso(end)}) is before 'from' ({case_model.iso(start)})")
+    start, end = case_model.iso(start), case_model.iso(end)
+
+    clauses = ["hearing_on BETWEEN ? AND ?"]
+    params = [start, end]
+    if court_code:
+        clauses.append("court_code = ?")
+        params.append(court_code)
+    if court:
+        clauses.append("court_and_judge LIKE ?")
+        params.append(f"%{court}%")
+    if judge:
+        clauses.append("(judge LIKE ? OR court_and_judge LIKE ?)")
+        params += [f"%{judge}%", f"%{judge}%"]
+    if cnr:
+        clauses.append("cnr = ?")
+        params.append(cnr)
+    if kinds:
+        clauses.append(f"kind IN ({', '.join('?' for _ in kinds)})")
+        params += list(kinds)
+
+    sql = ("SELECT cnr, hearing_on, kind, state_code, district_code, court_code, court_and_judge, judge, "
+           "purpose, case_type, registration_number, case_stage, parties FROM hearings WHERE "
+           + " AND ".join(clauses) + " ORDER BY hearing_on, court_and_judge, cnr LIMIT ?")
+    params.append(limit)
+
+    with _lock:
+        rows = _db().execute(sql, params).fetchall()
+    return start, end, [dict(row) for row in rows]
+
+def _ical_text(value):
+    return (str(value or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def _fold(line):
+    """Split content lines longer than 75 octets as RFC 5545 requires"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts)
+
+def to_ical(hearings, name="Court hearings"):
+    """An iCalendar feed with one all-day event per hearing"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{ICAL_PRODID}", "CALSCALE:GREGORIAN",
+             f"X-WR-CALNAME:{_ical_text(name)}"]
+    for hearing in hearings:
+        day = date.fromisoformat(hearing["hearing_on"])
+        title = " ".join(part for part in (hearing["case_type"], hearing["registration_number"]) if part)
+        summary = f"{title or hearing['cnr']}: {hearing['parties']}" if hearing["parties"] else title or hearing["cnr"]
+        details = [f"CNR: {hearing['cnr']}"]
+        for label, field in (("Court", "court_and_judge"), ("Judge", "judge"), ("Purpose", "purpose"),
+                             ("Stage", "case_stage")):
+            if hearing[field]:
+                details.append(f"{label}: {hearing[field]}")
+        uid = uuid.uuid5(uuid.NAMESPACE_URL, f"{hearing['cnr']}/{hearing['hearing_on']}/{hearing['kind']}")
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}@court-data-fetcher",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{date.fromordinal(day.toordinal() + 1).strftime('%Y%m%d')}",
+            f"SUMMARY:{_ical_text(summary)}",
+            f"DESCRIPTION:{_ical_text(chr(10).join(details))}",
+        ]
+        if hearing["court_and_judge"]:
+            lines.append(f"LOCATION:{_ical_text(hearing['court_and_judge'])}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
@@ -0,0 +1,47 @@
+"""
+Deferred imports for heavy dependencies
+A LazyObject stands in for a module or a name inside one and imports it on
+first use, so importing main.py doesn't pay for Selenium until a browser is
+needed. load() forces the import, for eager warm-up.
+"""
+
+import importlib
+import threading
+
+_lock = threading.Lock()
+
+class LazyObject:
+    """Proxy for `module` (or `module.attr`) that imports it on first attribute access or call"""
+
+    __slots__ = ("_module", "_attr", "_target")
+
+    def __init__(self, module, attr=None):
+        object.__setattr__(self, "_module", module)
+        object.__setattr__(self, "_attr", attr)
+        object.__setattr__(self, "_target", None)
+
+    def load(self):
+        target = self._target
+        if target is None:
+            with _lock:
+                target = self._target
+                if target is None:
+                    target = importlib.import_module(self._module)
+                    if self._attr:
+                        target = getattr(target, self._attr)
+                    object.__setattr__(self, "_target", target)
+        return target
+
+    @property
+    def loaded(self):
+        return self._target is not None
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attr}" if self._attr else self._module
+        return f"<LazyObject {name}{'' if self.loaded else ' (not loaded)'}>"
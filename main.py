@@ -3,226 +3,450 @@ Court Data Fetcher - Browser Automation
 Educational Assignment Project
 """
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+import time
+IMPORT_STARTED = time.perf_counter()
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 import uvicorn
-import time
 import os
 import base64
+import re
+import shutil
 import requests
 import requests
 from urllib.parse import urljoin
+import captcha_recognizer
 from captcha_recognizer import recognize_captcha
+import pdf_store
+import pdf_download
+import search_index
+import pdf_response
+import case_store
+import case_model
+import case_export
+import hearing_calendar
+import result_cache
+import browser_pool
+import watchlist
+import cause_list
+import fan_out
+import rate_limiter
+import resilience
+import metrics
+import portal
+import portal_recorder
+import chrome_profile
+import browser_watchdog
+from lazy_import import LazyObject
+
+# Selenium is imported on first use (STARTUP_MODE=eager loads it during startup)
+webdriver = LazyObject("selenium.webdriver")
+By = LazyObject("selenium.webdriver.common.by", "By")
+Service = LazyObject("selenium.webdriver.chrome.service", "Service")
+Options = LazyObject("selenium.webdriver.chrome.options", "Options")
+WebDriverWait = LazyObject("selenium.webdriver.support.ui", "WebDriverWait")
+EC = LazyObject("selenium.webdriver.support.expected_conditions")
+
+# "lazy": import heavy modules and launch browsers on first use (fastest boot)
+# "eager": load Selenium and OCR, launch pooled browsers and fill caches before serving
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "lazy").lower()
+
+# Most CNR numbers accepted by one /lookup-cnr/batch request
+CNR_BATCH_LIMIT = int(os.environ.get("CNR_BATCH_LIMIT", "100"))
+
+# Seconds spent importing this module, warming up, and serving the first request
+startup_timings = {"import": None, "warmup": None, "first_request": None, "first_request_after_start": None}
+app_started = None
 
 app = FastAPI(title="Court Data Fetcher", description="eCourts Browser Automation")
 
+# Requests being handled; the watchdog doesn't ping the session browser while any are running
+requests_in_flight = 0
+
+@app.middleware("http")
+async def count_in_flight(request: Request, call_next):
+    global requests_in_flight
+    requests_in_flight += 1
+    try:
+        return await call_next(request)
+    finally:
+        requests_in_flight -= 1
+
+@app.middleware("http")
+async def time_first_request(request: Request, call_next):
+    """Record how long the first request after boot took (lazy loads land on it)"""
+    if startup_timings["first_request"] is not None:
+        return await call_next(request)
+    started = time.perf_counter()
+    response = await call_next(request)
+    if startup_timings["first_request"] is None:
+        startup_timings["first_request"] = time.perf_counter() - started
+        startup_timings["first_request_after_start"] = time.perf_counter() - (app_started or started)
+        print(f"⏱️ First request {request.url.path} took {startup_timings['first_request'] * 1000:.0f} ms "
+              f"(STARTUP_MODE={STARTUP_MODE})")
+    return response
+
 # Templates setup
 templates = Jinja2Templates(directory="templates")
 
 # Global browser instance
 browser = None
 
+# case_model.Case objects from the last /process-case-results or /cached-lookup call (used to map case_index to CNR)
+last_case_results = []
+
+# State/district/court codes chosen in the current session
+current_selection = {"state": None, "district": None, "court": None}
+
+# Case type/number/year of the last search the portal accepted (for the result cache)
+current_search = {"case_type": None, "case_number": None, "case_year": None}
+
+# Shown by the portal instead of a results table when a search matches nothing
+NO_RECORDS_MARKERS = ("record not found", "no record found", "no records found", "no case found",
+                      "does not exist", "not exists")
+
+def launch_pooled_browser():
+    driver = create_browser()
+    browser_watchdog.track(driver, "pooled", is_busy=lambda: pool.in_use(driver), on_dead=replace_pooled_browser)
+    return driver
+
+def replace_pooled_browser(driver, reason):
+    """Watchdog callback: drop a dead pooled browser and relaunch it (off the watchdog thread) if it was sitting idle"""
+    if pool.discard(driver, reason):
+        threading.Thread(target=pool.warm, args=(pool.stats()["idle"] + 1,), daemon=True,
+                         name="pool-replace").start()
+
+# Headless browsers for background work (watchlist polls), separate from the interactive session
+pool = browser_pool.BrowserPool(launch_pooled_browser)
+
+def clear_current_search():
+    current_search.update(case_type=None, case_number=None, case_year=None)
+
+def portal_shows_no_records(browser):
+    """True only when the page carries the portal's explicit 'no records' message"""
+    try:
+        body_text = browser.find_element(By.TAG_NAME, "body").text.lower()
+    except Exception:
+        return False
+    return any(marker in body_text for marker in NO_RECORDS_MARKERS)
+
+def current_cache_key(kind):
+    """Result cache key for the search currently shown in the browser"""
+    if not all(current_search.values()):
+        return None
+    return result_cache.make_key(kind, current_selection, current_search["case_type"],
+                                 current_search["case_number"], current_search["case_year"])
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page with start session button"""
     return templates.TemplateResponse("index.html", {"request": request})
 
+@metrics.timed("browser_launch")
+def create_browser():
+    """Launch a headless Chrome configured for the eCourts portal"""
+    # Setup Chrome options with download preferences
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")  # Use new headless mode
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")  # Required for headless
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Hide automation
+    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")  # Real user agent
+    chrome_options.add_argument("--disable-web-security")  # For CORS issues
+    chrome_options.add_argument("--allow-running-insecure-content")  # For mixed content
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Hide automation
+    chrome_options.add_experimental_option('useAutomationExtension', False)  # Disable automation extension
+
+    # Configure downloads to go to our local downloads folder
+    downloads_path = os.path.join(os.getcwd(), "downloads")
+    os.makedirs(downloads_path, exist_ok=True)
+
+    prefs = {
+        "download.default_directory": downloads_path,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True,
+        "plugins.always_open_pdf_externally": False,  # Keep PDFs in Chrome viewer
+        "plugins.plugins_disabled": [],
+        "profile.default_content_settings.popups": 0
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    portal_recorder.configure(chrome_options)
+
+    # Own profile per browser, cloned from a template with a warm HTTP cache
+    profile_dir = None
+    if chrome_profile.ENABLED:
+        profile_dir = chrome_profile.clone()
+        chrome_profile.configure(chrome_options, profile_dir)
+
+    # Get correct ChromeDriver path - prioritize local driver for portability
+    def get_correct_chromedriver_path():
+        try:
+            # Determine the correct platform-specific driver path
+            import platform
+            system = platform.system()
+            machine = platform.machine()
+
+            if system == "Windows":
+                platform_str = "win64" if machine.endswith("64") else "win32"
+                executable_name = "chromedriver.exe"
+            elif system == "Darwin":  # macOS
+                platform_str = "mac-arm64" if machine == "arm64" else "mac-x64"
+                executable_name = "chromedriver"
+            else:  # Linux
+                platform_str = "linux64"
+                executable_name = "chromedriver"
+
+            # Try platform-specific local driver first
+            local_driver_path = os.path.join(os.getcwd(), f"chromedriver-{platform_str}", executable_name)
+            if os.path.exists(local_driver_path):
+                print(f"✅ Using platform-specific ChromeDriver: {local_driver_path}")
+                return local_driver_path
+
+            # Fallback to win64 driver if on Windows (legacy support)
+            if system == "Windows":
+                legacy_driver_path = os.path.join(os.getcwd(), "chromedriver-win64", "chromedriver.exe")
+                if os.path.exists(legacy_driver_path):
+                    print(f"✅ Using legacy ChromeDriver: {legacy_driver_path}")
+                    return legacy_driver_path
+
+            print("⚠️ Local ChromeDriver not found!")
+            print("📋 Please run: python setup_portable.py")
+            raise Exception("No ChromeDriver found. Run setup_portable.py to download one.")
+        except Exception as e:
+            print(f"Error getting ChromeDriver path: {e}")
+            return None
+
+    # Create browser instance with correct path
+    correct_driver_path = get_correct_chromedriver_path()
+    if not correct_driver_path:
+        raise Exception("Could not find ChromeDriver executable")
+
+    print(f"Using ChromeDriver: {correct_driver_path}")
+    service = Service(correct_driver_path)
+    try:
+        browser = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        if profile_dir is not None:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+
+    if profile_dir is not None:
+        # Every quit path (sessions, pool, shutdown) hands the profile back
+        quit_browser = browser.quit
+        def quit():
+            try:
+                quit_browser()
+            finally:
+                chrome_profile.release(profile_dir)
+        browser.quit = quit
+
+    # Hide automation indicators for headless compatibility
+    browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    
+    return browser
+
+# Selectors for the Case Status menu entry, based on actual HTML
+CASE_STATUS_SELECTORS = [
+    "//a[@id='leftPaneMenuCS']",  # Specific ID from your HTML
+    "//a[contains(@href, 'casestatus/index')]",  # Based on href
+    "//a[contains(text(), 'Case Status')]",  # Text content
+    "//li[@class='nav-item']//a[contains(text(), 'Case Status')]",  # Within nav-item
+    "#leftPaneMenuCS",  # CSS selector for ID
+    "a[href*='casestatus']",  # CSS selector for href
+    "//a[contains(@class, 'nav-link') and contains(text(), 'Case Status')]"  # Class + text
+]
+
+# Selectors for the Cause List menu entry
+CAUSE_LIST_SELECTORS = [
+    "//a[@id='leftPaneMenuCL']",
+    "//a[contains(@href, 'cause_list/index')]",
+    "//a[contains(text(), 'Cause List')]",
+    "#leftPaneMenuCL",
+    "a[href*='cause_list']"
+]
+
+def close_modal(browser):
+    """Close the portal's popup modal. Returns True if it was closed."""
+    print("🔍 Looking for modal popup to close...")
+
+    # Wait a bit for modal to appear
+    time.sleep(2)
+
+    # Try multiple selectors for the close button in modal
+    close_button_selectors = [
+        "//button[@class='btn-close']",  # Based on your HTML
+        "//button[@data-bs-dismiss='modal']",  # Bootstrap modal close
+        "//button[contains(@onclick, 'closeModel')]",  # Based on onclick function
+        "//button[@aria-label='Close']",  # Accessibility label
+        ".btn-close",  # CSS selector
+        "button[data-bs-dismiss='modal']",  # CSS selector
+        "//div[@class='modal-header']//button",  # Any button in modal header
+        "//button[contains(@class, 'btn-close')]"  # Partial class match
+    ]
+
+    modal_closed = False
+    for selector in close_button_selectors:
+        try:
+            # Check if it's a CSS selector
+            if selector.startswith('.') or (not selector.startswith('//')):
+                close_button = browser.find_element(By.CSS_SELECTOR, selector)
+                print(f"✅ Found close button with CSS selector: {selector}")
+            else:
+                close_button = browser.find_element(By.XPATH, selector)
+                print(f"✅ Found close button with XPath selector: {selector}")
+
+            print("🖱️ Clicking modal close button...")
+            browser.execute_script("arguments[0].click();", close_button)
+            time.sleep(2)
+            print("✅ Modal closed successfully!")
+            modal_closed = True
+            break
+        except Exception as e:
+            print(f"❌ Close button selector failed: {selector} - {str(e)}")
+            continue
+
+    if not modal_closed:
+        print("⚠️ Could not find modal close button, trying ESC key...")
+        try:
+            from selenium.webdriver.common.keys import Keys
+            browser.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
+            time.sleep(1)
+            print("✅ Modal closed with ESC key")
+            modal_closed = True
+        except Exception as e:
+            print(f"❌ ESC key failed: {str(e)}")
+    
+    return modal_closed
+
+def open_portal_menu(browser, menu_name, menu_selectors):
+    """
+    Load the portal home page, click a left-pane menu entry and close the popup modal.
+    Returns (menu_clicked, modal_closed).
+    """
+    print("📱 Navigating to eCourts portal...")
+    with metrics.span("portal_home"), resilience.guard("home"), rate_limiter.limited("page") as call:
+        browser.get(portal.BASE_URL)
+        call.throttled = rate_limiter.looks_throttled(browser.title + " " + browser.page_source[:2000])
+        if call.throttled:
+            raise resilience.PortalThrottled("Portal returned an overload page")
+
+    # Wait for page to load
+    time.sleep(5)
+
+    print(f"🔍 Looking for {menu_name} button...")
+    print(f"📄 Current page title: {browser.title}")
+    print(f"🌐 Current URL: {browser.current_url}")
+
+    # Debug: Check if page has loaded properly
+    try:
+        body_text = browser.find_element(By.TAG_NAME, "body").text[:200]
+        print(f"📝 Page content preview: {body_text}...")
+    except:
+        print("⚠️ Could not read page content")
+
+    case_status_button = None
+    for selector in menu_selectors:
+        try:
+            # Check if it's a CSS selector (starts with # or doesn't start with //)
+            if selector.startswith('#') or (not selector.startswith('//')):
+                case_status_button = browser.find_element(By.CSS_SELECTOR, selector)
+                print(f"✅ Found {menu_name} button with CSS selector: {selector}")
+            else:
+                case_status_button = browser.find_element(By.XPATH, selector)
+                print(f"✅ Found {menu_name} button with XPath selector: {selector}")
+            break
+        except Exception as e:
+            print(f"❌ Selector failed: {selector} - {str(e)}")
+            continue
+    
+    if not case_status_button:
+        return False, False
+    
+    print(f"🖱️ Clicking {menu_name} button...")
+    with metrics.span("menu_click"):
+        browser.execute_script("arguments[0].click();", case_status_button)
+    time.sleep(3)
+    print(f"✅ {menu_name} button clicked successfully!")
+
+    # Handle modal popup that appears after clicking the menu entry
+    modal_closed = close_modal(browser)
+    portal_recorder.capture(browser)
+    return True, modal_closed
+
+def open_case_status(browser):
+    """Open Case Status. Returns (case_status_clicked, modal_closed)."""
+    return open_portal_menu(browser, "Case Status", CASE_STATUS_SELECTORS)
+
+def open_cause_list(browser):
+    """Open Cause List. Returns (cause_list_clicked, modal_closed)."""
+    return open_portal_menu(browser, "Cause List", CAUSE_LIST_SELECTORS)
+
+def watch_session_browser(driver):
+    browser_watchdog.track(driver, "session", is_busy=lambda: requests_in_flight > 0, on_dead=restore_session)
+
+def restore_session(dead_driver, reason):
+    """Watchdog callback: drop a crashed session browser and start its replacement on a worker thread"""
+    global browser
+    if browser is not dead_driver:
+        return
+    browser = None
+    print(f"🔁 Session browser {reason}, starting a replacement...")
+    # Launching Chrome and reopening the form takes seconds; the watchdog has other browsers to check
+    threading.Thread(target=replace_session_browser, daemon=True, name="session-restore").start()
+
+def replace_session_browser():
+    """Launch a new session browser and bring it back to the selected court"""
+    global browser
+    try:
+        replacement = create_browser()
+    except Exception as e:
+        print(f"❌ Could not start a replacement session browser: {str(e)}")
+        return
+    try:
+        if all(current_selection.values()):
+            open_case_number_form(replacement, current_selection)
+        else:
+            open_case_status(replacement)
+    except Exception as e:
+        print(f"⚠️ Replacement browser could not restore the session page: {str(e)}")
+    if browser is not None:
+        # /start-session opened a new browser while this one was starting
+        replacement.quit()
+        return
+    watch_session_browser(replacement)
+    browser = replacement
+    print("✅ Session browser replaced")
+
 @app.post("/start-session")
 async def start_session():
     """Start browser session and click Case Status button"""
     global browser
     
     try:
-        print("🚀 Starting browser session...")
-        
-        # Setup Chrome options with download preferences
-        chrome_options = Options()
-        chrome_options.add_argument("--headless=new")  # Use new headless mode
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")  # Required for headless
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Hide automation
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")  # Real user agent
-        chrome_options.add_argument("--disable-web-security")  # For CORS issues
-        chrome_options.add_argument("--allow-running-insecure-content")  # For mixed content
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Hide automation
-        chrome_options.add_experimental_option('useAutomationExtension', False)  # Disable automation extension
-        
-        # Configure downloads to go to our local downloads folder
-        downloads_path = os.path.join(os.getcwd(), "downloads")
-        os.makedirs(downloads_path, exist_ok=True)
-        
-        prefs = {
-            "download.default_directory": downloads_path,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True,
-            "plugins.always_open_pdf_externally": False,  # Keep PDFs in Chrome viewer
-            "plugins.plugins_disabled": [],
-            "profile.default_content_settings.popups": 0
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        # Get correct ChromeDriver path - prioritize local driver for portability
-        def get_correct_chromedriver_path():
+        if browser:
+            # Don't leave the previous session's Chrome running
             try:
-                # Determine the correct platform-specific driver path
-                import platform
-                system = platform.system()
-                machine = platform.machine()
-                
-                if system == "Windows":
-                    platform_str = "win64" if machine.endswith("64") else "win32"
-                    executable_name = "chromedriver.exe"
-                elif system == "Darwin":  # macOS
-                    platform_str = "mac-arm64" if machine == "arm64" else "mac-x64"
-                    executable_name = "chromedriver"
-                else:  # Linux
-                    platform_str = "linux64"
-                    executable_name = "chromedriver"
-                
-                # Try platform-specific local driver first
-                local_driver_path = os.path.join(os.getcwd(), f"chromedriver-{platform_str}", executable_name)
-                if os.path.exists(local_driver_path):
-                    print(f"✅ Using platform-specific ChromeDriver: {local_driver_path}")
-                    return local_driver_path
-                
-                # Fallback to win64 driver if on Windows (legacy support)
-                if system == "Windows":
-                    legacy_driver_path = os.path.join(os.getcwd(), "chromedriver-win64", "chromedriver.exe")
-                    if os.path.exists(legacy_driver_path):
-                        print(f"✅ Using legacy ChromeDriver: {legacy_driver_path}")
-                        return legacy_driver_path
-                
-                print("⚠️ Local ChromeDriver not found!")
-                print("📋 Please run: python setup_portable.py")
-                raise Exception("No ChromeDriver found. Run setup_portable.py to download one.")
+                browser.quit()
             except Exception as e:
-                print(f"Error getting ChromeDriver path: {e}")
-                return None
-        
-        # Create browser instance with correct path
-        correct_driver_path = get_correct_chromedriver_path()
-        if not correct_driver_path:
-            raise Exception("Could not find ChromeDriver executable")
-        
-        print(f"Using ChromeDriver: {correct_driver_path}")
-        service = Service(correct_driver_path)
-        browser = webdriver.Chrome(service=service, options=chrome_options)
-        
-        # Hide automation indicators for headless compatibility
-        browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
-        print("📱 Navigating to eCourts portal...")
-        browser.get("https://services.ecourts.gov.in/ecourtindia_v6/")
-        
-        # Wait for page to load
-        time.sleep(5)
+                print(f"⚠️ Error quitting previous session browser: {str(e)}")
+            browser = None
         
-        print("🔍 Looking for Case Status button...")
-        print(f"📄 Current page title: {browser.title}")
-        print(f"🌐 Current URL: {browser.current_url}")
+        print("🚀 Starting browser session...")
+        clear_current_search()
+        browser = create_browser()
+        watch_session_browser(browser)
         
-        # Debug: Check if page has loaded properly
-        try:
-            body_text = browser.find_element(By.TAG_NAME, "body").text[:200]
-            print(f"📝 Page content preview: {body_text}...")
-        except:
-            print("⚠️ Could not read page content")
-        
-        # Try multiple selectors for Case Status button based on actual HTML
-        case_status_selectors = [
-            "//a[@id='leftPaneMenuCS']",  # Specific ID from your HTML
-            "//a[contains(@href, 'casestatus/index')]",  # Based on href
-            "//a[contains(text(), 'Case Status')]",  # Text content
-            "//li[@class='nav-item']//a[contains(text(), 'Case Status')]",  # Within nav-item
-            "#leftPaneMenuCS",  # CSS selector for ID
-            "a[href*='casestatus']",  # CSS selector for href
-            "//a[contains(@class, 'nav-link') and contains(text(), 'Case Status')]"  # Class + text
-        ]
+        case_status_clicked, modal_closed = open_case_status(browser)
         
-        case_status_button = None
-        for selector in case_status_selectors:
-            try:
-                # Check if it's a CSS selector (starts with # or doesn't start with //)
-                if selector.startswith('#') or (not selector.startswith('//')):
-                    case_status_button = browser.find_element(By.CSS_SELECTOR, selector)
-                    print(f"✅ Found Case Status button with CSS selector: {selector}")
-                else:
-                    case_status_button = browser.find_element(By.XPATH, selector)
-                    print(f"✅ Found Case Status button with XPath selector: {selector}")
-                break
-            except Exception as e:
-                print(f"❌ Selector failed: {selector} - {str(e)}")
-                continue
-        
-        if case_status_button:
-            print("🖱️ Clicking Case Status button...")
-            browser.execute_script("arguments[0].click();", case_status_button)
-            time.sleep(3)
-            print("✅ Case Status button clicked successfully!")
-            
-            # Handle modal popup that appears after clicking Case Status
-            print("🔍 Looking for modal popup to close...")
-            
-            # Wait a bit for modal to appear
-            time.sleep(2)
-            
-            # Try multiple selectors for the close button in modal
-            close_button_selectors = [
-                "//button[@class='btn-close']",  # Based on your HTML
-                "//button[@data-bs-dismiss='modal']",  # Bootstrap modal close
-                "//button[contains(@onclick, 'closeModel')]",  # Based on onclick function
-                "//button[@aria-label='Close']",  # Accessibility label
-                ".btn-close",  # CSS selector
-                "button[data-bs-dismiss='modal']",  # CSS selector
-                "//div[@class='modal-header']//button",  # Any button in modal header
-                "//button[contains(@class, 'btn-close')]"  # Partial class match
-            ]
-            
-            modal_closed = False
-            for selector in close_button_selectors:
-                try:
-                    # Check if it's a CSS selector
-                    if selector.startswith('.') or (not selector.startswith('//')):
-                        close_button = browser.find_element(By.CSS_SELECTOR, selector)
-                        print(f"✅ Found close button with CSS selector: {selector}")
-                    else:
-                        close_button = browser.find_element(By.XPATH, selector)
-                        print(f"✅ Found close button with XPath selector: {selector}")
-                    
-                    print("🖱️ Clicking modal close button...")
-                    browser.execute_script("arguments[0].click();", close_button)
-                    time.sleep(2)
-                    print("✅ Modal closed successfully!")
-                    modal_closed = True
-                    break
-                except Exception as e:
-                    print(f"❌ Close button selector failed: {selector} - {str(e)}")
-                    continue
-            
-            if not modal_closed:
-                print("⚠️ Could not find modal close button, trying ESC key...")
-                try:
-                    from selenium.webdriver.common.keys import Keys
-                    browser.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
-                    time.sleep(1)
-                    print("✅ Modal closed with ESC key")
-                    modal_closed = True
-                except Exception as e:
-                    print(f"❌ ESC key failed: {str(e)}")
-            
+        if case_status_clicked:
             current_url = browser.current_url
             page_title = browser.title
             
@@ -341,15 +565,19 @@ async def select_state(request: Request):
             })
         
         print(f"🔽 Selecting state: {state_value}")
+        current_selection.update(state=state_value, district=None, court=None)
+        clear_current_search()
         
         # Find and select state
         state_dropdown = browser.find_element(By.ID, "sess_state_code")
         from selenium.webdriver.support.ui import Select
         select = Select(state_dropdown)
-        select.select_by_value(state_value)
+        with metrics.span("select_state"), resilience.guard("dropdown"), rate_limiter.limited("dropdown"):
+            select.select_by_value(state_value)
         
         # Wait for districts to load
         time.sleep(3)
+        portal_recorder.capture(browser)
         
         # Get districts
         districts = await get_districts_internal()
@@ -390,15 +618,19 @@ async def select_district(request: Request):
             })
         
         print(f"🔽 Selecting district: {district_value}")
+        current_selection.update(district=district_value, court=None)
+        clear_current_search()
         
         # Find and select district
         district_dropdown = browser.find_element(By.ID, "sess_dist_code")
         from selenium.webdriver.support.ui import Select
         select = Select(district_dropdown)
-        select.select_by_value(district_value)
+        with metrics.span("select_district"), resilience.guard("dropdown"), rate_limiter.limited("dropdown"):
+            select.select_by_value(district_value)
         
         # Wait for court complexes to load
         time.sleep(3)
+        portal_recorder.capture(browser)
         
         # Get court complexes
         courts = await get_courts_internal()
@@ -439,15 +671,20 @@ async def select_court(request: Request):
             })
         
         print(f"🔽 Selecting court complex: {court_value}")
+        current_selection["court"] = court_value
+        clear_current_search()
         
         # Find and select court complex
         court_dropdown = browser.find_element(By.ID, "court_complex_code")
         from selenium.webdriver.support.ui import Select
         select = Select(court_dropdown)
-        select.select_by_value(court_value)
+        with metrics.span("select_court", court_value), resilience.guard("dropdown"), \
+                rate_limiter.limited("dropdown", court=court_value):
+            select.select_by_value(court_value)
         
         # Wait for selection to process
         time.sleep(2)
+        portal_recorder.capture(browser)
         
         return JSONResponse({
             "success": True,
@@ -482,11 +719,14 @@ async def click_case_number():
         )
         
         # Click the Case Number button
-        case_number_button.click()
+        with metrics.span("case_number_tab", current_selection["court"]), resilience.guard("search_form"), \
+                rate_limiter.limited("page", court=current_selection["court"]):
+            case_number_button.click()
         print("✅ Case Number tab clicked successfully")
         
         # Wait a moment for the tab to load
         time.sleep(2)
+        portal_recorder.capture(browser)
         
         return JSONResponse({
             "success": True,
@@ -549,6 +789,46 @@ async def get_case_types():
             "error": f"Failed to fetch case types: {str(e)}"
         })
 
+@metrics.timed("captcha_fetch")
+def capture_captcha(browser):
+    """Screenshot the captcha element. Returns (data_url, original_src)."""
+    # For headless mode: ensure page is fully rendered
+    browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    time.sleep(1)
+    browser.execute_script("window.scrollTo(0, 0);")
+    time.sleep(1)
+
+    # Wait for captcha image to be present and visible
+    captcha_img = WebDriverWait(browser, 15).until(
+        EC.presence_of_element_located((By.ID, "captcha_image"))
+    )
+
+    # Scroll to captcha for better capture
+    browser.execute_script("arguments[0].scrollIntoView({block: 'center'});", captcha_img)
+    time.sleep(2)  # Extra wait for image loading
+
+    # Get the captcha image source URL for debugging
+    captcha_src = captcha_img.get_attribute("src")
+    print(f"📷 Captcha image URL: {captcha_src}")
+
+    # Take a screenshot of just the captcha element
+    captcha_screenshot = captcha_img.screenshot_as_base64
+    captcha_data_url = f"data:image/png;base64,{captcha_screenshot}"
+    portal_recorder.capture(browser)
+    
+    return captcha_data_url, captcha_src
+
+@metrics.timed("captcha_refresh", court_arg="court")
+def refresh_captcha_image(browser, court=None):
+    """Click the portal's captcha refresh link and wait for the new image"""
+    refresh_button = WebDriverWait(browser, 10).until(
+        EC.element_to_be_clickable((By.XPATH, "//a[@onclick='refreshCaptcha()']"))
+    )
+    with resilience.guard("captcha"), rate_limiter.limited("captcha", court=court):
+        refresh_button.click()
+    print("✅ Captcha refresh button clicked")
+    time.sleep(3)
+
 @app.post("/fetch-captcha")
 async def fetch_captcha():
     """Fetch the captcha image by taking a screenshot of the captcha element"""
@@ -563,28 +843,7 @@ async def fetch_captcha():
     try:
         print("🖼️ Fetching captcha image from eCourts page via screenshot...")
         
-        # For headless mode: ensure page is fully rendered
-        browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(1)
-        browser.execute_script("window.scrollTo(0, 0);")
-        time.sleep(1)
-        
-        # Wait for captcha image to be present and visible
-        captcha_img = WebDriverWait(browser, 15).until(
-            EC.presence_of_element_located((By.ID, "captcha_image"))
-        )
-        
-        # Scroll to captcha for better capture
-        browser.execute_script("arguments[0].scrollIntoView({block: 'center'});", captcha_img)
-        time.sleep(2)  # Extra wait for image loading
-        
-        # Get the captcha image source URL for debugging
-        captcha_src = captcha_img.get_attribute("src")
-        print(f"📷 Captcha image URL: {captcha_src}")
-        
-        # Take a screenshot of just the captcha element
-        captcha_screenshot = captcha_img.screenshot_as_base64
-        captcha_data_url = f"data:image/png;base64,{captcha_screenshot}"
+        captcha_data_url, captcha_src = capture_captcha(browser)
         
         print("✅ Captcha image captured via screenshot")
         
@@ -627,7 +886,10 @@ async def fetch_captcha():
                 'Upgrade-Insecure-Requests': '1'
             }
             
-            response = requests.get(captcha_src, cookies=requests_cookies, headers=headers, timeout=10)
+            with resilience.guard("captcha"), rate_limiter.limited("captcha", court=current_selection["court"],
+                                      host=rate_limiter.host_of(captcha_src)) as call:
+                response = requests.get(captcha_src, cookies=requests_cookies, headers=headers, timeout=10)
+                call.throttled = rate_limiter.is_throttle_status(response.status_code)
             
             if response.status_code == 200:
                 captcha_base64 = base64.b64encode(response.content).decode('utf-8')
@@ -668,17 +930,8 @@ async def refresh_captcha():
     try:
         print("🔄 Refreshing captcha image...")
         
-        # Find and click the refresh button
-        refresh_button = WebDriverWait(browser, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//a[@onclick='refreshCaptcha()']"))
-        )
-        
-        # Click the refresh button
-        refresh_button.click()
-        print("✅ Captcha refresh button clicked")
-        
-        # Wait a moment for the new captcha to load
-        time.sleep(3)
+        # Click the refresh button and wait for the new captcha to load
+        refresh_captcha_image(browser, court=current_selection["court"])
         
         # Now capture the new captcha image via screenshot
         captcha_img = WebDriverWait(browser, 10).until(
@@ -709,6 +962,145 @@ async def refresh_captcha():
             "error": f"Failed to refresh captcha: {str(e)}"
         })
 
+def dismiss_invalid_captcha(browser):
+    """Check for the portal's Invalid Captcha message after a submit and close it. Returns True if it was shown."""
+    try:
+        # Look for the invalid captcha modal
+        invalid_captcha_selectors = [
+            "//div[contains(@class, 'alert-danger-cust') and contains(text(), 'Invalid Captcha')]",
+            "//div[@class='modal-content']//div[contains(text(), 'Invalid Captcha')]",
+            "//div[contains(text(), 'Invalid Captcha')]"
+        ]
+
+        invalid_captcha_found = False
+        for selector in invalid_captcha_selectors:
+            try:
+                captcha_error = browser.find_elements(By.XPATH, selector)
+                if captcha_error and captcha_error[0].is_displayed():
+                    print("❌ Invalid captcha detected")
+                    invalid_captcha_found = True
+                    break
+            except:
+                continue
+
+        if invalid_captcha_found:
+            # Close the error modal if it exists
+            try:
+                close_selectors = [
+                    "//button[@class='btn-close']",
+                    "//button[@data-bs-dismiss='modal']",
+                    "//button[contains(@onclick, 'closeModel')]"
+                ]
+
+                for close_selector in close_selectors:
+                    try:
+                        close_button = browser.find_element(By.XPATH, close_selector)
+                        if close_button.is_displayed():
+                            browser.execute_script("arguments[0].click();", close_button)
+                            print("🚪 Closed invalid captcha modal")
+                            time.sleep(1)
+                            break
+                    except:
+                        continue
+            except:
+                print("ℹ️ Could not close modal, continuing...")
+
+            return True
+
+    except Exception as e:
+        print(f"⚠️ Error checking for captcha validation: {str(e)}")
+    
+    return False
+
+def select_case_type(select, case_type):
+    """
+    Select a case type by its option value, or else by its label (e.g. "O.S."),
+    since the value codes differ from one court complex to the next
+    """
+    values = [option.get_attribute("value") for option in select.options]
+    if case_type in values:
+        select.select_by_value(case_type)
+        return
+
+    def normalise(text):
+        return re.sub(r"[^a-z0-9]", "", text.lower())
+
+    wanted = normalise(case_type)
+    for option in select.options:
+        label = option.text.strip()
+        if wanted and wanted in (normalise(label), normalise(re.split(r"\s+-\s+", label)[0])):
+            select.select_by_value(option.get_attribute("value"))
+            return
+    raise resilience.PermanentPortalError(f"Case type {case_type!r} is not offered by this court")
+
+@metrics.timed("submit_search", court_arg="court")
+def submit_case_form(browser, case_type, case_number, case_year, captcha_code, court=None):
+    """
+    Fill and submit the Case Number search form.
+    Returns {"success": True} or an error dict with error_type "invalid_captcha".
+    """
+    # Select case type
+    case_type_dropdown = WebDriverWait(browser, 10).until(
+        EC.presence_of_element_located((By.ID, "case_type"))
+    )
+    from selenium.webdriver.support.ui import Select
+    select_case_type(Select(case_type_dropdown), case_type)
+
+    # Fill case number
+    case_number_input = browser.find_element(By.ID, "search_case_no")
+    case_number_input.clear()
+    case_number_input.send_keys(case_number)
+
+    # Fill year
+    year_input = browser.find_element(By.ID, "rgyear")
+    year_input.clear()
+    year_input.send_keys(case_year)
+
+    # Fill captcha
+    captcha_input = browser.find_element(By.ID, "case_captcha_code")
+    captcha_input.clear()
+    captcha_input.send_keys(captcha_code)
+
+    # Click Go button with improved headless compatibility
+    with resilience.guard("search"), rate_limiter.limited("submit", court=court):
+        try:
+            go_button = browser.find_element(By.XPATH, "//button[@onclick='submitCaseNo();']")
+
+            # Scroll to button to ensure it's visible
+            browser.execute_script("arguments[0].scrollIntoView({block: 'center'});", go_button)
+            time.sleep(1)
+
+            # Wait for button to be clickable
+            go_button = WebDriverWait(browser, 10).until(
+                EC.element_to_be_clickable((By.XPATH, "//button[@onclick='submitCaseNo();']"))
+            )
+
+            # Use JavaScript click for headless reliability
+            browser.execute_script("arguments[0].click();", go_button)
+            print("✅ Go button clicked using JavaScript")
+
+        except Exception as click_error:
+            print(f"⚠️ JavaScript click failed, trying direct click: {click_error}")
+            # Fallback to direct click
+            go_button = browser.find_element(By.XPATH, "//button[@onclick='submitCaseNo();']")
+            go_button.click()
+
+    print("✅ Form submitted successfully")
+
+    # Wait for response
+    time.sleep(3)
+
+    if dismiss_invalid_captcha(browser):
+        portal_recorder.note_captcha(browser, captcha_code, accepted=False)
+        return {
+            "success": False,
+            "error": "Invalid captcha. Please try again.",
+            "error_type": "invalid_captcha"
+        }
+    
+    portal_recorder.note_captcha(browser, captcha_code, accepted=True)
+    return {"success": True}
+
 @app.post("/submit-case-search")
 async def submit_case_search(request: Request):
     """Submit the case search form with case type, case number, year and captcha"""
@@ -735,108 +1127,14 @@ async def submit_case_search(request: Request):
             })
         
         print(f"📝 Submitting case search: Type={case_type}, Number={case_number}, Year={case_year}, Captcha={captcha_code}")
+        # Whatever was shown before no longer belongs to a known search
+        clear_current_search()
         
-        # Select case type
-        case_type_dropdown = WebDriverWait(browser, 10).until(
-            EC.presence_of_element_located((By.ID, "case_type"))
-        )
-        from selenium.webdriver.support.ui import Select
-        select = Select(case_type_dropdown)
-        select.select_by_value(case_type)
-        
-        # Fill case number
-        case_number_input = browser.find_element(By.ID, "search_case_no")
-        case_number_input.clear()
-        case_number_input.send_keys(case_number)
-        
-        # Fill year
-        year_input = browser.find_element(By.ID, "rgyear")
-        year_input.clear()
-        year_input.send_keys(case_year)
-        
-        # Fill captcha
-        captcha_input = browser.find_element(By.ID, "case_captcha_code")
-        captcha_input.clear()
-        captcha_input.send_keys(captcha_code)
-        
-        # Click Go button with improved headless compatibility
-        try:
-            go_button = browser.find_element(By.XPATH, "//button[@onclick='submitCaseNo();']")
-            
-            # Scroll to button to ensure it's visible
-            browser.execute_script("arguments[0].scrollIntoView({block: 'center'});", go_button)
-            time.sleep(1)
-            
-            # Wait for button to be clickable
-            go_button = WebDriverWait(browser, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[@onclick='submitCaseNo();']"))
-            )
-            
-            # Use JavaScript click for headless reliability
-            browser.execute_script("arguments[0].click();", go_button)
-            print("✅ Go button clicked using JavaScript")
-            
-        except Exception as click_error:
-            print(f"⚠️ JavaScript click failed, trying direct click: {click_error}")
-            # Fallback to direct click
-            go_button = browser.find_element(By.XPATH, "//button[@onclick='submitCaseNo();']")
-            go_button.click()
-        
-        print("✅ Form submitted successfully")
-        
-        # Wait for response
-        time.sleep(3)
-        
-        # Check for invalid captcha modal
-        try:
-            # Look for the invalid captcha modal
-            invalid_captcha_selectors = [
-                "//div[contains(@class, 'alert-danger-cust') and contains(text(), 'Invalid Captcha')]",
-                "//div[@class='modal-content']//div[contains(text(), 'Invalid Captcha')]",
-                "//div[contains(text(), 'Invalid Captcha')]"
-            ]
-            
-            invalid_captcha_found = False
-            for selector in invalid_captcha_selectors:
-                try:
-                    captcha_error = browser.find_elements(By.XPATH, selector)
-                    if captcha_error and captcha_error[0].is_displayed():
-                        print("❌ Invalid captcha detected")
-                        invalid_captcha_found = True
-                        break
-                except:
-                    continue
-            
-            if invalid_captcha_found:
-                # Close the error modal if it exists
-                try:
-                    close_selectors = [
-                        "//button[@class='btn-close']",
-                        "//button[@data-bs-dismiss='modal']",
-                        "//button[contains(@onclick, 'closeModel')]"
-                    ]
-                    
-                    for close_selector in close_selectors:
-                        try:
-                            close_button = browser.find_element(By.XPATH, close_selector)
-                            if close_button.is_displayed():
-                                browser.execute_script("arguments[0].click();", close_button)
-                                print("🚪 Closed invalid captcha modal")
-                                time.sleep(1)
-                                break
-                        except:
-                            continue
-                except:
-                    print("ℹ️ Could not close modal, continuing...")
-                
-                return JSONResponse({
-                    "success": False,
-                    "error": "Invalid captcha. Please try again.",
-                    "error_type": "invalid_captcha"
-                })
-        
-        except Exception as e:
-            print(f"⚠️ Error checking for captcha validation: {str(e)}")
+        result = submit_case_form(browser, case_type, case_number, case_year, captcha_code,
+                                  court=current_selection["court"])
+        if not result["success"]:
+            return JSONResponse(result)
+        current_search.update(case_type=case_type, case_number=case_number, case_year=case_year)
         
         return JSONResponse({
             "success": True,
@@ -850,6 +1148,79 @@ async def submit_case_search(request: Request):
             "error": f"Failed to submit form: {str(e)}"
         })
 
+@metrics.timed("parse_results")
+def parse_search_results(browser):
+    """
+    Parse the search results table on the current page.
+    Returns {"court_info", "total_cases", "cases"}, or None if no results page is shown.
+    """
+    print("🔍 Extracting case search results from current page...")
+
+    # Wait a moment for page to fully load
+    time.sleep(2)
+
+    # Check if results are available
+    page_source = browser.page_source
+
+    # Look for the results table or error messages
+    if "Total number of cases" not in page_source and "dispTable" not in page_source:
+        return None
+
+    results = {
+        "court_info": "",
+        "total_cases": 0,
+        "cases": []
+    }
+
+    # Extract court information and total cases
+    try:
+        court_info_element = browser.find_element(By.XPATH, "//h3[@class='h2class']")
+        results["court_info"] = court_info_element.text.strip()
+        print(f"✅ Court Info: {results['court_info']}")
+    except:
+        results["court_info"] = "Court information not found"
+
+    try:
+        total_cases_element = browser.find_element(By.XPATH, "//h4[@class='h2class']")
+        total_cases_text = total_cases_element.text.strip()
+        # Extract number from text like "Total number of cases : 1"
+        import re
+        match = re.search(r'Total number of cases\s*:\s*(\d+)', total_cases_text)
+        if match:
+            results["total_cases"] = int(match.group(1))
+        print(f"✅ Total Cases: {results['total_cases']}")
+    except:
+        results["total_cases"] = 0
+
+    # Extract case details from table
+    try:
+        # Look for table rows with case data
+        case_rows = browser.find_elements(By.XPATH, "//table[@id='dispTable']//tbody//tr[td[2]]")
+
+        for i, row in enumerate(case_rows):
+            try:
+                # Skip header rows or court name rows
+                cells = row.find_elements(By.TAG_NAME, "td")
+                if len(cells) >= 3:
+                    # Check if this is a data row (has sr number)
+                    sr_no_text = cells[0].text.strip()
+                    if sr_no_text.isdigit():
+                        case_data = {
+                            "sr_no": int(sr_no_text),
+                            "case_type_number": cells[1].text.strip(),
+                            "parties": cells[2].text.strip().replace('\n', ' ')
+                        }
+                        results["cases"].append(case_data)
+                        print(f"✅ Case {case_data['sr_no']}: {case_data['case_type_number']}")
+            except Exception as e:
+                print(f"⚠️ Error processing row {i}: {str(e)}")
+                continue
+
+    except Exception as e:
+        print(f"❌ Error extracting case table: {str(e)}")
+    
+    return results
+
 @app.post("/get-search-results")
 async def get_search_results():
     """Get case search results preview from the current page"""
@@ -862,80 +1233,26 @@ async def get_search_results():
                 "error": "Browser session not active"
             })
         
-        print("🔍 Extracting case search results from current page...")
-        
-        # Wait a moment for page to fully load
-        time.sleep(2)
-        
-        # Check if results are available
-        page_source = browser.page_source
-        
-        # Look for the results table or error messages
-        if "Total number of cases" not in page_source and "dispTable" not in page_source:
-            return JSONResponse({
-                "success": False,
-                "error": "No case search results found on current page"
-            })
-        
-        results = {
-            "court_info": "",
-            "total_cases": 0,
-            "cases": []
-        }
-        
-        # Extract court information and total cases
-        try:
-            court_info_element = browser.find_element(By.XPATH, "//h3[@class='h2class']")
-            results["court_info"] = court_info_element.text.strip()
-            print(f"✅ Court Info: {results['court_info']}")
-        except:
-            results["court_info"] = "Court information not found"
-        
-        try:
-            total_cases_element = browser.find_element(By.XPATH, "//h4[@class='h2class']")
-            total_cases_text = total_cases_element.text.strip()
-            # Extract number from text like "Total number of cases : 1"
-            import re
-            match = re.search(r'Total number of cases\s*:\s*(\d+)', total_cases_text)
-            if match:
-                results["total_cases"] = int(match.group(1))
-            print(f"✅ Total Cases: {results['total_cases']}")
-        except:
-            results["total_cases"] = 0
-        
-        # Extract case details from table
-        try:
-            # Look for table rows with case data
-            case_rows = browser.find_elements(By.XPATH, "//table[@id='dispTable']//tbody//tr[td[2]]")
-            
-            for i, row in enumerate(case_rows):
-                try:
-                    # Skip header rows or court name rows
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    if len(cells) >= 3:
-                        # Check if this is a data row (has sr number)
-                        sr_no_text = cells[0].text.strip()
-                        if sr_no_text.isdigit():
-                            case_data = {
-                                "sr_no": int(sr_no_text),
-                                "case_type_number": cells[1].text.strip(),
-                                "parties": cells[2].text.strip().replace('\n', ' ')
-                            }
-                            results["cases"].append(case_data)
-                            print(f"✅ Case {case_data['sr_no']}: {case_data['case_type_number']}")
-                except Exception as e:
-                    print(f"⚠️ Error processing row {i}: {str(e)}")
-                    continue
-        
-        except Exception as e:
-            print(f"❌ Error extracting case table: {str(e)}")
-        
-        if results["cases"]:
+        results = parse_search_results(browser)
+        cache_key = current_cache_key("search")
+        if results and results["cases"]:
             print(f"✅ Successfully extracted {len(results['cases'])} case(s)")
+            if cache_key:
+                result_cache.put_search_results(cache_key, results)
             return JSONResponse({
                 "success": True,
                 "results": results
             })
+        
+        # Only the portal's own "no records" answer to an accepted search is worth remembering;
+        # a half-loaded page or a failed submit must not hide a case that exists
+        if cache_key and portal_shows_no_records(browser):
+            result_cache.put_search_results(cache_key, None)
+        if results is None:
+            return JSONResponse({
+                "success": False,
+                "error": "No case search results found on current page"
+            })
         else:
             return JSONResponse({
                 "success": False,
@@ -1002,6 +1319,60 @@ async def recognize_captcha_endpoint(request: Request):
             "confidence": 0
         })
 
+@app.post("/cached-lookup")
+async def cached_lookup(request: Request):
+    """
+    Answer a case lookup from the result cache, before any captcha is fetched or solved.
+    Uses the court selected in the session unless state/district/court are given.
+    """
+    global last_case_results
+    
+    form_data = await request.form()
+    case_type = form_data.get("case_type")
+    case_number = form_data.get("case_number")
+    case_year = form_data.get("case_year")
+    
+    if not all([case_type, case_number, case_year]):
+        return JSONResponse({
+            "success": False,
+            "cached": False,
+            "error": "Case type, case number and year are required"
+        })
+    
+    location = {
+        "state": form_data.get("state") or current_selection["state"],
+        "district": form_data.get("district") or current_selection["district"],
+        "court": form_data.get("court") or current_selection["court"]
+    }
+    
+    hit, results = result_cache.get_search_results(
+        result_cache.make_key("search", location, case_type, case_number, case_year)
+    )
+    if not hit:
+        return JSONResponse({"success": False, "cached": False, "message": "Not in cache"})
+    
+    if results is None:
+        print(f"🗃️ Cache hit (negative): {case_type}/{case_number}/{case_year}")
+        return JSONResponse({
+            "success": False,
+            "cached": True,
+            "error": "No cases found in search results (cached)"
+        })
+    
+    cases = result_cache.get_case_details(
+        result_cache.make_key("details", location, case_type, case_number, case_year)
+    )
+    if cases:
+        last_case_results = cases
+    
+    print(f"🗃️ Cache hit: {case_type}/{case_number}/{case_year} ({'with' if cases else 'without'} details)")
+    return JSONResponse({
+        "success": True,
+        "cached": True,
+        "results": results,
+        "cases": case_dicts(cases) if cases is not None else None
+    })
+
 # Internal helper functions
 async def get_districts_internal():
     """Internal function to get districts"""
@@ -1051,179 +1422,124 @@ async def get_courts_internal():
         print(f"❌ Error getting courts: {str(e)}")
         return []
 
-@app.post("/process-case-results")
-async def process_case_results():
-    global browser
-    if not browser:
-        return {"success": False, "error": "No active browser session"}
+# Selectors for the View buttons/links in the results table
+VIEW_BUTTON_SELECTORS = [
+    "//a[contains(text(), 'View')]",  # Anchor tags with "View" text
+    "//a[contains(@onclick, 'viewHistory')]",  # Anchor tags with viewHistory onclick
+    "//input[@value='View' and @type='button']",  # Original input buttons
+    "//button[contains(text(), 'View')]",  # Button elements with "View" text
+    "//td//a[contains(@class, 'someclass')]"  # Anchor tags with someclass
+]
+
+def find_view_buttons(browser):
+    """View buttons/links in the results table, using the first selector that matches"""
+    for selector in VIEW_BUTTON_SELECTORS:
+        view_buttons = browser.find_elements(By.XPATH, selector)
+        if view_buttons:
+            return view_buttons
+    return []
+
+def return_to_results(browser):
+    """Get back from a case details page to the results table (no-op if already there)"""
+    if any(button.is_displayed() for button in find_view_buttons(browser)):
+        return
     
-    try:
-        # Wait for the results table to load
-        WebDriverWait(browser, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table"))
-        )
-        
-        # Find all View buttons/links in the results table - trying multiple selectors
-        view_buttons = []
-        
-        # Try different selectors for View buttons/links
-        selectors = [
-            "//a[contains(text(), 'View')]",  # Anchor tags with "View" text
-            "//a[contains(@onclick, 'viewHistory')]",  # Anchor tags with viewHistory onclick
-            "//input[@value='View' and @type='button']",  # Original input buttons
-            "//button[contains(text(), 'View')]",  # Button elements with "View" text
-            "//td//a[contains(@class, 'someclass')]"  # Anchor tags with someclass
-        ]
-        
-        for selector in selectors:
-            try:
-                view_buttons = browser.find_elements(By.XPATH, selector)
-                if view_buttons:
-                    print(f"✅ Found {len(view_buttons)} View elements using selector: {selector}")
-                    break
-                else:
-                    print(f"❌ No elements found with selector: {selector}")
-            except Exception as e:
-                print(f"❌ Error with selector {selector}: {str(e)}")
-                continue
-        
-        if not view_buttons:
-            # Try to get page source for debugging
-            try:
-                page_source = browser.page_source
-                if "View" in page_source:
-                    print("⚠️ 'View' text found in page source but no clickable elements found")
-                    # Try a more general approach
-                    view_buttons = browser.find_elements(By.XPATH, "//*[contains(text(), 'View')]")
-                    print(f"🔍 Found {len(view_buttons)} elements containing 'View' text")
-            except:
-                pass
+    back_buttons = browser.find_elements(By.ID, "main_back_caseNo")
+    if back_buttons:
+        browser.execute_script("arguments[0].click();", back_buttons[0])
+        print("🔙 Clicked Back button")
+    else:
+        browser.back()
+        print("🔙 Back button not found, used browser.back()")
+    
+    WebDriverWait(browser, resilience.wait_timeout(10)).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "table"))
+    )
+
+@metrics.timed("open_case", court_arg="court")
+def open_case_details(browser, index, court=None):
+    """Click the index-th View button and wait for the case details page"""
+    # Re-find the buttons every time - the results page re-renders after each Back
+    view_buttons = find_view_buttons(browser)
+    if index >= len(view_buttons):
+        raise resilience.PortalError(f"View button {index + 1} not found on results page")
+    
+    with resilience.guard("case_details"), rate_limiter.limited("page", court=court):
+        browser.execute_script("arguments[0].click();", view_buttons[index])
+        WebDriverWait(browser, resilience.wait_timeout(20)).until(
+            EC.any_of(
+                EC.presence_of_element_located((By.XPATH, "//td[contains(text(), 'Case Type')]")),
+                EC.presence_of_element_located((By.XPATH, "//td[contains(text(), 'Filing Number')]")),
+                EC.presence_of_element_located((By.CLASS_NAME, "case_status_table")),
+                EC.presence_of_element_located((By.ID, "main_back_caseNo")),
+                EC.presence_of_element_located((By.XPATH, "//h3[contains(@class, 'h2class')]"))
+            )
+        )
+    print(f"✅ Case details page {index + 1} loaded")
+    
+    # Additional wait to ensure all content is rendered
+    time.sleep(3)
+    portal_recorder.capture(browser)
+
+def collect_case_details(browser, location=None):
+    """
+    Open every case in the results table, extract its details and go back.
+    Each case is saved to the database as soon as it is extracted.
+    Transient failures are retried within the request budget; once the portal's
+    circuit opens the remaining cases are skipped instead of timing out one by one.
+    """
+    court = (location or {}).get("court")
+    try:
+        with resilience.budget():
+            # Wait for the results table to load
+            WebDriverWait(browser, resilience.wait_timeout(20)).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "table"))
+            )
             
-            if not view_buttons:
+            total = len(find_view_buttons(browser))
+            if not total:
                 return {"success": False, "error": "No case results found. Could not locate View buttons/links."}
-        
-        all_cases = []
-        
-        for i, button in enumerate(view_buttons):
-            try:
-                print(f"🔍 Processing case {i+1} of {len(view_buttons)}")
-                
-                # Click the View button/link
-                browser.execute_script("arguments[0].click();", button)
-                print(f"✅ Clicked View button for case {i+1}")
-                
-                # Wait longer for the detailed page to load completely
-                print("⏳ Waiting for case details page to load...")
-                time.sleep(5)  # Increased from 3 to 5 seconds
-                
-                # Wait for specific elements to ensure page is fully loaded
-                try:
-                    WebDriverWait(browser, 20).until(  # Increased from 15 to 20 seconds
-                        EC.any_of(
-                            EC.presence_of_element_located((By.XPATH, "//td[contains(text(), 'Case Type')]")),
-                            EC.presence_of_element_located((By.XPATH, "//td[contains(text(), 'Filing Number')]")),
-                            EC.presence_of_element_located((By.CLASS_NAME, "case_status_table")),
-                            EC.presence_of_element_located((By.ID, "main_back_caseNo")),
-                            EC.presence_of_element_located((By.XPATH, "//h3[contains(@class, 'h2class')]"))
-                        )
-                    )
-                    print("✅ Case details page loaded successfully")
-                except:
-                    print("⚠️ Timeout waiting for case details, proceeding anyway...")
-                
-                # Additional wait to ensure all content is rendered
-                time.sleep(3)  # Increased from 2 to 3 seconds
-                
-                # Debug: Print page title and some content
+            print(f"✅ Found {total} View elements")
+            
+            all_cases = []
+            for i in range(total):
+                print(f"🔍 Processing case {i+1} of {total}")
                 try:
-                    page_title = browser.title
-                    print(f"📄 Current page title: {page_title}")
-                    
-                    # Try to find some key elements to confirm we're on the right page
-                    case_elements = browser.find_elements(By.XPATH, "//h3[contains(@class, 'h2class')]")
-                    if case_elements:
-                        print(f"🔍 Found {len(case_elements)} section headers")
-                        for i, elem in enumerate(case_elements[:3]):  # Show first 3
-                            print(f"   {i+1}. {elem.text[:50]}...")
-                    
-                    # Check for tables
-                    tables = browser.find_elements(By.TAG_NAME, "table")
-                    print(f"📊 Found {len(tables)} tables on the page")
-                    
-                except Exception as debug_error:
-                    print(f"⚠️ Debug info extraction failed: {str(debug_error)}")
+                    resilience.retry(open_case_details, browser, i, court=court,
+                                     label=f"Opening case {i+1}", recover=lambda: return_to_results(browser))
+                except resilience.CircuitOpenError as e:
+                    print(f"⛔ {str(e)} - skipping remaining cases")
+                    break
+                except Exception as e:
+                    print(f"❌ Error opening case {i+1}: {str(e)}")
+                    if resilience.classify(e) == resilience.PERMANENT:
+                        break
+                    continue
                 
                 # Extract case data from the detailed view
                 print("📊 Extracting case data...")
-                case_data = extract_case_details()
-                case_data["case_index"] = i + 1
-                all_cases.append(case_data)
-                print(f"✅ Extracted data for case {i+1}")
-                
-                # Log extracted data summary
-                non_empty_fields = [k for k, v in case_data.items() if v and v != "Not found" and v != []]
-                print(f"📈 Successfully extracted {len(non_empty_fields)} fields with data")
-                
-                # Use the specific back button instead of browser.back()
-                try:
-                    print("🔙 Looking for Back button...")
-                    back_button = browser.find_element(By.ID, "main_back_caseNo")
-                    browser.execute_script("arguments[0].click();", back_button)
-                    print("✅ Clicked Back button")
-                except Exception as back_error:
-                    print(f"⚠️ Back button not found, using browser.back(): {str(back_error)}")
-                    browser.back()
-                
-                # Wait for results page to reload
-                time.sleep(3)
-                
-                # Wait for results table to be present again
-                try:
-                    WebDriverWait(browser, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "table"))
-                    )
-                    print("✅ Back to results page")
-                except:
-                    print("⚠️ Timeout waiting for results page")
-                
-                # Re-find the view buttons as the page has reloaded
-                # Use the same selector that worked initially
-                for selector in selectors:
+                case_data = extract_case_details(browser)
+                case = case_model.Case.from_dict(case_data)
+                if case is None:
+                    print(f"❌ Could not extract case {i+1}: {case_data.get('error')}")
+                else:
+                    all_cases.append(case)
+                    
+                    # Persist as we go so a later failure doesn't lose this case (the raw dict keeps the portal's date text)
                     try:
-                        view_buttons = browser.find_elements(By.XPATH, selector)
-                        if view_buttons:
-                            print(f"✅ Re-found {len(view_buttons)} View buttons")
-                            break
-                    except:
-                        continue
+                        case_store.save_cases([case_data], location=location)
+                    except Exception as db_error:
+                        print(f"⚠️ Could not save case {i+1} to database: {str(db_error)}")
+                    
+                    # Log extracted data summary
+                    non_empty_fields = [k for k, v in case.as_dict().items() if v]
+                    print(f"📈 Successfully extracted {len(non_empty_fields)} fields with data")
                 
-            except Exception as e:
-                print(f"❌ Error processing case {i+1}: {str(e)}")
-                # Try to go back if we're stuck
                 try:
-                    print("🔄 Attempting recovery...")
-                    # Try the specific back button first
-                    try:
-                        back_button = browser.find_element(By.ID, "main_back_caseNo")
-                        browser.execute_script("arguments[0].click();", back_button)
-                        print("✅ Used Back button for recovery")
-                    except:
-                        browser.back()
-                        print("✅ Used browser.back() for recovery")
-                    
-                    time.sleep(3)
-                    
-                    # Re-find view buttons
-                    for selector in selectors:
-                        try:
-                            view_buttons = browser.find_elements(By.XPATH, selector)
-                            if view_buttons:
-                                break
-                        except:
-                            continue
-                except Exception as recovery_error:
-                    print(f"❌ Recovery failed: {str(recovery_error)}")
-                continue
+                    resilience.retry(return_to_results, browser, label="Returning to results")
+                except Exception as e:
+                    print(f"❌ Could not get back to results page: {str(e)}")
+                    break
         
         return {
             "success": True,
@@ -1234,8 +1550,41 @@ async def process_case_results():
     except Exception as e:
         return {"success": False, "error": f"Error processing case results: {str(e)}"}
 
-def extract_case_details():
+@app.post("/process-case-results")
+async def process_case_results():
+    global browser, last_case_results
+    if not browser:
+        return {"success": False, "error": "No active browser session"}
+    
+    result = collect_case_details(browser, location=current_selection)
+    
+    if result["success"]:
+        last_case_results = result["cases"]
+        
+        cache_key = current_cache_key("details")
+        if cache_key and result["cases"]:
+            result_cache.put_case_details(cache_key, result["cases"])
+    
+    return api_result(result)
+
+def case_dicts(cases):
+    """API form of Case objects: ISO dates, null for missing values and a 1-based case_index"""
+    return [dict(case.as_dict(), case_index=index) for index, case in enumerate(cases, 1)]
+
+def api_result(result):
+    """A lookup result with its Case objects converted for the JSON response"""
+    if result.get("cases") is None:
+        return result
+    return dict(result, cases=case_dicts(result["cases"]))
+
+def get_active_browser():
+    """The interactive session's browser"""
+    return browser
+
+@metrics.timed("extract_case")
+def extract_case_details(driver=None):
     """Extract detailed case information from the current page"""
+    browser = driver if driver is not None else get_active_browser()
     try:
         case_data = {}
         print("📋 Starting case data extraction...")
@@ -1627,6 +1976,361 @@ def extract_case_details():
         print(f"❌ Error extracting case details: {str(e)}")
         return {"error": f"Error extracting case details: {str(e)}"}
 
+# Metric step names for the portal's dropdowns
+DROPDOWN_STEPS = {
+    "sess_state_code": "select_state",
+    "sess_dist_code": "select_district",
+    "court_complex_code": "select_court",
+    "CL_court_no": "select_court_no",
+}
+
+def select_option(browser, element_id, value, wait_seconds, court=None):
+    """Pick a value in one of the portal's cascading dropdowns and wait for the next to load"""
+    from selenium.webdriver.support.ui import Select
+    dropdown = WebDriverWait(browser, 10).until(
+        EC.presence_of_element_located((By.ID, element_id))
+    )
+    with metrics.span(DROPDOWN_STEPS.get(element_id, "select_option"), court), \
+            resilience.guard("dropdown"), rate_limiter.limited("dropdown", court=court):
+        Select(dropdown).select_by_value(str(value))
+    time.sleep(wait_seconds)
+    portal_recorder.capture(browser)
+
+def solve_captcha(browser, submit, max_attempts=3, court=None):
+    """
+    OCR the captcha and call submit(captcha_text), refreshing the captcha on each
+    failed attempt. submit returns a dict with error_type "invalid_captcha" on a wrong answer.
+    """
+    result = {"success": False, "error": "Captcha not attempted"}
+    for attempt in range(1, max_attempts + 1):
+        captcha_data_url, _ = capture_captcha(browser)
+        ocr = recognize_captcha(captcha_data_url, method='base64')
+        
+        if ocr["success"] and ocr["text"]:
+            print(f"🔐 Captcha attempt {attempt}: '{ocr['text']}'")
+            result = submit(ocr["text"])
+            if result["success"] or result.get("error_type") != "invalid_captcha":
+                return result
+        else:
+            result = {"success": False, "error": "Captcha OCR failed", "error_type": "invalid_captcha"}
+        
+        if attempt < max_attempts:
+            refresh_captcha_image(browser, court=court)
+    
+    print(f"❌ Captcha not solved after {max_attempts} attempts")
+    return result
+
+def solve_captcha_and_submit(browser, case_type, case_number, case_year, max_attempts=3, court=None):
+    """OCR the captcha and submit the Case Number search"""
+    return solve_captcha(
+        browser, lambda captcha_code: submit_case_form(browser, case_type, case_number, case_year,
+                                                       captcha_code, court=court),
+        max_attempts, court=court
+    )
+
+def open_case_number_form(browser, location):
+    """Open Case Status, select the court and switch to the Case Number tab"""
+    case_status_clicked, _ = open_case_status(browser)
+    if not case_status_clicked:
+        raise resilience.PortalError("Could not find Case Status button on the page")
+    
+    select_option(browser, "sess_state_code", location["state"], 3)
+    select_option(browser, "sess_dist_code", location["district"], 3)
+    select_option(browser, "court_complex_code", location["court"], 2, court=location["court"])
+    
+    case_number_button = WebDriverWait(browser, resilience.wait_timeout(10)).until(
+        EC.element_to_be_clickable((By.ID, "casenumber-tabMenu"))
+    )
+    with metrics.span("case_number_tab", location["court"]), resilience.guard("search_form"), \
+            rate_limiter.limited("page", court=location["court"]):
+        case_number_button.click()
+    time.sleep(2)
+    portal_recorder.capture(browser)
+
+def lookup_error(error):
+    """Error dict for a failed lookup step; browser-level failures are re-raised so the pool drops the driver"""
+    if not isinstance(error, resilience.PortalError) and resilience.classify(error) == resilience.PERMANENT:
+        raise error
+    return {
+        "success": False,
+        "error": str(error),
+        "error_type": "portal_unavailable" if isinstance(error, resilience.CircuitOpenError) else "portal_error"
+    }
+
+def run_case_lookup(browser, spec, max_captcha_attempts=3):
+    """
+    Run the whole Case Status cascade server-side in one browser:
+    state -> district -> court -> Case Number tab -> case type/number/year -> captcha -> results.
+    spec holds state, district, court, case_type, case_number and case_year.
+    Every step shares one retry budget.
+    """
+    with resilience.budget(), metrics.span("case_lookup", spec["court"]):
+        return _run_case_lookup(browser, spec, max_captcha_attempts)
+
+def _run_case_lookup(browser, spec, max_captcha_attempts):
+    location = {"state": spec["state"], "district": spec["district"], "court": spec["court"]}
+    case_type, case_number, case_year = spec["case_type"], spec["case_number"], spec["case_year"]
+    print(f"🔁 Server-side lookup: {location} {case_type}/{case_number}/{case_year}")
+    
+    try:
+        resilience.retry(open_case_number_form, browser, location, label="Opening case number form")
+        submitted = resilience.retry(
+            solve_captcha_and_submit, browser, case_type, case_number, case_year, max_captcha_attempts,
+            court=location["court"], label="Submitting case search",
+            recover=lambda: open_case_number_form(browser, location)
+        )
+    except Exception as e:
+        return lookup_error(e)
+    if not submitted["success"]:
+        return submitted
+    
+    time.sleep(2)
+    results = parse_search_results(browser)
+    search_key = result_cache.make_key("search", location, case_type, case_number, case_year)
+    if not results or not results["cases"]:
+        if not portal_shows_no_records(browser):
+            return {"success": False, "error": "Search results did not load", "error_type": "portal_error"}
+        result_cache.put_search_results(search_key, None)
+        return {"success": False, "error": "No cases found in search results", "no_cases": True}
+    result_cache.put_search_results(search_key, results)
+    
+    details = collect_case_details(browser, location=location)
+    if not details["success"]:
+        return details
+    
+    if details["cases"]:
+        details_key = result_cache.make_key("details", location, case_type, case_number, case_year)
+        result_cache.put_case_details(details_key, details["cases"])
+    
+    return {
+        "success": True,
+        "results": results,
+        "cases": details["cases"]
+    }
+
+CNR_FORMAT = re.compile(r"^[A-Z]{4}\d{12}$")
+# Shown in place of the case details when the portal has no case for a CNR
+CNR_NOT_FOUND_MARKERS = ("does not exist", "not exists", "invalid cnr", "record not found", "no record found")
+
+def normalise_cnr(value):
+    """The 16-character CNR in canonical form, or None if value isn't one"""
+    cnr = re.sub(r"[\s\-/]", "", str(value or "")).upper()
+    return cnr if CNR_FORMAT.match(cnr) else None
+
+def open_cnr_form(browser):
+    """Load the portal home page, whose default form is the CNR number search"""
+    with metrics.span("portal_home"), resilience.guard("home"), rate_limiter.limited("page") as call:
+        browser.get(portal.BASE_URL)
+        call.throttled = rate_limiter.looks_throttled(browser.title + " " + browser.page_source[:2000])
+        if call.throttled:
+            raise resilience.PortalThrottled("Portal returned an overload page")
+
+    WebDriverWait(browser, resilience.wait_timeout(15)).until(
+        EC.presence_of_element_located((By.ID, "cino"))
+    )
+    if any(modal.is_displayed() for modal in browser.find_elements(By.CSS_SELECTOR, ".modal.show")):
+        close_modal(browser)
+    portal_recorder.capture(browser)
+
+@metrics.timed("submit_cnr")
+def submit_cnr_form(browser, cnr, captcha_code):
+    """Fill and submit the CNR search form. Returns {"success": True} or an invalid_captcha error dict."""
+    cnr_input = browser.find_element(By.ID, "cino")
+    cnr_input.clear()
+    cnr_input.send_keys(cnr)
+
+    captcha_input = browser.find_element(By.ID, "fcaptcha_code")
+    captcha_input.clear()
+    captcha_input.send_keys(captcha_code)
+
+    with resilience.guard("search"), rate_limiter.limited("submit"):
+        search_button = WebDriverWait(browser, 10).until(
+            EC.element_to_be_clickable((By.ID, "searchbtn"))
+        )
+        browser.execute_script("arguments[0].click();", search_button)
+    time.sleep(3)
+
+    if dismiss_invalid_captcha(browser):
+        portal_recorder.note_captcha(browser, captcha_code, accepted=False)
+        return {"success": False, "error": "Invalid captcha. Please try again.", "error_type": "invalid_captcha"}
+
+    portal_recorder.note_captcha(browser, captcha_code, accepted=True)
+    portal_recorder.capture(browser)
+    return {"success": True}
+
+def cnr_result_shown(browser):
+    """True once the case details are on the page, False if the portal says there is no such case"""
+    deadline = time.monotonic() + resilience.wait_timeout(15)
+    while time.monotonic() < deadline:
+        if browser.find_elements(By.XPATH, "//td[contains(text(), 'CNR Number')]"):
+            return True
+        body_text = browser.find_element(By.TAG_NAME, "body").text.lower()
+        if any(marker in body_text for marker in CNR_NOT_FOUND_MARKERS):
+            return False
+        time.sleep(0.5)
+    raise resilience.PortalError("Case details did not appear after the CNR search")
+
+def run_cnr_lookup(browser, cnr, max_captcha_attempts=3):
+    """
+    Look a case up by CNR number straight from the home page form:
+    CNR -> captcha -> case details, skipping the state/district/court cascade.
+    Every step shares one retry budget.
+    """
+    with resilience.budget(), metrics.span("cnr_lookup"):
+        return _run_cnr_lookup(browser, cnr, max_captcha_attempts)
+
+def _run_cnr_lookup(browser, cnr, max_captcha_attempts):
+    print(f"🔁 Server-side CNR lookup: {cnr}")
+    try:
+        resilience.retry(open_cnr_form, browser, label="Opening CNR search form")
+        submitted = resilience.retry(
+            solve_captcha, browser, lambda captcha_code: submit_cnr_form(browser, cnr, captcha_code),
+            max_captcha_attempts, label="Submitting CNR search", recover=lambda: open_cnr_form(browser)
+        )
+        if not submitted["success"]:
+            return submitted
+        found = resilience.retry(cnr_result_shown, browser, label="Waiting for case details")
+    except Exception as e:
+        return lookup_error(e)
+
+    search_key = result_cache.make_key("cnr-search", None, None, cnr, "")
+    if not found:
+        result_cache.put_search_results(search_key, None)
+        return {"success": False, "error": f"No case found for CNR {cnr}", "no_cases": True}
+
+    case_data = extract_case_details(browser)
+    if "error" in case_data:
+        return {"success": False, "error": case_data["error"], "error_type": "portal_error"}
+    if case_model.clean(case_data.get("cnr_number")) is None:
+        case_data["cnr_number"] = cnr
+    case = case_model.Case.from_dict(case_data)
+
+    try:
+        case_store.save_cases([case_data])
+    except Exception as db_error:
+        print(f"⚠️ Could not save case {cnr} to database: {str(db_error)}")
+    result_cache.put_case_details(result_cache.make_key("cnr", None, None, cnr, ""), [case])
+    return {"success": True, "cases": [case]}
+
+def cached_cnr_lookup(cnr):
+    """A CNR lookup answered from the result cache, or None on a miss"""
+    cases = result_cache.get_case_details(result_cache.make_key("cnr", None, None, cnr, ""))
+    if cases:
+        return {"success": True, "cached": True, "cases": cases}
+    hit, _ = result_cache.get_search_results(result_cache.make_key("cnr-search", None, None, cnr, ""))
+    if hit:
+        return {"success": False, "cached": True, "error": f"No case found for CNR {cnr} (cached)",
+                "no_cases": True}
+    return None
+
+def open_cause_list_form(browser, job):
+    """Open Cause List and select the job's state, district and court complex"""
+    cause_list_clicked, _ = open_cause_list(browser)
+    if not cause_list_clicked:
+        raise resilience.PortalError("Could not find Cause List button on the page")
+    select_option(browser, "sess_state_code", job["state"], 3)
+    select_option(browser, "sess_dist_code", job["district"], 3)
+    select_option(browser, "court_complex_code", job["court"], 3, court=job["court"])
+    WebDriverWait(browser, resilience.wait_timeout(10)).until(
+        EC.presence_of_element_located((By.ID, "CL_court_no"))
+    )
+
+def submit_cause_list_captcha(browser, court, list_type, captcha_code):
+    """
+    Submit the filled-in cause list form with one captcha answer.
+    Returns {"success": True, "html": <list table>} or an error dict with error_type "invalid_captcha".
+    """
+    captcha_input = browser.find_element(By.ID, "cause_list_captcha_code")
+    captcha_input.clear()
+    captcha_input.send_keys(captcha_code)
+    
+    submit_button = browser.find_element(By.XPATH, f"//button[contains(@onclick, \"'{list_type}'\")]")
+    with metrics.span("submit_cause_list", court), resilience.guard("cause_list"), \
+            rate_limiter.limited("submit", court=court) as call:
+        browser.execute_script("arguments[0].click();", submit_button)
+        time.sleep(3)
+        call.throttled = rate_limiter.looks_throttled(browser.page_source)
+        if call.throttled:
+            raise resilience.PortalThrottled("Portal returned an overload page")
+    
+    if dismiss_invalid_captcha(browser):
+        portal_recorder.note_captcha(browser, captcha_code, accepted=False)
+        return {"success": False, "error": "Invalid captcha. Please try again.", "error_type": "invalid_captcha"}
+    
+    portal_recorder.note_captcha(browser, captcha_code, accepted=True)
+    try:
+        result_table = browser.find_element(By.ID, "res_cause_list")
+        return {"success": True, "html": result_table.get_attribute("innerHTML")}
+    except Exception:
+        # No list for this court and date
+        return {"success": True, "html": ""}
+
+def submit_cause_list_form(browser, court, court_no, list_date, list_type, max_captcha_attempts=3):
+    """
+    Pick the court and date, solve the captcha and submit one cause list.
+    Returns {"success": True, "html": <list table>} or an error dict.
+    """
+    select_option(browser, "CL_court_no", court_no, 1, court=court)
+    browser.execute_script(
+        "document.getElementById('causelist_date').value = arguments[0];",
+        cause_list.portal_date(list_date)
+    )
+    return solve_captcha(
+        browser, lambda captcha_code: submit_cause_list_captcha(browser, court, list_type, captcha_code),
+        max_captcha_attempts, court=court
+    )
+
+def fetch_cause_lists(browser, job):
+    """
+    Fetch every list type for every court in a court complex (or just job["court_no"])
+    for one date, reusing the same state/district/court selection and captcha solving
+    as case lookups. All lists of the job share one retry budget.
+    """
+    with resilience.budget(), metrics.span("cause_list_job", job["court"]):
+        return _fetch_cause_lists(browser, job)
+
+def _fetch_cause_lists(browser, job):
+    from selenium.webdriver.support.ui import Select
+    print(f"📅 Fetching cause lists: court {job['court']} on {job['list_date']}")
+    
+    try:
+        resilience.retry(open_cause_list_form, browser, job, label="Opening cause list form")
+    except Exception as e:
+        return lookup_error(e)
+    
+    court_dropdown = browser.find_element(By.ID, "CL_court_no")
+    courts = [
+        (option.get_attribute("value"), option.text.strip())
+        for option in Select(court_dropdown).options
+        if option.get_attribute("value") and option.get_attribute("disabled") is None
+    ]
+    if job.get("court_no"):
+        courts = [court for court in courts if court[0] == job["court_no"]]
+    
+    lists = []
+    for court_no, court_name in courts:
+        for list_type in job["list_types"]:
+            try:
+                # Submitting replaces the form with the list, so come back to it
+                if not browser.find_elements(By.ID, "CL_court_no"):
+                    resilience.retry(open_cause_list_form, browser, job, label="Reopening cause list form")
+                submitted = resilience.retry(
+                    submit_cause_list_form, browser, job["court"], court_no, job["list_date"], list_type,
+                    label=f"Fetching {list_type} cause list for court {court_no}",
+                    recover=lambda: open_cause_list_form(browser, job)
+                )
+            except Exception as e:
+                submitted = lookup_error(e)
+            lists.append({
+                "court_no": court_no,
+                "court_name": court_name,
+                "list_type": list_type,
+                "html": submitted.get("html"),
+                "error": None if submitted["success"] else submitted.get("error")
+            })
+    
+    return {"success": True, "lists": lists}
+
 @app.get("/debug-page")
 async def debug_page():
     global browser
@@ -1692,9 +2396,44 @@ async def debug_page():
     except Exception as e:
         return {"success": False, "error": f"Debug error: {str(e)}"}
 
+def get_order_metadata(case_index, order_number, cnr=None, order_date=None):
+    """Look up CNR and order date (YYYY-MM-DD) for an order from the last processed case results"""
+    if 1 <= case_index <= len(last_case_results):
+        case = last_case_results[case_index - 1]
+        cnr = cnr or case.cnr_number
+        if not order_date:
+            for order in case.orders:
+                if str(order.order_number) == str(order_number):
+                    order_date = case_model.iso(order.order_date)
+                    break
+    return cnr, order_date
+
+def stored_pdf_response(record, action, message):
+    """Build the download_pdf response for a PDF held in the local store"""
+    return {
+        "success": True,
+        "message": message,
+        "filename": record["filename"],
+        "download_url": record["download_url"],
+        "local_path": record["local_path"],
+        "sha256": record["sha256"],
+        "action": action
+    }
+
 @app.get("/download-pdf/{case_index}/{order_number}")
-async def download_pdf(case_index: int, order_number: str):
+@metrics.timed("pdf_download")
+async def download_pdf(case_index: int, order_number: str, cnr: str = None, order_date: str = None):
     global browser
+    
+    cnr, order_date = get_order_metadata(case_index, order_number, cnr, order_date)
+    display_name = f"{cnr}_Order_{order_number}.pdf" if cnr else None
+    
+    # Serve orders we already hold without touching the portal
+    stored = pdf_store.find_order(cnr, order_number, order_date)
+    if stored:
+        print(f"🗄️ Order {order_number} for {cnr} already stored, serving locally")
+        return stored_pdf_response(stored, "ready_for_download", "PDF served from local store")
+    
     if not browser:
         return {"success": False, "error": "No active browser session"}
     
@@ -1730,7 +2469,7 @@ async def download_pdf(case_index: int, order_number: str):
                     
                     if pdf_link and onclick_attr:
                         break
-            except Exception as e:
+            except Exception:
                 continue
         
         if not pdf_link or not onclick_attr:
@@ -1739,11 +2478,13 @@ async def download_pdf(case_index: int, order_number: str):
         print(f"✅ Found PDF link with onclick: {onclick_attr}")
         
         # Click the PDF link to open the modal
-        browser.execute_script("arguments[0].click();", pdf_link)
+        with resilience.guard("pdf"), rate_limiter.limited("pdf", court=current_selection["court"]):
+            browser.execute_script("arguments[0].click();", pdf_link)
         print("🖱️ Clicked PDF link, waiting for modal...")
         
         # Wait for modal to appear
         time.sleep(3)
+        portal_recorder.capture(browser)
         
         # Look for the modal with PDF viewer
         modal_selectors = [
@@ -1765,7 +2506,7 @@ async def download_pdf(case_index: int, order_number: str):
                     if pdf_url:
                         print(f"✅ Found PDF object with data: {pdf_url}")
                         break
-            except Exception as e:
+            except Exception:
                 continue
         
         if not pdf_url:
@@ -1813,10 +2554,12 @@ async def download_pdf(case_index: int, order_number: str):
             
             print(f"🔗 Full PDF URL: {pdf_url}")
             
-            # Try to download directly from modal URL
-            import requests
-            from pathlib import Path
+            stored = pdf_store.find_by_url(pdf_url)
+            if stored:
+                print("🗄️ PDF URL already stored, serving locally")
+                return stored_pdf_response(stored, "ready_for_download", "PDF served from local store")
             
+            # Try to download directly from modal URL
             cookies = browser.get_cookies()
             session_cookies = {}
             for cookie in cookies:
@@ -1829,42 +2572,26 @@ async def download_pdf(case_index: int, order_number: str):
             }
             
             print("📥 Downloading PDF from modal...")
-            response = requests.get(pdf_url, cookies=session_cookies, headers=headers, stream=True, timeout=30)
+            partial_path = pdf_download.download_resumable(pdf_url, cookies=session_cookies, headers=headers)
             
-            if response.status_code == 200:
-                downloads_dir = Path(os.getcwd()) / "downloads"
-                downloads_dir.mkdir(exist_ok=True)
-                
+            if partial_path:
                 url_filename = pdf_url.split('/')[-1]
                 if '.pdf' not in url_filename:
                     url_filename = f"{url_filename}.pdf"
                 
-                case_info = f"Case_{case_index}_Order_{order_number}"
-                safe_filename = f"{case_info}_{url_filename}"
-                file_path = downloads_dir / safe_filename
-                
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                record = pdf_store.put_file(
+                    partial_path,
+                    cnr=cnr,
+                    order_number=order_number,
+                    order_date=order_date,
+                    source_url=pdf_url,
+                    display_name=display_name or f"Case_{case_index}_Order_{order_number}_{url_filename}"
+                )
                 
-                print(f"✅ PDF saved to: {file_path}")
-                
-                # Check if it's a valid PDF
-                with open(file_path, 'rb') as f:
-                    first_bytes = f.read(4)
-                    if first_bytes == b'%PDF':
-                        print("✅ Confirmed: File is a valid PDF")
-                        download_url = f"/serve-pdf/{safe_filename}"
-                        return {
-                            "success": True,
-                            "message": f"PDF downloaded successfully from modal",
-                            "filename": safe_filename,
-                            "download_url": download_url,
-                            "local_path": str(file_path),
-                            "action": "ready_for_download"
-                        }
-                    else:
-                        print(f"⚠️ File doesn't appear to be a PDF. First bytes: {first_bytes}")
+                if record:
+                    print(f"✅ PDF saved to: {record['local_path']}")
+                    search_index.request_reindex()
+                    return stored_pdf_response(record, "ready_for_download", "PDF downloaded successfully from modal")
         
         # Store current window and get initial downloads count
         original_window = browser.current_window_handle
@@ -1876,7 +2603,8 @@ async def download_pdf(case_index: int, order_number: str):
         
         # Click the PDF link to open it in Chrome's PDF viewer
         print("🖱️ Clicking PDF link to open in Chrome PDF viewer...")
-        browser.execute_script("arguments[0].click();", pdf_link)
+        with resilience.guard("pdf"), rate_limiter.limited("pdf", court=current_selection["court"]):
+            browser.execute_script("arguments[0].click();", pdf_link)
         
         # Wait for PDF to load (either new tab or navigation)
         time.sleep(3)
@@ -1930,7 +2658,7 @@ async def download_pdf(case_index: int, order_number: str):
                         try:
                             # Check if element is visible and clickable
                             if element.is_displayed() and element.is_enabled():
-                                print(f"✅ Found download button, clicking...")
+                                print("✅ Found download button, clicking...")
                                 browser.execute_script("arguments[0].click();", element)
                                 download_clicked = True
                                 break
@@ -1973,11 +2701,35 @@ async def download_pdf(case_index: int, order_number: str):
                 current_files = set(os.listdir(downloads_dir))
                 new_files = current_files - initial_files
                 
-                if new_files:
+                # Ignore .crdownload and other in-progress files until Chrome renames them
+                finished_files = [
+                    name for name in new_files
+                    if not pdf_download.is_incomplete(name)
+                    and os.path.isfile(os.path.join(downloads_dir, name))
+                ]
+                
+                valid_files = []
+                for name in finished_files:
+                    ok, reason = pdf_download.validate_pdf(os.path.join(downloads_dir, name))
+                    if ok:
+                        valid_files.append(name)
+                    else:
+                        print(f"⏳ {name} not complete yet: {reason}")
+                
+                if valid_files:
                     # Found new file(s)
-                    downloaded_file = list(new_files)[0]  # Get first new file
+                    downloaded_file = valid_files[0]  # Get first new file
                     print(f"✅ PDF downloaded: {downloaded_file}")
                     
+                    record = pdf_store.put_file(
+                        os.path.join(downloads_dir, downloaded_file),
+                        cnr=cnr,
+                        order_number=order_number,
+                        order_date=order_date,
+                        source_url=pdf_url,
+                        display_name=display_name or downloaded_file
+                    )
+                    
                     # Close PDF tab and return to original window
                     if pdf_window != original_window:
                         browser.close()
@@ -1985,12 +2737,16 @@ async def download_pdf(case_index: int, order_number: str):
                     else:
                         browser.back()  # Go back if same window
                     
+                    if record:
+                        search_index.request_reindex()
+                        return stored_pdf_response(record, "downloaded_via_chrome", "PDF downloaded successfully via Chrome PDF viewer")
+                    
                     # Create web-accessible URL for download
                     download_url = f"/serve-pdf/{downloaded_file}"
                     
                     return {
                         "success": True,
-                        "message": f"PDF downloaded successfully via Chrome PDF viewer",
+                        "message": "PDF downloaded successfully via Chrome PDF viewer",
                         "filename": downloaded_file,
                         "download_url": download_url,
                         "local_path": os.path.join(downloads_dir, downloaded_file),
@@ -2042,29 +2798,27 @@ async def download_pdf(case_index: int, order_number: str):
         return {"success": False, "error": f"Error processing PDF request: {str(e)}"}
 
 # Endpoint to serve downloaded PDFs
-@app.get("/serve-pdf/{filename}")
-async def serve_pdf(filename: str):
-    """Serve PDF files from local downloads directory"""
-    import os
-    from fastapi.responses import FileResponse
-    
+@app.api_route("/serve-pdf/{filename}", methods=["GET", "HEAD"])
+async def serve_pdf(filename: str, request: Request, inline: bool = False):
+    """Serve PDF files from the local store with Range, ETag and conditional GET support"""
     # Security check - only allow PDF files and prevent directory traversal
     if not filename.endswith('.pdf') or '..' in filename or '/' in filename or '\\' in filename:
         return {"error": "Invalid filename"}
     
-    downloads_dir = os.path.join(os.getcwd(), "downloads")
-    file_path = os.path.join(downloads_dir, filename)
-    
-    if os.path.exists(file_path):
-        print(f"📤 Serving PDF: {filename}")
-        return FileResponse(
-            path=file_path,
-            media_type='application/pdf',
-            filename=filename,
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Cache-Control": "no-cache"
-            }
+    file_path = pdf_store.resolve_filename(filename)
+    
+    if file_path:
+        # Store blobs are named by their SHA-256, so the name is the content hash
+        sha256 = file_path.stem if file_path.parent != pdf_store.DOWNLOADS_DIR else None
+        download_name = (sha256 and pdf_store.display_name_for(sha256)) or filename
+        print(f"📤 Serving PDF: {filename} ({request.headers.get('range') or 'full'})")
+        return pdf_response.pdf_file_response(
+            request,
+            file_path,
+            download_name,
+            sha256=sha256,
+            immutable=sha256 is not None,
+            inline=inline
         )
     else:
         print(f"❌ PDF file not found: {filename}")
@@ -2072,30 +2826,518 @@ async def serve_pdf(filename: str):
 
 # Endpoint to list available PDFs
 @app.get("/list-pdfs")
-async def list_pdfs():
-    """List all available PDF files in downloads directory"""
-    import os
-    from pathlib import Path
-    
-    downloads_dir = Path(os.getcwd()) / "downloads"
-    
-    if not downloads_dir.exists():
-        return {"pdfs": []}
-    
-    pdf_files = []
-    for file_path in downloads_dir.glob("*.pdf"):
-        stat = file_path.stat()
-        pdf_files.append({
-            "filename": file_path.name,
-            "size": stat.st_size,
-            "created": stat.st_ctime,
-            "download_url": f"/serve-pdf/{file_path.name}"
-        })
+async def list_pdfs(limit: int = 50, cursor: str = None, sort: str = "created", order: str = "desc",
+                    cnr: str = None, created_from: float = None, created_to: float = None,
+                    order_date_from: str = None, order_date_to: str = None,
+                    min_size: int = None, max_size: int = None):
+    """List stored PDFs from the catalog, one page at a time (newest first by default)"""
+    try:
+        pdf_files, next_cursor = pdf_store.list_catalog(
+            limit=max(1, min(limit, 500)),
+            cursor=cursor,
+            sort=sort,
+            order=order,
+            cnr=cnr,
+            created_from=created_from,
+            created_to=created_to,
+            order_date_from=order_date_from,
+            order_date_to=order_date_to,
+            min_size=min_size,
+            max_size=max_size
+        )
+    except ValueError as e:
+        return JSONResponse({"pdfs": [], "error": str(e)}, status_code=400)
+    
+    return {"pdfs": pdf_files, "next_cursor": next_cursor}
+
+@app.get("/cases")
+async def list_cases(registration_number: str = None, court_code: str = None, court: str = None,
+                     case_stage: str = None, next_hearing_from: str = None, next_hearing_to: str = None,
+                     limit: int = 50, offset: int = 0):
+    """Query stored cases without re-scraping the portal"""
+    try:
+        cases = case_store.find_cases(
+            registration_number=registration_number,
+            court_code=court_code,
+            court=court,
+            case_stage=case_stage,
+            next_hearing_from=next_hearing_from,
+            next_hearing_to=next_hearing_to,
+            limit=max(1, min(limit, 500)),
+            offset=offset
+        )
+        return {"success": True, "cases": cases, "count": len(cases)}
+    except Exception as e:
+        print(f"❌ Error querying cases: {str(e)}")
+        return {"success": False, "error": f"Failed to query cases: {str(e)}"}
+
+@app.get("/hearings")
+async def get_hearings(date_from: str = Query(None, alias="from"), date_to: str = Query(None, alias="to"),
+                       court: str = None, court_code: str = None, judge: str = None, cnr: str = None,
+                       upcoming_only: bool = False, limit: int = 1000):
+    """
+    Hearings from the calendar index between from and to (inclusive; default the
+    next 14 days). court matches the court/judge name, court_code the portal code.
+    upcoming_only leaves out past hearings taken from case histories.
+    """
+    started = time.perf_counter()
+    try:
+        start, end, hearings = hearing_calendar.find_hearings(
+            date_from, date_to, court_code=court_code, court=court, judge=judge, cnr=cnr,
+            kinds=("next", "listed") if upcoming_only else None, limit=max(1, min(limit, 10000))
+        )
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return {"success": True, "from": start, "to": end, "hearings": hearings, "count": len(hearings),
+            "took_ms": round(elapsed_ms, 2)}
+
+@app.get("/hearings.ics")
+async def get_hearings_ical(date_from: str = Query(None, alias="from"), date_to: str = Query(None, alias="to"),
+                            court: str = None, court_code: str = None, judge: str = None, cnr: str = None):
+    """The same hearings as an iCalendar feed (upcoming hearings only) for calendar apps"""
+    try:
+        _, _, hearings = hearing_calendar.find_hearings(
+            date_from, date_to, court_code=court_code, court=court, judge=judge, cnr=cnr,
+            kinds=("next", "listed"), limit=10000
+        )
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    return PlainTextResponse(hearing_calendar.to_ical(hearings), media_type="text/calendar",
+                             headers={"Content-Disposition": 'inline; filename="hearings.ics"'})
+
+@app.get("/cases/{cnr}")
+async def get_case(cnr: str):
+    """Full stored record for one case"""
+    case_data = case_store.get_case(cnr)
+    if not case_data:
+        return {"success": False, "error": f"No stored case with CNR {cnr}"}
+    return {"success": True, "case": case_data}
+
+@app.get("/export/{table}")
+async def export_cases(table: str, format: str = "csv", gzip: bool = False, court_code: str = None,
+                       court: str = None, case_stage: str = None, next_hearing_from: str = None,
+                       next_hearing_to: str = None):
+    """
+    Stream one table of stored cases (cases, acts, orders or history, joined on
+    cnr) as CSV, JSONL or Parquet, with the same filters as /cases
+    """
+    filters = {"court_code": court_code, "court": court, "case_stage": case_stage,
+               "hearing_from": next_hearing_from, "hearing_to": next_hearing_to}
+    try:
+        chunks, filename, media_type = case_export.export(table, format, filters, compress=gzip)
+    except (ValueError, RuntimeError) as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    print(f"📦 Exporting {filename}")
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/search-pdfs")
+async def search_pdfs(q: str, limit: int = 20, offset: int = 0, cnr: str = None):
+    """Ranked full-text search over downloaded judgments and orders"""
+    if not q.strip():
+        return {"success": False, "error": "Query is required"}
+    
+    try:
+        started = time.perf_counter()
+        hits = search_index.search(q, limit=min(limit, 100), offset=offset, cnr=cnr)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"🔎 PDF search '{q}': {len(hits)} hit(s) in {elapsed_ms:.1f}ms")
+        return {
+            "success": True,
+            "query": q,
+            "results": hits,
+            "count": len(hits),
+            "took_ms": round(elapsed_ms, 2),
+            "index": search_index.stats()
+        }
+    except Exception as e:
+        print(f"❌ PDF search error: {str(e)}")
+        return {"success": False, "error": f"Search failed: {str(e)}"}
+
+@app.post("/reindex-pdfs")
+async def reindex_pdfs():
+    """Ask the background indexer to pick up new or changed PDFs now"""
+    search_index.request_reindex()
+    return {"success": True, "message": "Reindex requested", "index": search_index.stats()}
+
+def pooled_case_lookup(spec, limit=None):
+    """Run one full case lookup in a pooled browser (limit: see BrowserPool.browser)"""
+    with pool.browser(limit=limit) as driver:
+        return run_case_lookup(driver, spec)
+
+def cached_or_pooled_case_lookup(spec, use_cache=True):
+    """A full case lookup answered from the result cache when it can be, otherwise in a pooled browser"""
+    cached = fan_out.from_cache(spec) if use_cache else None
+    if cached is not None:
+        print(f"🗃️ Cache hit: {spec['case_type']}/{spec['case_number']}/{spec['case_year']}")
+        return dict(cached, cached=True)
+    return dict(pooled_case_lookup(spec), cached=False)
+
+@app.post("/search")
+async def search(request: Request):
+    """
+    One-shot case search: runs the whole cascade (state, district, court, Case
+    Number tab, case type/number/year, captcha, results and case details) in one
+    pooled browser and returns the results, instead of ten step-wise calls.
+    case_type may be the option value or its label. The step-wise endpoints
+    remain for interactive use.
+    """
+    form_data = await request.form()
+    spec = {field: (form_data.get(field) or "").strip() for field in watchlist.SPEC_FIELDS}
+    missing = [field for field, value in spec.items() if not value]
+    if missing:
+        return {"success": False, "error": f"Missing fields: {', '.join(missing)}"}
+    use_cache = form_data.get("use_cache", "1") not in ("0", "false", "off")
+
+    started = time.perf_counter()
+    try:
+        # Browsers are blocking - run the lookup off the event loop
+        result = await run_in_threadpool(cached_or_pooled_case_lookup, spec, use_cache)
+    except Exception as e:
+        print(f"❌ Search failed: {str(e)}")
+        return {"success": False, "cached": False, "error": str(e)}
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return api_result(result)
+
+def list_court_complexes(browser, state, district):
+    """Court complexes of a district, read from the Case Status form"""
+    case_status_clicked, _ = open_case_status(browser)
+    if not case_status_clicked:
+        raise resilience.PortalError("Could not find Case Status button on the page")
+    select_option(browser, "sess_state_code", state, 3)
+    select_option(browser, "sess_dist_code", district, 3)
+
+    from selenium.webdriver.support.ui import Select
+    select = Select(browser.find_element(By.ID, "court_complex_code"))
+    courts = []
+    for option in select.options:
+        value = option.get_attribute("value")
+        if value and value != "0":
+            courts.append({"value": value, "text": option.text.strip()})
+    return courts
+
+def pooled_court_list(state, district):
+    """A district's court complexes, listed once in a pooled browser and then remembered"""
+    courts = fan_out.cached_courts(state, district)
+    if courts is None:
+        with pool.browser() as driver:
+            courts = resilience.retry(list_court_complexes, driver, state, district,
+                                      label="Listing court complexes")
+        fan_out.remember_courts(state, district, courts)
+    return courts
+
+def run_fan_out_search(state, district, courts, case_type, case_number, case_year,
+                       use_cache=True, stop_on_first=False):
+    if not courts:
+        courts = pooled_court_list(state, district)
+        if not courts:
+            return {"success": False, "error": "No court complexes found for this district"}
+    specs = fan_out.make_specs(state, district, courts, case_type, case_number, case_year)
+    workers = max(pool.size, fan_out.WORKERS)
+    return fan_out.run(specs, lambda spec: pooled_case_lookup(spec, limit=workers), max_workers=workers,
+                       use_cache=use_cache, stop_on_first=stop_on_first)
+
+@app.post("/search/fan-out")
+async def fan_out_search(request: Request):
+    """
+    Look up one case in every court complex of a district (or only in the
+    courts given as repeated court fields) concurrently across pooled browsers, with captchas
+    solved automatically, and return the merged hits. FAN_OUT_WORKERS courts
+    are searched at once; the pool launches extra browsers for that and closes them afterwards.
+    case_type may be the option value or its label (e.g. O.S.), since codes
+    differ between courts. Set stop_on_first to stop at the first court with a hit.
+    """
+    form_data = await request.form()
+    state = form_data.get("state")
+    district = form_data.get("district")
+    case_type = form_data.get("case_type")
+    case_number = form_data.get("case_number")
+    case_year = form_data.get("case_year")
+    if not all([state, district, case_type, case_number, case_year]):
+        return {"success": False, "error": "State, district, case type, case number and year are required"}
+
+    # Repeated fields - court complex values themselves contain commas
+    courts = [value.strip() for value in form_data.getlist("court") if value.strip()]
+    use_cache = form_data.get("use_cache", "1") not in ("0", "false", "off")
+    stop_on_first = form_data.get("stop_on_first") in ("1", "true", "on")
+
+    print(f"🌐 Fan-out search in district {district}: {case_type}/{case_number}/{case_year}")
+    try:
+        # Browsers are blocking - run the lookups off the event loop
+        return await run_in_threadpool(run_fan_out_search, state, district, courts, case_type,
+                                       case_number, case_year, use_cache=use_cache,
+                                       stop_on_first=stop_on_first)
+    except Exception as e:
+        print(f"❌ Fan-out search failed: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+def pooled_cnr_lookup(cnr, use_cache=True):
+    """Look one CNR up in a pooled browser, unless the cache already has the answer"""
+    cached = cached_cnr_lookup(cnr) if use_cache else None
+    if cached:
+        return api_result(dict(cached, cnr=cnr))
+    with pool.browser() as driver:
+        return api_result(dict(run_cnr_lookup(driver, cnr), cnr=cnr, cached=False))
+
+def lookup_cnrs(cnrs, use_cache=True):
+    """Look several CNRs up concurrently across the pool; results keep the input order"""
+    def lookup(cnr):
+        try:
+            return pooled_cnr_lookup(cnr, use_cache)
+        except Exception as e:
+            return {"success": False, "cnr": cnr, "error": f"{type(e).__name__}: {str(e)}",
+                    "error_type": "browser_error"}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(pool.size, len(cnrs)))) as executor:
+        return list(executor.map(lookup, cnrs))
+
+@app.post("/lookup-cnr")
+async def lookup_cnr(request: Request):
+    """Look a case up by its 16-character CNR number via the portal's CNR search (no court cascade)"""
+    form_data = await request.form()
+    cnr = normalise_cnr(form_data.get("cnr"))
+    if not cnr:
+        return {"success": False, "error": "A 16-character CNR number is required (e.g. MHAU010012342020)"}
+    use_cache = form_data.get("use_cache", "1") not in ("0", "false", "off")
+
+    try:
+        # Browsers are blocking - run the lookup off the event loop
+        return await run_in_threadpool(pooled_cnr_lookup, cnr, use_cache)
+    except Exception as e:
+        print(f"❌ CNR lookup failed: {str(e)}")
+        return {"success": False, "cnr": cnr, "error": str(e)}
+
+@app.post("/lookup-cnr/batch")
+async def lookup_cnr_batch(request: Request):
+    """Look up many CNR numbers (separated by commas, spaces or newlines) concurrently across pooled browsers"""
+    form_data = await request.form()
+    values = [value for value in re.split(r"[\s,;]+", form_data.get("cnrs") or "") if value]
+    cnrs = list(dict.fromkeys(cnr for cnr in map(normalise_cnr, values) if cnr))
+    invalid = [value for value in values if not normalise_cnr(value)]
+    if not cnrs:
+        return {"success": False, "error": "No valid CNR numbers given", "invalid": invalid}
+    if len(cnrs) > CNR_BATCH_LIMIT:
+        return {"success": False, "error": f"At most {CNR_BATCH_LIMIT} CNR numbers per batch"}
+    use_cache = form_data.get("use_cache", "1") not in ("0", "false", "off")
+
+    started = time.perf_counter()
+    results = await run_in_threadpool(lookup_cnrs, cnrs, use_cache)
+    found = sum(1 for result in results if result.get("success"))
+    print(f"🔎 CNR batch: {found}/{len(cnrs)} found in {time.perf_counter() - started:.1f}s")
+    return {
+        "success": True,
+        "results": results,
+        "found": found,
+        "count": len(results),
+        "invalid": invalid,
+        "errors": [f"{r['cnr']}: {r['error']}" for r in results if r.get("error") and not r.get("no_cases")]
+    }
+
+@app.post("/watchlist")
+async def add_to_watchlist(request: Request):
+    """Watch a case for hearing date, stage, history and order changes"""
+    form_data = await request.form()
+    spec = {field: form_data.get(field) for field in watchlist.SPEC_FIELDS}
+    missing = [field for field, value in spec.items() if not value]
+    if missing:
+        return {"success": False, "error": f"Missing fields: {', '.join(missing)}"}
+    
+    entry = watchlist.add(label=form_data.get("label"), **spec)
+    print(f"👀 Watching case #{entry['id']}: {spec['case_type']}/{spec['case_number']}/{spec['case_year']}")
+    return {"success": True, "watch": entry}
+
+@app.get("/watchlist")
+async def get_watchlist():
+    """All watched cases with their last poll time and error"""
+    entries = watchlist.list_watched()
+    return {"success": True, "watchlist": entries, "count": len(entries),
+            "poll_interval": watchlist.POLL_INTERVAL}
+
+@app.get("/watchlist/changes")
+async def get_watchlist_changes(since: int = 0, limit: int = 100, watch_id: int = None):
+    """Changes feed; pass the last seen change id as since to get only newer changes"""
+    changes = watchlist.list_changes(since=since, limit=max(1, min(limit, 1000)), watch_id=watch_id)
+    next_since = changes[-1]["id"] if changes else since
+    return {"success": True, "changes": changes, "count": len(changes), "next_since": next_since}
+
+@app.delete("/watchlist/{watch_id}")
+async def remove_from_watchlist(watch_id: int):
+    """Stop watching a case (its snapshots and changes are removed too)"""
+    if not watchlist.remove(watch_id):
+        return {"success": False, "error": f"No watched case #{watch_id}"}
+    return {"success": True, "message": f"Stopped watching case #{watch_id}"}
+
+@app.post("/watchlist/{watch_id}/poll")
+def poll_watched_case(watch_id: int):
+    """Poll one watched case right away (runs in a pooled browser, off the event loop)"""
+    result = watchlist.poll(watch_id, pooled_case_lookup)
+    if result is None:
+        return {"success": False, "error": f"No watched case #{watch_id}"}
+    return result
+
+def pooled_cause_list_fetch(job):
+    """Fetch one cause list job in a pooled browser"""
+    with pool.browser() as driver:
+        return fetch_cause_lists(driver, job)
+
+@app.post("/cause-lists/fetch")
+async def fetch_cause_lists_endpoint(request: Request):
+    """
+    Fetch, parse and index cause lists.
+    Uses the given state/district/court (and optional court_no), or every court in
+    the cause list config; dates is comma-separated (default tomorrow) and
+    list_types is civ, cri or both.
+    """
+    form_data = await request.form()
+    state = form_data.get("state")
+    district = form_data.get("district")
+    court = form_data.get("court")
+    court_no = form_data.get("court_no")
+    dates = form_data.get("dates")
+    list_types = form_data.get("list_types")
+    force = form_data.get("force") in ("1", "true", "on")
+    
+    if state and district and court:
+        courts = [{"state": state, "district": district, "court": court, "court_no": court_no}]
+    else:
+        courts = cause_list.load_config()
+    if not courts:
+        return {"success": False, "error": f"No court given and no courts configured in {cause_list.CONFIG_PATH}"}
+    
+    date_list = [value.strip() for value in (dates or cause_list.tomorrow()).split(",") if value.strip()]
+    types = [value.strip() for value in (list_types or ",".join(cause_list.LIST_TYPES)).split(",") if value.strip()]
+    
+    try:
+        jobs = cause_list.make_jobs(courts, date_list, types)
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    # Browsers are blocking - run the pipeline off the event loop
+    summaries = await run_in_threadpool(cause_list.run_pipeline, jobs, pooled_cause_list_fetch,
+                                        max_workers=min(cause_list.WORKERS, pool.size), force=force)
+    return {
+        "success": True,
+        "jobs": summaries,
+        "lists": sum(summary["lists"] for summary in summaries),
+        "rows": sum(summary["rows"] for summary in summaries),
+        "errors": [summary["error"] for summary in summaries if summary.get("error")]
+    }
+
+@app.get("/cause-lists")
+async def get_cause_lists(date: str = None, court: str = None):
+    """Cause lists fetched so far"""
+    lists = cause_list.list_cause_lists(list_date=date, court=court)
+    return {"success": True, "cause_lists": lists, "count": len(lists)}
+
+@app.get("/cause-lists/listings")
+async def get_cause_list_listings(date: str = None, cnr: str = None, case_number: str = None,
+                                  case_year: str = None, limit: int = 200):
+    """Listed cases by date, CNR or case number - answered from the local index"""
+    listings = cause_list.find_listings(list_date=date, cnrs=[cnr] if cnr else None,
+                                        case_number=case_number, case_year=case_year,
+                                        limit=max(1, min(limit, 5000)))
+    return {"success": True, "listings": listings, "count": len(listings)}
+
+@app.get("/cause-lists/watched")
+async def get_watched_listings(date: str = None):
+    """Which watched cases are listed on a date (default tomorrow)"""
+    list_date = date or cause_list.tomorrow()
+    cases = [
+        {"cnr": entry["cnr"], "court": entry["court"],
+         "case_number": entry["case_number"].lstrip("0") or "0", "case_year": entry["case_year"]}
+        for entry in watchlist.list_watched()
+    ]
+    listings = cause_list.listed_cases(list_date, cases)
+    return {"success": True, "date": list_date, "listings": listings, "count": len(listings)}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Step latency histograms plus limiter, breaker and pool state in Prometheus text format"""
+    limiter = rate_limiter.stats()
+    breakers = resilience.stats()
+    pool_stats = pool.stats()
+    watchdog_stats = browser_watchdog.stats()
+    extra = (
+        metrics.gauge("ecourts_rate_limit_per_second", "Current adaptive request rate",
+                      [({"bucket": name}, bucket["rate"]) for name, bucket in limiter["buckets"].items()])
+        + metrics.gauge("ecourts_rate_limit_ceiling_per_second", "Rate at which the portal last pushed back",
+                        [({"bucket": name}, bucket["ceiling"]) for name, bucket in limiter["buckets"].items()])
+        + metrics.gauge("ecourts_circuit_open", "1 while a portal endpoint's circuit is not closed",
+                        [({"endpoint": name}, int(breaker["state"] != "closed")) for name, breaker in breakers.items()])
+        + metrics.gauge("ecourts_browser_pool", "Pooled browsers by state",
+                        [({"state": "idle"}, pool_stats["idle"]), ({"state": "in_use"}, pool_stats["in_use"])])
+        + metrics.counter("ecourts_browser_recycled_total", "Pooled browsers retired by the recycling policy",
+                          [({"reason": reason}, count) for reason, count in pool_stats["recycled"].items()])
+        + metrics.gauge("ecourts_browser_rss_megabytes_max", "Largest last-measured RSS of a pooled browser",
+                        [({}, max((b["rss_mb"] for b in pool_stats["browsers"] if b["rss_mb"] is not None), default=None))])
+        + metrics.counter("ecourts_browser_killed_total", "Browsers killed by the watchdog",
+                          [({"reason": reason}, count) for reason, count in watchdog_stats["killed"].items()])
+        + metrics.counter("ecourts_browser_orphans_reaped_total", "Orphaned Chrome/chromedriver trees reaped",
+                          [({}, watchdog_stats["reaped"])])
+        + metrics.gauge("ecourts_startup_seconds", "Import, warm-up and first request time since boot",
+                        [({"phase": phase, "mode": STARTUP_MODE}, round(seconds, 4) if seconds is not None else None)
+                         for phase, seconds in startup_timings.items()])
+    )
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
+@app.get("/portal-health")
+async def get_portal_health():
+    """Circuit breaker state per portal endpoint"""
+    breakers = resilience.stats()
+    return {
+        "success": True,
+        "healthy": all(breaker["state"] == "closed" for breaker in breakers.values()),
+        "breakers": breakers
+    }
+
+@app.get("/browser-pool")
+async def get_browser_pool():
+    """Pooled browsers with their age, lookups, tabs and RSS, and recycling counts"""
+    return {"success": True, **pool.stats(), "watchdog": browser_watchdog.stats()}
+
+@app.get("/rate-limits")
+async def get_rate_limits():
+    """Current adaptive request rates per portal host and court"""
+    return {"success": True, **rate_limiter.stats()}
+
+def warm_up():
+    """Eager startup: preload Selenium and the OCR engine, launch the pool's browsers and fill the result cache"""
+    started = time.perf_counter()
+    for module in (webdriver, By, Service, Options, WebDriverWait, EC):
+        module.load()
+    
+    try:
+        captcha_recognizer.warm_up()
+    except Exception as e:
+        print(f"⚠️ OCR warm-up failed: {str(e)}")
+    
+    try:
+        launched = pool.warm()
+        print(f"🧩 {launched} pooled browser(s) ready")
+    except Exception as e:
+        print(f"⚠️ Could not launch pooled browsers: {str(e)}")
     
-    # Sort by creation time (newest first)
-    pdf_files.sort(key=lambda x: x['created'], reverse=True)
+    cached = result_cache.preload()
+    startup_timings["warmup"] = time.perf_counter() - started
+    print(f"🔥 Warm-up finished in {startup_timings['warmup']:.1f}s ({cached} cached result(s) loaded)")
+
+@app.on_event("startup")
+async def startup_event():
+    """Start background services"""
+    global app_started
+    print(f"⚡ main imported in {startup_timings['import'] * 1000:.0f} ms (STARTUP_MODE={STARTUP_MODE})")
+    if STARTUP_MODE == "eager":
+        # Runs before uvicorn accepts connections
+        await run_in_threadpool(warm_up)
     
-    return {"pdfs": pdf_files}
+    pdf_store.sync_catalog()
+    result_cache.purge_expired()
+    chrome_profile.remove_stale()
+    hearing_calendar.rebuild_in_background_if_empty(case_store)
+    browser_watchdog.start()
+    search_index.start_background_indexer()
+    watchlist.start_poller(pooled_case_lookup)
+    app_started = time.perf_counter()
 
 @app.post("/stop-session")
 async def stop_session():
@@ -2104,6 +3346,7 @@ async def stop_session():
     
     try:
         if browser:
+            portal_recorder.capture(browser)
             browser.quit()
             browser = None
             print("🛑 Browser session stopped")
@@ -2121,6 +3364,7 @@ async def cleanup_session():
     try:
         if browser:
             print("🧹 Cleaning up browser session due to page unload...")
+            portal_recorder.capture(browser)
             browser.quit()
             browser = None
             print("✅ Browser session cleaned up successfully")
@@ -2144,6 +3388,10 @@ async def shutdown_event():
             print("✅ Browser cleaned up on application shutdown")
     except Exception as e:
         print(f"⚠️ Error during application shutdown cleanup: {str(e)}")
+    
+    pool.close_all()
+
+startup_timings["import"] = time.perf_counter() - IMPORT_STARTED
 
 if __name__ == "__main__":
     print("🏛️ Starting eCourts Browser Automation...")
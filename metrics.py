@@ -0,0 +1,139 @@
+"""
+Latency metrics for the automation steps
+Spans around each step (browser launch, menu clicks, dropdowns, captcha, OCR,
+submit, parsing, extraction, PDF downloads) feed histograms labelled by step
+and court, rendered in the Prometheus text format for /metrics.
+Recording a span is a perf_counter() pair, a bisect and a dict update under a
+lock, so it stays on in production.
+"""
+
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Seconds - portal steps range from sub-second dropdowns to multi-minute lookups
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            snapshot = {labels: (list(counts), total, count)
+                        for labels, (counts, total, count) in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            label_text = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            snapshot = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{{{_labels(self.labelnames, labels)}}} {value}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+step_seconds = Histogram("ecourts_step_duration_seconds",
+                         "Duration of each automation step", ("step", "court"))
+step_total = Counter("ecourts_step_total",
+                     "Automation steps by outcome", ("step", "court", "outcome"))
+
+@contextmanager
+def span(step, court=None):
+    """Time one automation step; exceptions are counted as errors and re-raised"""
+    labels = (step, court or "")
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        step_seconds.observe(time.perf_counter() - started, labels)
+        step_total.inc(labels + ("error",))
+        raise
+    step_seconds.observe(time.perf_counter() - started, labels)
+    step_total.inc(labels + ("ok",))
+
+def timed(step, court_arg=None):
+    """Decorator form of span(); court_arg names the keyword argument holding the court code"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(step, kwargs.get(court_arg) if court_arg else None):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(step, kwargs.get(court_arg) if court_arg else None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _scraped(kind, name, help_text, samples):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        label_text = _labels(labels.keys(), labels.values())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+def gauge(name, help_text, samples):
+    """Render a gauge from [(labels_dict, value), ...] collected at scrape time"""
+    return _scraped("gauge", name, help_text, samples)
+
+def counter(name, help_text, samples):
+    """Render a counter kept elsewhere (e.g. in a pool's stats) from [(labels_dict, value), ...]"""
+    return _scraped("counter", name, help_text, samples)
+
+def render(extra_lines=()):
+    """Everything in the Prometheus text exposition format"""
+    lines = step_seconds.render() + step_total.render() + list(extra_lines)
+    return "\n".join(lines) + "\n"
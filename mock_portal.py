@@ -0,0 +1,187 @@
+"""
+Mock eCourts portal
+Replays a session recorded with ECOURTS_RECORD_DIR (see portal_recorder.py):
+home page, Case Status modal, dropdown XHRs, captcha images with their known
+answers, results tables, case detail pages and order PDFs. Responses can be
+delayed with configurable latency so runs are offline but still realistic.
+
+Usage:
+    python mock_portal.py --recordings recordings/ --port 8001 --latency-ms 300 --jitter-ms 150
+    ECOURTS_BASE_URL=http://localhost:8001/ecourtindia_v6/ python main.py
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+import uvicorn
+
+import portal
+
+RECORDINGS_DIR = os.environ.get("MOCK_RECORDINGS_DIR", "recordings")
+LATENCY_MS = float(os.environ.get("MOCK_LATENCY_MS", "0"))
+JITTER_MS = float(os.environ.get("MOCK_JITTER_MS", "0"))
+# Reject captcha answers that don't match the image served (otherwise any answer passes)
+STRICT_CAPTCHA = os.environ.get("MOCK_STRICT_CAPTCHA", "0") == "1"
+
+# Parameters that change on every request and must not take part in matching
+VOLATILE_PARAMS = {"app_token", "ajax_req", "_", "rnd", "random"}
+CAPTCHA_PARAMS = {"captcha", "case_captcha_code", "fcaptcha_code", "cause_list_captcha_code"}
+CAPTCHA_PATH_MARKERS = ("securimage", "captcha")
+TEXT_MIMES = ("text/", "application/json", "application/javascript", "application/x-javascript")
+
+def _params(text):
+    return [(key, value) for key, value in parse_qsl(text or "", keep_blank_values=True)
+            if key not in VOLATILE_PARAMS and key not in CAPTCHA_PARAMS]
+
+def request_key(method, url):
+    parsed = urlparse(url)
+    return method.upper(), parsed.path, urlencode(sorted(_params(parsed.query)))
+
+def is_captcha(url, mime=None):
+    path = urlparse(url).path.lower()
+    return any(marker in path for marker in CAPTCHA_PATH_MARKERS) and (mime is None or mime.startswith("image/"))
+
+class Recording:
+    """Recorded exchanges indexed by method, path and stable query/body parameters"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.exchanges = {}
+        self.by_path = {}
+        self.captchas = []
+        self.hits = 0
+        self.misses = []
+        self._load()
+        self._captcha_cycle = itertools.cycle(self.captchas) if self.captchas else None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        path = self.directory / "exchanges.jsonl"
+        if not path.exists():
+            raise FileNotFoundError(f"No recording at {path} - record one with ECOURTS_RECORD_DIR")
+
+        last_captcha = None
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                exchange = json.loads(line)
+                if exchange.get("kind") == "captcha_answer":
+                    if last_captcha is not None and exchange["accepted"]:
+                        self.captchas.append((last_captcha, exchange["answer"]))
+                        last_captcha = None
+                    continue
+
+                if is_captcha(exchange["url"], exchange.get("mime") or ""):
+                    last_captcha = exchange
+                    continue
+
+                key = request_key(exchange["method"], exchange["url"])
+                body = tuple(sorted(_params(exchange.get("post_data"))))
+                # Later recordings of the same request win
+                self.exchanges.setdefault(key, {})[body] = exchange
+                self.by_path.setdefault((key[0], key[1]), []).append(exchange)
+
+        print(f"🎞️ Loaded {sum(len(v) for v in self.exchanges.values())} exchange(s) "
+              f"and {len(self.captchas)} captcha(s) from {self.directory}")
+
+    def body(self, exchange):
+        return (self.directory / "bodies" / exchange["body"]).read_bytes()
+
+    def next_captcha(self):
+        if self._captcha_cycle is None:
+            return None, None
+        with self._lock:
+            return next(self._captcha_cycle)
+
+    def find(self, method, url, post_data):
+        key = request_key(method, url)
+        body = set(_params(post_data))
+        candidates = self.exchanges.get(key)
+        if candidates:
+            exact = candidates.get(tuple(sorted(body)))
+            if exact is not None:
+                return exact
+            # Closest body: most shared parameters
+            return max(candidates.items(), key=lambda item: len(body & set(item[0])))[1]
+
+        # Same path with different query: the most recent recording of it
+        same_path = self.by_path.get((key[0], key[1]))
+        return same_path[-1] if same_path else None
+
+def create_app(recording, latency_ms=LATENCY_MS, jitter_ms=JITTER_MS, strict_captcha=STRICT_CAPTCHA):
+    app = FastAPI(title="Mock eCourts Portal")
+    live_origin = "{0.scheme}://{0.netloc}".format(urlparse(portal.LIVE_BASE_URL))
+    # client address -> answer of the captcha last served to it
+    served_answers = {}
+
+    async def delay():
+        if latency_ms or jitter_ms:
+            await asyncio.sleep(max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000)
+
+    @app.get("/__mock__/stats")
+    async def stats():
+        return {"hits": recording.hits, "misses": len(recording.misses),
+                "recent_misses": recording.misses[-20:], "captchas": len(recording.captchas)}
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def replay(path: str, request: Request):
+        await delay()
+        url = str(request.url)
+        client = request.client.host if request.client else ""
+
+        if is_captcha(url):
+            exchange, answer = recording.next_captcha()
+            if exchange is None:
+                return Response(status_code=404)
+            served_answers[client] = answer
+            return Response(recording.body(exchange), media_type=exchange.get("mime") or "image/png")
+
+        post_data = (await request.body()).decode("utf-8", "replace") if request.method == "POST" else None
+        submitted = {key: value for key, value in parse_qsl(post_data or "") if key in CAPTCHA_PARAMS}
+        if strict_captcha and submitted:
+            expected = served_answers.get(client)
+            if expected is not None and expected not in submitted.values():
+                return JSONResponse({"status": 0, "errormsg": "Invalid Captcha"})
+
+        exchange = recording.find(request.method, url, post_data)
+        if exchange is None:
+            recording.misses.append(f"{request.method} {url}")
+            print(f"❓ No recording for {request.method} {url}")
+            return Response("Not recorded", status_code=404)
+
+        recording.hits += 1
+        content = recording.body(exchange)
+        mime = exchange.get("mime") or "application/octet-stream"
+        if mime.startswith(TEXT_MIMES):
+            # Keep the browser on the mock: rewrite absolute links to the live portal
+            mock_origin = f"{request.url.scheme}://{request.url.netloc}"
+            content = content.replace(live_origin.encode(), mock_origin.encode())
+        return Response(content, status_code=exchange.get("status") or 200, media_type=mime)
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded eCourts session")
+    parser.add_argument("--recordings", default=RECORDINGS_DIR, help="Directory written by record mode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS, help="Mean injected latency")
+    parser.add_argument("--jitter-ms", type=float, default=JITTER_MS, help="Standard deviation of latency")
+    parser.add_argument("--strict-captcha", action="store_true", default=STRICT_CAPTCHA,
+                        help="Reject captcha answers that don't match the recorded answer")
+    args = parser.parse_args()
+
+    app = create_app(Recording(args.recordings), args.latency_ms, args.jitter_ms, args.strict_captcha)
+    print(f"🎭 Mock portal at http://{args.host}:{args.port}/ecourtindia_v6/")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Resumable PDF downloads
+Partial downloads live in downloads/.partial/ with a JSON sidecar tracking the
+byte offset and validators, and are resumed with HTTP Range requests
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import requests
+
+import pdf_store
+import portal_recorder
+import rate_limiter
+import resilience
+import metrics
+
+PARTIAL_DIR = pdf_store.DOWNLOADS_DIR / ".partial"
+
+# Suffixes Chrome and we use for in-progress downloads
+INCOMPLETE_SUFFIXES = (".crdownload", ".part", ".tmp", ".download")
+
+CHUNK_SIZE = 64 * 1024
+SAVE_EVERY = 1024 * 1024  # persist the offset after every MB written
+
+def _paths(url):
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return PARTIAL_DIR / f"{key}.part", PARTIAL_DIR / f"{key}.json"
+
+def _load_state(meta_path, url):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("url") == url:
+            return state
+    except (OSError, ValueError):
+        pass
+    return {"url": url, "offset": 0, "total": None, "etag": None, "last_modified": None}
+
+def _save_state(meta_path, state):
+    temp_path = f"{meta_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, meta_path)
+
+def discard_partial(url):
+    """Remove any partial data kept for a URL"""
+    for path in _paths(url):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def is_incomplete(filename):
+    """True for browser/partial download names that must not be treated as finished files"""
+    return filename.endswith(INCOMPLETE_SUFFIXES) or filename.startswith(".")
+
+def validate_pdf(path):
+    """Check the %PDF header and %%EOF trailer. Returns (ok, reason)."""
+    try:
+        size = os.path.getsize(path)
+        if size < 8:
+            return False, f"file too small ({size} bytes)"
+
+        with open(path, "rb") as f:
+            header = f.read(5)
+            f.seek(max(0, size - 1024))
+            tail = f.read()
+    except OSError as e:
+        return False, str(e)
+
+    if not header.startswith(b"%PDF"):
+        return False, f"bad header {header!r}"
+    if b"%%EOF" not in tail:
+        return False, "missing %%EOF trailer (truncated?)"
+    return True, "ok"
+
+def _parse_total(response, offset):
+    """Total file size from Content-Range (206) or Content-Length (200)"""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return offset + int(length)
+    return None
+
+@metrics.timed("pdf_http")
+def download_resumable(url, cookies=None, headers=None, max_attempts=4, timeout=30):
+    """
+    Download url into a partial file, resuming from the last byte offset on retry.
+    Returns the path of a validated PDF ready to be promoted, or None.
+    """
+    PARTIAL_DIR.mkdir(parents=True, exist_ok=True)
+    part_path, meta_path = _paths(url)
+    state = _load_state(meta_path, url)
+
+    for attempt in range(1, max_attempts + 1):
+        # The bytes on disk are the source of truth for the offset
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        state["offset"] = offset
+
+        if state["total"] is not None and offset >= state["total"]:
+            break
+
+        category = resilience.TRANSIENT
+        request_headers = dict(headers or {})
+        if offset > 0:
+            request_headers["Range"] = f"bytes={offset}-"
+            validator = state.get("etag") or state.get("last_modified")
+            if validator:
+                request_headers["If-Range"] = validator
+            print(f"⏯️ Resuming download at byte {offset} (attempt {attempt})")
+
+        try:
+            with resilience.guard("pdf"), rate_limiter.limited("pdf", host=rate_limiter.host_of(url)) as call:
+                response = requests.get(url, cookies=cookies, headers=request_headers,
+                                        stream=True, timeout=timeout)
+                call.throttled = rate_limiter.is_throttle_status(response.status_code)
+                if call.throttled:
+                    raise resilience.PortalThrottled(f"HTTP {response.status_code}")
+
+            if response.status_code == 416:
+                # Nothing left to send - either complete or our partial is stale
+                total = _parse_total(response, 0)
+                if total is not None and offset == total:
+                    state["total"] = total
+                    break
+                print("⚠️ Range not satisfiable, restarting download")
+                discard_partial(url)
+                state = _load_state(meta_path, url)
+                continue
+
+            if response.status_code == 206:
+                mode = "ab"
+            elif response.status_code == 200:
+                # Server ignored the Range header or the file changed - start over
+                if offset > 0:
+                    print("ℹ️ Server does not support resume here, restarting from zero")
+                mode = "wb"
+                offset = 0
+            else:
+                print(f"❌ PDF download failed: HTTP {response.status_code}")
+                return None
+
+            state["total"] = _parse_total(response, offset)
+            state["etag"] = response.headers.get("ETag") or state.get("etag")
+            state["last_modified"] = response.headers.get("Last-Modified") or state.get("last_modified")
+            state["offset"] = offset
+            _save_state(meta_path, state)
+
+            unsaved = 0
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    state["offset"] += len(chunk)
+                    unsaved += len(chunk)
+                    if unsaved >= SAVE_EVERY:
+                        f.flush()
+                        _save_state(meta_path, state)
+                        unsaved = 0
+                f.flush()
+                os.fsync(f.fileno())
+            _save_state(meta_path, state)
+
+            if state["total"] is None or state["offset"] >= state["total"]:
+                break
+
+            print(f"⚠️ Connection closed early at {state['offset']}/{state['total']} bytes")
+
+        except resilience.CircuitOpenError as e:
+            print(f"⛔ {str(e)}, keeping partial for later")
+            return None
+        except Exception as e:
+            category = resilience.classify(e)
+            if category == resilience.PERMANENT:
+                raise
+            print(f"⚠️ Download interrupted at byte {state['offset']} ({category}): {str(e)}")
+            _save_state(meta_path, state)
+
+        if attempt < max_attempts:
+            time.sleep(resilience.backoff_delay(attempt, category))
+    else:
+        print(f"❌ Download incomplete after {max_attempts} attempts, keeping partial for later")
+        return None
+
+    ok, reason = validate_pdf(part_path)
+    if not ok:
+        print(f"⚠️ Downloaded file failed PDF validation: {reason}")
+        discard_partial(url)
+        return None
+    portal_recorder.record_file(url, part_path, "application/pdf")
+
+    try:
+        os.remove(meta_path)
+    except OSError:
+        pass
+    return part_path
@@ -0,0 +1,154 @@
+"""
+HTTP responses for stored PDFs
+Byte ranges (206), strong ETags from content hashes and conditional GETs,
+so repeat views and page-by-page browsing don't re-transfer whole files
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+
+# Content-addressed files never change, so browsers may cache them for a year
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Legacy files whose hashes are remembered (least recently served are dropped first)
+HASH_CACHE_ENTRIES = int(os.environ.get("PDF_HASH_CACHE_ENTRIES", "4096"))
+
+# path -> (size, mtime, sha256) for files that aren't content-addressed
+_hash_lock = threading.Lock()
+_hash_cache = OrderedDict()
+
+def file_sha256(path, stat):
+    """Hash a legacy file once per (size, mtime)"""
+    path = str(path)
+    with _hash_lock:
+        entry = _hash_cache.get(path)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime):
+            _hash_cache.move_to_end(path)
+            return entry[2]
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    with _hash_lock:
+        # Replaces the entry of an older version of the same file
+        _hash_cache[path] = (stat.st_size, stat.st_mtime, digest)
+        _hash_cache.move_to_end(path)
+        while len(_hash_cache) > HASH_CACHE_ENTRIES:
+            _hash_cache.popitem(last=False)
+    return digest
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison is correct for If-None-Match
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+def _not_modified_since(if_modified_since, mtime):
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= int(since)
+
+def parse_range(range_header, size):
+    """
+    Parse a single 'bytes=' range. Returns (start, end) inclusive, None to
+    ignore the header (serve the full file), or 'unsatisfiable'.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec:
+        # Multipart ranges aren't worth the complexity here - send the whole file
+        return None
+
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if start_text == "":
+            suffix = int(end_text)
+            if suffix <= 0:
+                return "unsatisfiable"
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+def _iter_file(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def pdf_file_response(request, path, download_name, sha256=None, immutable=False, inline=False):
+    """Serve a PDF honouring Range, If-Range, If-None-Match and If-Modified-Since"""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'"{sha256 or file_sha256(path, stat)}"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    disposition = "inline" if inline else "attachment"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+        "Content-Disposition": f'{disposition}; filename="{download_name}"',
+    }
+
+    # Conditional GET: If-None-Match takes precedence over If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        if _not_modified_since(request.headers["if-modified-since"], stat.st_mtime):
+            return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), size)
+
+    # If-Range: only honour the range if the client's copy is still current
+    if_range = request.headers.get("if-range")
+    if byte_range is not None and if_range and if_range not in (etag, last_modified):
+        byte_range = None
+
+    if byte_range == "unsatisfiable":
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        # Full file - FileResponse uses the server's zero-copy path when it offers one
+        return FileResponse(path=str(path), media_type="application/pdf", headers=headers,
+                            stat_result=stat, method=request.method)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=206, headers=headers, media_type="application/pdf")
+    return StreamingResponse(_iter_file(path, start, length), status_code=206,
+                             headers=headers, media_type="application/pdf")
@@ -0,0 +1,469 @@
+"""
+Content-addressed PDF store
+PDFs are keyed by SHA-256 and sharded by hash prefix under downloads/store/,
+with order metadata (CNR, order number, order date, source URL) kept in SQLite
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import db
+
+DOWNLOADS_DIR = Path(os.getcwd()) / "downloads"
+STORE_DIR = DOWNLOADS_DIR / "store"
+INDEX_PATH = db.DATA_DIR / "pdf_store.db"
+
+_SHA_FILENAME = re.compile(r"^([0-9a-f]{64})\.pdf$")
+
+_lock = threading.Lock()
+_conn = None
+
+def _db():
+    """Lazily open the index and create its tables"""
+    global _conn
+    if _conn is None:
+        _conn = db.connect(INDEX_PATH)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY,
+                cnr TEXT,
+                order_number TEXT,
+                order_date TEXT,
+                source_url TEXT,
+                display_name TEXT,
+                sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+                created REAL NOT NULL,
+                UNIQUE (cnr, order_number, order_date)
+            );
+            CREATE INDEX IF NOT EXISTS idx_orders_cnr ON orders(cnr, order_number);
+            CREATE INDEX IF NOT EXISTS idx_orders_url ON orders(source_url);
+            CREATE INDEX IF NOT EXISTS idx_orders_sha ON orders(sha256);
+
+            -- One row per listable file, kept up to date as files are written
+            CREATE TABLE IF NOT EXISTS catalog (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                sha256 TEXT UNIQUE,
+                filename TEXT NOT NULL,
+                download_url TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                cnr TEXT,
+                order_number TEXT,
+                order_date TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_catalog_created ON catalog(created, id);
+            CREATE INDEX IF NOT EXISTS idx_catalog_size ON catalog(size, id);
+            CREATE INDEX IF NOT EXISTS idx_catalog_filename ON catalog(filename, id);
+            CREATE INDEX IF NOT EXISTS idx_catalog_order_date ON catalog(order_date, id);
+            CREATE INDEX IF NOT EXISTS idx_catalog_cnr ON catalog(cnr, created, id);
+        """)
+    return _conn
+
+def blob_path(sha256):
+    """Sharded location of a blob: store/ab/cd/abcd....pdf"""
+    return STORE_DIR / sha256[:2] / sha256[2:4] / f"{sha256}.pdf"
+
+def store_filename(sha256):
+    """Public filename used in /serve-pdf URLs"""
+    return f"{sha256}.pdf"
+
+def resolve_filename(filename):
+    """Map a /serve-pdf filename to a path on disk (store first, then legacy flat files)"""
+    match = _SHA_FILENAME.match(filename)
+    if match:
+        path = blob_path(match.group(1))
+        return path if path.exists() else None
+
+    legacy_path = DOWNLOADS_DIR / filename
+    return legacy_path if legacy_path.exists() else None
+
+def _record(row):
+    sha256 = row["sha256"]
+    return {
+        "sha256": sha256,
+        "cnr": row["cnr"] or None,
+        "order_number": row["order_number"] or None,
+        "order_date": row["order_date"] or None,
+        "source_url": row["source_url"],
+        "filename": row["display_name"] or store_filename(sha256),
+        "download_url": f"/serve-pdf/{store_filename(sha256)}",
+        "local_path": str(blob_path(sha256)),
+        "size": row["size"],
+        "created": row["created"],
+    }
+
+def _lookup(where, params):
+    with _lock:
+        row = _db().execute(
+            "SELECT o.*, b.size FROM orders o JOIN blobs b ON b.sha256 = o.sha256 "
+            f"WHERE {where} ORDER BY o.created DESC LIMIT 1",
+            params
+        ).fetchone()
+    if row and blob_path(row["sha256"]).exists():
+        return _record(row)
+    return None
+
+def find_order(cnr, order_number, order_date=None):
+    """Find an already stored order PDF by CNR and order number"""
+    if not cnr or cnr == "Not found":
+        return None
+    if order_date:
+        return _lookup("o.cnr = ? AND o.order_number = ? AND o.order_date = ?",
+                       (cnr, str(order_number), order_date))
+    return _lookup("o.cnr = ? AND o.order_number = ?", (cnr, str(order_number)))
+
+def find_by_url(source_url):
+    """Find an already stored PDF by the portal URL it was fetched from"""
+    if not source_url:
+        return None
+    return _lookup("o.source_url = ?", (source_url,))
+
+def latest_record(sha256):
+    """Most recent order metadata recorded for a blob, or None"""
+    return _lookup("o.sha256 = ?", (sha256,))
+
+def get_blob(sha256):
+    """Return size/created for a stored blob, or None"""
+    with _lock:
+        row = _db().execute("SELECT * FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    return dict(row) if row else None
+
+def display_name_for(sha256):
+    """Human-friendly download name for a blob, if one was recorded"""
+    with _lock:
+        row = _db().execute(
+            "SELECT display_name FROM orders WHERE sha256 = ? AND display_name IS NOT NULL "
+            "ORDER BY created DESC LIMIT 1",
+            (sha256,)
+        ).fetchone()
+    return row["display_name"] if row else None
+
+def _upsert_order(conn, cnr, order_number, order_date, source_url, display_name, sha256, now):
+    """Record which order a blob belongs to"""
+    order_number = str(order_number) if order_number not in (None, "") else None
+    if cnr and cnr != "Not found" and order_number:
+        conn.execute(
+            "INSERT INTO orders (cnr, order_number, order_date, source_url, display_name, sha256, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (cnr, order_number, order_date) DO UPDATE SET "
+            "source_url = excluded.source_url, display_name = excluded.display_name, "
+            "sha256 = excluded.sha256, created = excluded.created",
+            # An empty string rather than NULL so the UNIQUE key dedupes orders without a date
+            (cnr, order_number, order_date or "", source_url, display_name, sha256, now)
+        )
+        return
+
+    # Without a CNR and order number there is no order key: the NULLs keep such rows
+    # apart in the UNIQUE index, and a row is only reused for the same blob and URL
+    row = conn.execute(
+        "SELECT id FROM orders WHERE sha256 = ? AND source_url IS ? AND (cnr IS NULL OR order_number IS NULL) "
+        "ORDER BY created DESC LIMIT 1",
+        (sha256, source_url)
+    ).fetchone()
+    if row:
+        conn.execute("UPDATE orders SET display_name = COALESCE(?, display_name), created = ? WHERE id = ?",
+                     (display_name, now, row["id"]))
+    else:
+        conn.execute(
+            "INSERT INTO orders (cnr, order_number, order_date, source_url, display_name, sha256, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cnr or None, order_number, order_date or None, source_url, display_name, sha256, now)
+        )
+
+def _promote(temp_path, sha256, size, cnr, order_number, order_date, source_url, display_name):
+    """Atomically move a fully written temp file into the store and index it"""
+    target = blob_path(sha256)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    if target.exists():
+        # Same content already stored - dedupe
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, target)
+
+    now = time.time()
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, size, created) VALUES (?, ?, ?)",
+                (sha256, size, now)
+            )
+            _upsert_order(conn, cnr, order_number, order_date, source_url, display_name, sha256, now)
+            row = conn.execute(
+                "SELECT o.*, b.size FROM orders o JOIN blobs b ON b.sha256 = o.sha256 "
+                "WHERE o.sha256 = ? ORDER BY o.created DESC LIMIT 1",
+                (sha256,)
+            ).fetchone()
+            record = _record(row)
+            _catalog_upsert(conn, record)
+
+    print(f"🗄️ Stored PDF {sha256[:12]}… ({size} bytes)")
+    return record
+
+def _temp_file():
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=STORE_DIR)
+    return os.fdopen(fd, "wb"), temp_path
+
+def write_stream(chunks, cnr=None, order_number=None, order_date=None,
+                 source_url=None, display_name=None):
+    """
+    Write an iterable of byte chunks into the store.
+    Returns the stored record, or None if the content is not a PDF.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    header = b""
+
+    f, temp_path = _temp_file()
+    try:
+        with f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if len(header) < 4:
+                    header += chunk[:4 - len(header)]
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if header != b"%PDF":
+            print(f"⚠️ Content doesn't appear to be a PDF. First bytes: {header}")
+            os.remove(temp_path)
+            return None
+
+        return _promote(temp_path, hasher.hexdigest(), size, cnr, order_number,
+                        order_date, source_url, display_name)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def put_file(src_path, cnr=None, order_number=None, order_date=None,
+             source_url=None, display_name=None, move=True):
+    """Add an existing file (e.g. a Chrome download) to the store"""
+    src_path = Path(src_path)
+    hasher = hashlib.sha256()
+    with open(src_path, "rb") as f:
+        header = f.read(4)
+        hasher.update(header)
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+
+    if header != b"%PDF":
+        print(f"⚠️ File doesn't appear to be a PDF. First bytes: {header}")
+        return None
+
+    size = src_path.stat().st_size
+    f, temp_path = _temp_file()
+    f.close()
+    if move and _same_device(src_path):
+        os.replace(src_path, temp_path)
+    elif move:
+        _copy(src_path, temp_path, remove=True)
+    else:
+        _copy(src_path, temp_path)
+
+    return _promote(temp_path, hasher.hexdigest(), size, cnr, order_number,
+                    order_date, source_url, display_name or src_path.name)
+
+def _same_device(path):
+    return os.stat(path).st_dev == os.stat(STORE_DIR).st_dev
+
+def _copy(src_path, temp_path, remove=False):
+    with open(src_path, "rb") as src, open(temp_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b""):
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    if remove:
+        os.remove(src_path)
+
+def _iso_date(value):
+    """Normalize portal dates like 07-07-2025 to 2025-07-07 so they sort and range-filter"""
+    if not value:
+        return None
+    parts = value.strip().replace("/", "-").split("-")
+    if len(parts) == 3 and all(part.isdigit() for part in parts) and len(parts[2]) == 4:
+        return f"{parts[2]}-{int(parts[1]):02d}-{int(parts[0]):02d}"
+    return value.strip()
+
+def _catalog_upsert(conn, record):
+    conn.execute(
+        "INSERT INTO catalog (path, sha256, filename, download_url, size, created, cnr, order_number, order_date) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (path) DO UPDATE SET filename = excluded.filename, size = excluded.size, "
+        "created = excluded.created, cnr = excluded.cnr, order_number = excluded.order_number, "
+        "order_date = excluded.order_date",
+        (record["local_path"], record["sha256"], record["filename"], record["download_url"],
+         record["size"], record["created"], record["cnr"], record["order_number"],
+         _iso_date(record["order_date"]))
+    )
+
+def sync_catalog():
+    """
+    Backfill the catalog with store blobs and flat downloads/*.pdf files written
+    before it existed. Runs once at startup; listing never touches the filesystem.
+    """
+    blobs = list_blobs()
+    legacy_files = list(DOWNLOADS_DIR.glob("*.pdf")) if DOWNLOADS_DIR.exists() else []
+
+    added = 0
+    with _lock:
+        conn = _db()
+        known = {row["path"]: row["sha256"] for row in conn.execute("SELECT path, sha256 FROM catalog")}
+        with conn:
+            for record in blobs:
+                if record["local_path"] not in known:
+                    _catalog_upsert(conn, record)
+                    added += 1
+
+            present = set()
+            for file_path in legacy_files:
+                path = str(file_path)
+                present.add(path)
+                if path in known:
+                    continue
+                stat = file_path.stat()
+                _catalog_upsert(conn, {
+                    "local_path": path,
+                    "sha256": None,
+                    "filename": file_path.name,
+                    "download_url": f"/serve-pdf/{file_path.name}",
+                    "size": stat.st_size,
+                    "created": stat.st_ctime,
+                    "cnr": None,
+                    "order_number": None,
+                    "order_date": None,
+                })
+                added += 1
+
+            # Legacy files deleted by hand since the last start
+            for path, sha256 in known.items():
+                if sha256 is None and path not in present:
+                    conn.execute("DELETE FROM catalog WHERE path = ?", (path,))
+
+    if added:
+        print(f"🗂️ Registered {added} PDF(s) in the catalog")
+    return added
+
+SORT_COLUMNS = {
+    "created": "created",
+    "size": "size",
+    "filename": "filename",
+    "order_date": "order_date",
+}
+
+def _encode_cursor(value, row_id):
+    raw = json.dumps([value, row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_cursor(cursor):
+    """(sort value, row id) from a cursor made by _encode_cursor; ValueError for anything else"""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor") from None
+    if (not isinstance(decoded, list) or len(decoded) != 2
+            or not isinstance(decoded[0], (str, int, float)) or isinstance(decoded[0], bool)
+            or not isinstance(decoded[1], int) or isinstance(decoded[1], bool)):
+        raise ValueError("Invalid cursor")
+    return decoded[0], decoded[1]
+
+def list_catalog(limit=50, cursor=None, sort="created", order="desc", cnr=None,
+                 created_from=None, created_to=None, order_date_from=None, order_date_to=None,
+                 min_size=None, max_size=None):
+    """
+    Keyset-paginated listing of stored PDFs.
+    Each page is a single indexed range scan, so cost doesn't grow with folder size.
+    Returns (items, next_cursor).
+    """
+    column = SORT_COLUMNS.get(sort)
+    if not column:
+        raise ValueError(f"Unsupported sort field: {sort}")
+    descending = order.lower() != "asc"
+    comparison = "<" if descending else ">"
+    direction = "DESC" if descending else "ASC"
+
+    clauses = []
+    params = []
+    if cnr:
+        clauses.append("cnr = ?")
+        params.append(cnr)
+    if created_from is not None:
+        clauses.append("created >= ?")
+        params.append(created_from)
+    if created_to is not None:
+        clauses.append("created < ?")
+        params.append(created_to)
+    if order_date_from:
+        clauses.append("order_date >= ?")
+        params.append(_iso_date(order_date_from))
+    if order_date_to:
+        clauses.append("order_date <= ?")
+        params.append(_iso_date(order_date_to))
+    if min_size is not None:
+        clauses.append("size >= ?")
+        params.append(min_size)
+    if max_size is not None:
+        clauses.append("size <= ?")
+        params.append(max_size)
+    if cursor:
+        value, row_id = _decode_cursor(cursor)
+        clauses.append(f"({column}, id) {comparison} (?, ?)")
+        params += [value, row_id]
+    if column == "order_date":
+        clauses.append("order_date IS NOT NULL")
+
+    sql = "SELECT * FROM catalog"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {column} {direction}, id {direction} LIMIT ?"
+    params.append(limit + 1)
+
+    with _lock:
+        rows = _db().execute(sql, params).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{
+        "filename": row["filename"],
+        "size": row["size"],
+        "created": row["created"],
+        "download_url": row["download_url"],
+        "sha256": row["sha256"],
+        "cnr": row["cnr"],
+        "order_number": row["order_number"],
+        "order_date": row["order_date"],
+    } for row in rows]
+
+    next_cursor = _encode_cursor(rows[-1][column], rows[-1]["id"]) if has_more else None
+    return items, next_cursor
+
+def list_blobs():
+    """All stored PDFs with their most recent order metadata"""
+    with _lock:
+        rows = _db().execute(
+            # LEFT JOIN: a blob whose order rows are gone is still listed, without metadata
+            "SELECT b.sha256, b.size, COALESCE(o.created, b.created) AS created, o.cnr, o.order_number, "
+            "o.order_date, o.source_url, o.display_name FROM blobs b LEFT JOIN orders o ON o.id = ("
+            "  SELECT id FROM orders WHERE sha256 = b.sha256 ORDER BY created DESC LIMIT 1"
+            ") ORDER BY b.created DESC"
+        ).fetchall()
+    return [_record(row) for row in rows]
@@ -0,0 +1,13 @@
+"""
+Where the eCourts portal lives
+ECOURTS_BASE_URL points the app at a stand-in such as mock_portal.py
+instead of services.ecourts.gov.in
+"""
+
+import os
+from urllib.parse import urlparse
+
+LIVE_BASE_URL = "https://services.ecourts.gov.in/ecourtindia_v6/"
+
+BASE_URL = os.environ.get("ECOURTS_BASE_URL", LIVE_BASE_URL).rstrip("/") + "/"
+HOST = urlparse(BASE_URL).netloc
@@ -0,0 +1,116 @@
+"""
+Record mode for building mock portal captures
+With ECOURTS_RECORD_DIR set, every browser is started with Chrome's network
+performance log enabled. After each automation step the log is drained and
+each page and XHR exchange (request body included) is written to
+<dir>/exchanges.jsonl, with response bodies stored once per content hash in
+<dir>/bodies/. Captcha answers and downloaded PDFs are recorded as well, so
+mock_portal.py can replay a whole session offline.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+RECORD_DIR = os.environ.get("ECOURTS_RECORD_DIR")
+
+# Resource types worth replaying (scripts, styles and fonts are fetched too)
+RECORDED_TYPES = {"Document", "XHR", "Fetch", "Image", "Script", "Stylesheet", "Font", "Other"}
+
+_lock = threading.Lock()
+# driver session id -> {request_id: request info} waiting for their response
+_pending = {}
+
+def enabled():
+    return bool(RECORD_DIR)
+
+def configure(chrome_options):
+    """Turn on Chrome's network log for a browser that is about to be launched"""
+    if enabled():
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        print(f"⏺️ Recording portal traffic to {RECORD_DIR}")
+
+def _store_body(data):
+    digest = hashlib.sha256(data).hexdigest()
+    path = Path(RECORD_DIR) / "bodies" / digest
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    return digest
+
+def _append(exchange):
+    Path(RECORD_DIR).mkdir(parents=True, exist_ok=True)
+    with _lock:
+        with open(Path(RECORD_DIR) / "exchanges.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(exchange, ensure_ascii=False) + "\n")
+
+def capture(browser):
+    """Drain the browser's network log and write out every finished exchange"""
+    if not enabled() or browser is None:
+        return 0
+    try:
+        entries = browser.get_log("performance")
+    except Exception as e:
+        print(f"⚠️ Could not read network log for recording: {str(e)}")
+        return 0
+
+    with _lock:
+        pending = _pending.setdefault(browser.session_id, {})
+
+    recorded = 0
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        method = message.get("method")
+        params = message.get("params", {})
+
+        if method == "Network.requestWillBeSent":
+            request = params["request"]
+            pending[params["requestId"]] = {
+                "method": request["method"],
+                "url": request["url"],
+                "post_data": request.get("postData"),
+                "type": params.get("type"),
+            }
+        elif method == "Network.responseReceived":
+            info = pending.get(params["requestId"])
+            if info is not None:
+                response = params["response"]
+                info.update(status=response["status"], mime=response.get("mimeType"),
+                            type=params.get("type") or info.get("type"))
+        elif method == "Network.loadingFinished":
+            info = pending.pop(params["requestId"], None)
+            if not info or "status" not in info or info["url"].startswith("data:"):
+                continue
+            if info.get("type") not in RECORDED_TYPES:
+                continue
+            try:
+                body = browser.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+            except Exception:
+                # Redirects and evicted bodies have nothing to fetch
+                continue
+            data = (base64.b64decode(body["body"]) if body.get("base64Encoded")
+                    else body["body"].encode("utf-8"))
+            _append(dict(info, body=_store_body(data), recorded=time.time()))
+            recorded += 1
+    return recorded
+
+def note_captcha(browser, answer, accepted):
+    """
+    Remember the answer submitted for the captcha currently shown, so the mock
+    can pair it with the last captcha image recorded before it
+    """
+    if enabled():
+        capture(browser)
+        _append({"kind": "captcha_answer", "answer": answer, "accepted": accepted, "recorded": time.time()})
+
+def record_file(url, path, mime, method="GET"):
+    """Record a response fetched outside the browser (resumable PDF downloads)"""
+    if enabled():
+        _append({"method": method, "url": url, "post_data": None, "status": 200, "mime": mime,
+                 "type": "Document", "body": _store_body(Path(path).read_bytes()), "recorded": time.time()})
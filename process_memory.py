@@ -0,0 +1,92 @@
+"""
+Resident memory of processes and their children
+Uses psutil when it is installed and /proc otherwise (Linux), so browser
+recycling, the watchdog and the benchmarks can see the Chrome process tree
+and how much memory it holds. Returns None where neither is available.
+"""
+
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def _children(pid):
+    """Direct child pids from /proc; children are listed under the thread that spawned them"""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def descendants(pid):
+    """Pids of every process below pid, parents before children"""
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    found = []
+    queue = _children(pid)
+    while queue:
+        child = queue.pop(0)
+        found.append(child)
+        queue.extend(_children(child))
+    return found
+
+def available():
+    return psutil is not None or os.path.isdir("/proc/self/task")
+
+def tree_rss(pid, include_root=True, exclude=()):
+    """
+    Total RSS in bytes of pid and every process below it (e.g. chromedriver,
+    Chrome and its renderer/GPU helpers), skipping the subtrees of excluded pids
+    """
+    if not available():
+        return None
+
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            total = root.memory_info().rss if include_root else 0
+            skipped = set(exclude)
+            for child in root.children(recursive=True):
+                try:
+                    if child.pid in skipped or child.ppid() in skipped:
+                        skipped.add(child.pid)
+                        continue
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total
+        except psutil.Error:
+            return None
+
+    total = _rss_bytes(pid) if include_root else 0
+    stack = [child for child in _children(pid) if child not in exclude]
+    while stack:
+        child = stack.pop()
+        total += _rss_bytes(child)
+        stack.extend(_children(child))
+    return total
+
+def driver_rss(driver):
+    """RSS of a Selenium Chrome driver: the chromedriver service and the browser it started"""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is None:
+        return None
+    return tree_rss(process.pid)
@@ -0,0 +1,197 @@
+"""
+Adaptive rate limiting for all eCourts portal traffic
+Every page load, dropdown selection, captcha fetch, search submission and PDF
+download takes a token from a bucket for the portal host and one for the
+court complex. Bucket rates grow slowly while the portal answers quickly and
+are halved on slow responses, errors or throttling pages. The rate at which
+the portal last pushed back becomes a ceiling that is only probed again after
+a quiet period.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import portal
+
+PORTAL_HOST = portal.HOST
+
+# Requests per second
+HOST_RATE = float(os.environ.get("PORTAL_RATE", "1.0"))
+HOST_MAX_RATE = float(os.environ.get("PORTAL_MAX_RATE", "3.0"))
+COURT_RATE = float(os.environ.get("PORTAL_COURT_RATE", "0.5"))
+COURT_MAX_RATE = float(os.environ.get("PORTAL_COURT_MAX_RATE", "1.0"))
+MIN_RATE = float(os.environ.get("PORTAL_MIN_RATE", "0.05"))
+BURST = float(os.environ.get("PORTAL_BURST", "3"))
+
+# A response slower than this counts as the portal struggling (seconds)
+SLOW_RESPONSE = float(os.environ.get("PORTAL_SLOW_RESPONSE", "8"))
+# Additive increase per fast response, multiplicative decrease on trouble
+INCREASE_STEP = 0.02
+BACKOFF_FACTOR = 0.5
+# Stay this fraction below the rate at which the portal last pushed back
+CEILING_MARGIN = 0.9
+# Seconds without trouble before the ceiling is raised again
+CEILING_RELAX = 600
+
+# Text on error pages served when the portal is overloaded or blocking us
+THROTTLE_MARKERS = (
+    "too many requests",
+    "service unavailable",
+    "access denied",
+    "request rejected",
+    "temporarily unavailable",
+    "bad gateway",
+    "gateway timeout",
+)
+
+class AdaptiveBucket:
+    """Token bucket whose refill rate follows AIMD on response feedback"""
+
+    def __init__(self, name, rate, max_rate, burst=BURST, min_rate=MIN_RATE):
+        self.name = name
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.ceiling = None
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.backoffs = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take a token, returning how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.requests += 1
+            # Tokens may go negative: each waiter queues behind the previous one
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def _limit(self, now):
+        if self.ceiling is not None and now - self._last_backoff > CEILING_RELAX:
+            # Probe upwards again after a quiet period
+            self.ceiling = min(self.max_rate, self.ceiling / CEILING_MARGIN)
+            self._last_backoff = now
+        if self.ceiling is None:
+            return self.max_rate
+        return min(self.max_rate, self.ceiling * CEILING_MARGIN)
+
+    def on_success(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, min(self._limit(now), self.rate + INCREASE_STEP))
+
+    def on_trouble(self, throttled=False):
+        with self._lock:
+            now = time.monotonic()
+            # Responses to requests already in flight report the same trouble - back off once
+            if now - self._last_backoff < 1 / self.rate:
+                return
+            self._refill(now)
+            if throttled:
+                self.ceiling = self.rate
+            self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+            self.tokens = min(self.tokens, 0)
+            self._last_backoff = now
+            self.backoffs += 1
+        print(f"🐢 Rate limit for {self.name} lowered to {self.rate:.2f}/s"
+              f"{' (throttled)' if throttled else ''}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "ceiling": round(self.ceiling, 3) if self.ceiling is not None else None,
+                "tokens": round(self.tokens, 2),
+                "requests": self.requests,
+                "backoffs": self.backoffs,
+            }
+
+class Call:
+    """Outcome of one limited call; set throttled when the response was an error page"""
+
+    def __init__(self):
+        self.throttled = False
+
+_lock = threading.Lock()
+_buckets = {}
+_kinds = {}
+
+def _bucket(key, name, rate, max_rate):
+    with _lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = AdaptiveBucket(name, rate, max_rate)
+        return bucket
+
+def _buckets_for(court, host):
+    buckets = [_bucket(("host", host), host, HOST_RATE, HOST_MAX_RATE)]
+    if court:
+        buckets.append(_bucket(("court", host, str(court)), f"court {court}", COURT_RATE, COURT_MAX_RATE))
+    return buckets
+
+def host_of(url):
+    return urlparse(url).netloc or PORTAL_HOST
+
+def acquire(kind, court=None, host=PORTAL_HOST):
+    """Block until the host and court buckets allow another request. Returns seconds waited."""
+    with _lock:
+        _kinds[kind] = _kinds.get(kind, 0) + 1
+    wait = max(bucket.reserve() for bucket in _buckets_for(court, host))
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+def record(latency, court=None, host=PORTAL_HOST, error=False, throttled=False):
+    """Feed a response back into the buckets it was charged to"""
+    trouble = error or throttled or latency > SLOW_RESPONSE
+    for bucket in _buckets_for(court, host):
+        if trouble:
+            bucket.on_trouble(throttled=throttled)
+        else:
+            bucket.on_success()
+
+@contextmanager
+def limited(kind, court=None, host=PORTAL_HOST):
+    """
+    Rate-limit the portal request(s) made inside the block and learn from how
+    long they took. Exceptions count as trouble.
+    """
+    acquire(kind, court, host)
+    call = Call()
+    started = time.monotonic()
+    try:
+        yield call
+    except Exception:
+        record(time.monotonic() - started, court, host, error=True, throttled=call.throttled)
+        raise
+    record(time.monotonic() - started, court, host, throttled=call.throttled)
+
+def looks_throttled(page_text):
+    """True if a page looks like an overload or block page rather than portal content"""
+    text = (page_text or "")[:2000].lower()
+    return any(marker in text for marker in THROTTLE_MARKERS)
+
+def is_throttle_status(status_code):
+    return status_code in (429, 502, 503, 504)
+
+def stats():
+    with _lock:
+        buckets = dict(_buckets)
+        kinds = dict(_kinds)
+    return {
+        "buckets": {bucket.name: bucket.stats() for bucket in buckets.values()},
+        "requests_by_kind": kinds,
+    }
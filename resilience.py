@@ -0,0 +1,235 @@
+"""
+Resilience for portal operations
+Errors are classified as transient, throttled or permanent. Transient and
+throttled ones are retried with jittered exponential backoff inside a
+per-request budget, and a circuit breaker per portal endpoint fails fast while
+that part of the portal is down, letting single half-open probes through to
+detect when it is back.
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+TRANSIENT = "transient"
+THROTTLED = "throttled"
+PERMANENT = "permanent"
+
+# Whole-request budget for pooled lookups (seconds) and retries within it
+REQUEST_BUDGET = float(os.environ.get("PORTAL_REQUEST_BUDGET", "180"))
+MAX_RETRIES = int(os.environ.get("PORTAL_MAX_RETRIES", "4"))
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+# Consecutive failures that open a breaker, and how long it stays open (seconds)
+BREAKER_FAILURES = int(os.environ.get("PORTAL_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.environ.get("PORTAL_BREAKER_RESET", "30"))
+
+class PortalError(Exception):
+    """A portal operation failed; category decides whether it is worth retrying"""
+    category = TRANSIENT
+
+class PortalThrottled(PortalError):
+    """The portal answered with an overload or block page"""
+    category = THROTTLED
+
+class PermanentPortalError(PortalError):
+    """Retrying will not help (bad input, dead browser, open circuit, spent budget)"""
+    category = PERMANENT
+
+class CircuitOpenError(PermanentPortalError):
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"Portal endpoint '{endpoint}' is unavailable, retry in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+# Selenium and requests exceptions are matched by name so this module doesn't import either
+_TRANSIENT_NAMES = {
+    "TimeoutException", "StaleElementReferenceException", "ElementClickInterceptedException",
+    "ElementNotInteractableException", "NoSuchElementException", "UnexpectedAlertPresentException",
+    "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError",
+    "ConnectionResetError", "ConnectionAbortedError", "TimeoutError",
+}
+_DEAD_BROWSER_MARKERS = ("invalid session id", "chrome not reachable", "disconnected", "no such window")
+_NETWORK_MARKERS = ("net::err_", "timed out", "timeout")
+
+def classify(error):
+    """TRANSIENT, THROTTLED or PERMANENT"""
+    if isinstance(error, PortalError):
+        return error.category
+
+    names = {cls.__name__ for cls in type(error).__mro__}
+    message = str(error).lower()
+    if "WebDriverException" in names:
+        if any(marker in message for marker in _DEAD_BROWSER_MARKERS):
+            return PERMANENT
+        if names & _TRANSIENT_NAMES or any(marker in message for marker in _NETWORK_MARKERS):
+            return TRANSIENT
+        return PERMANENT
+    if names & _TRANSIENT_NAMES:
+        return TRANSIENT
+    return PERMANENT
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open single probe -> closed or open again"""
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def before(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open":
+                retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+                if retry_after > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, retry_after)
+                self.state = "half_open"
+            if self.probing:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self.probing = True
+        print(f"🩺 Probing portal endpoint '{self.name}'")
+
+    def success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"✅ Portal endpoint '{self.name}' recovered")
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"⛔ Circuit for portal endpoint '{self.name}' opened after {self.failures} failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """The call ended in a way that says nothing about the portal's health"""
+        with self._lock:
+            self.probing = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+_lock = threading.Lock()
+_breakers = {}
+
+def breaker_for(endpoint):
+    with _lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+@contextmanager
+def guard(endpoint):
+    """Run a portal operation behind the endpoint's circuit breaker"""
+    breaker = breaker_for(endpoint)
+    breaker.before()
+    try:
+        yield
+    except Exception as e:
+        if classify(e) == PERMANENT:
+            breaker.release()
+        else:
+            breaker.failure()
+        raise
+    breaker.success()
+
+class RetryBudget:
+    """Time and retry allowance shared by every step of one request"""
+
+    def __init__(self, seconds=REQUEST_BUDGET, retries=MAX_RETRIES):
+        self.deadline = time.monotonic() + seconds
+        self.retries = retries
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def take_retry(self, delay):
+        if self.retries <= 0 or self.remaining() <= delay:
+            return False
+        self.retries -= 1
+        return True
+
+_local = threading.local()
+
+@contextmanager
+def budget(seconds=REQUEST_BUDGET, retries=MAX_RETRIES):
+    """Make a RetryBudget current for this thread (nested calls reuse the outer one)"""
+    outer = getattr(_local, "budget", None)
+    if outer is not None:
+        yield outer
+        return
+    _local.budget = RetryBudget(seconds, retries)
+    try:
+        yield _local.budget
+    finally:
+        _local.budget = None
+
+def wait_timeout(default):
+    """A WebDriverWait timeout that never outlives the current request budget"""
+    current = getattr(_local, "budget", None)
+    if current is None:
+        return default
+    remaining = current.remaining()
+    if remaining <= 0:
+        raise PermanentPortalError("Request budget exhausted")
+    return min(default, max(1.0, remaining))
+
+def backoff_delay(attempt, category=TRANSIENT):
+    """Full-jitter exponential backoff; throttling backs off harder"""
+    base = BASE_DELAY * (4 if category == THROTTLED else 1)
+    return random.uniform(0, min(MAX_DELAY, base * 2 ** (attempt - 1)))
+
+def retry(fn, *args, label=None, recover=None, **kwargs):
+    """
+    Call fn, retrying transient and throttled failures with jittered backoff
+    while the current budget (or a fresh default one) allows.
+    recover() is called before each retry to put the browser back in a known state.
+    """
+    label = label or getattr(fn, "__name__", "portal operation")
+    with budget() as current:
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                category = classify(e)
+                if category == PERMANENT:
+                    raise
+                attempt += 1
+                delay = backoff_delay(attempt, category)
+                if not current.take_retry(delay):
+                    print(f"❌ {label} failed ({category}), retry budget spent: {str(e)[:200]}")
+                    raise
+                print(f"🔁 {label} failed ({category}), retry {attempt} in {delay:.1f}s: {str(e)[:200]}")
+            time.sleep(delay)
+            if recover:
+                try:
+                    recover()
+                except Exception as recovery_error:
+                    print(f"⚠️ Recovery before retrying {label} failed: {str(recovery_error)[:200]}")
+
+def stats():
+    with _lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
@@ -0,0 +1,150 @@
+"""
+Tiered cache for case lookups
+An in-memory LRU in front of a persistent SQLite tier, holding search results
+and extracted case details per (court, case type, number, year), plus
+short-lived negative entries for "No cases found". Case details are kept as
+case_model.Case objects in memory and as Case.as_row() lists on disk.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import case_model
+import db
+
+DB_PATH = db.DATA_DIR / "cache.db"
+
+MEMORY_ENTRIES = int(os.environ.get("RESULT_CACHE_MEMORY_ENTRIES", "1024"))
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Case details carry the next hearing date, stage, orders and history, which
+# move with every hearing, so the whole record is refetched after this long
+DETAILS_TTL = 6 * HOUR
+
+SEARCH_RESULTS_TTL = DAY
+NEGATIVE_TTL = 15 * 60
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+_conn = None
+
+def _db():
+    """Lazily open the disk tier"""
+    global _conn
+    if _conn is None:
+        _conn = db.connect(DB_PATH)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                expires REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires);
+        """)
+    return _conn
+
+def make_key(kind, location, case_type, case_number, case_year):
+    """Cache key for one lookup; location is the {"state", "district", "court"} selection"""
+    location = location or {}
+    parts = [kind, location.get("state"), location.get("district"), location.get("court"),
+             case_type, str(case_number).strip().lstrip("0") or "0", str(case_year).strip()]
+    return "|".join("" if part is None else str(part) for part in parts)
+
+def _remember(key, entry):
+    _memory[key] = entry
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+def _dumps(entry):
+    if "cases" in entry:
+        entry = dict(entry, cases=[case.as_row() for case in entry["cases"]])
+    return json.dumps(entry, ensure_ascii=False)
+
+def _loads(payload):
+    entry = json.loads(payload)
+    if "cases" in entry:
+        entry["cases"] = [case_model.Case.from_row(row) for row in entry["cases"]]
+    return entry
+
+def _put(key, entry):
+    expires = entry["expires"]
+    with _lock:
+        _remember(key, entry)
+        conn = _db()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, payload, expires) VALUES (?, ?, ?)",
+                (key, _dumps(entry), expires)
+            )
+
+def _get(key):
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+        else:
+            row = _db().execute("SELECT payload FROM cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                entry = _loads(row["payload"])
+                _remember(key, entry)
+
+        if entry is not None and entry["expires"] <= now:
+            _memory.pop(key, None)
+            conn = _db()
+            with conn:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            entry = None
+    return entry
+
+def put_search_results(key, results):
+    """Cache a get_search_results payload (or a negative result when results is None)"""
+    now = time.time()
+    if results is None:
+        _put(key, {"negative": True, "expires": now + NEGATIVE_TTL})
+    else:
+        _put(key, {"negative": False, "value": results, "expires": now + SEARCH_RESULTS_TTL})
+
+def get_search_results(key):
+    """Returns (hit, results). results is None for a cached 'No cases found'."""
+    entry = _get(key)
+    if entry is None:
+        return False, None
+    return True, None if entry["negative"] else entry["value"]
+
+def put_case_details(key, cases):
+    """Cache a list of case_model.Case objects"""
+    _put(key, {"negative": False, "cases": cases, "expires": time.time() + DETAILS_TTL})
+
+def get_case_details(key):
+    """Cached case details as a list of case_model.Case objects, or None on a miss"""
+    entry = _get(key)
+    if entry is None or "cases" not in entry:
+        return None
+    return entry["cases"]
+
+def preload(limit=None):
+    """Fill the memory tier from disk (eager warm-up); the longest-lived entries are kept"""
+    limit = limit or MEMORY_ENTRIES
+    with _lock:
+        rows = _db().execute(
+            "SELECT key, payload FROM cache WHERE expires > ? ORDER BY expires DESC LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+        for row in reversed(rows):
+            _remember(row["key"], _loads(row["payload"]))
+    return len(rows)
+
+def purge_expired():
+    """Drop expired rows from the disk tier"""
+    with _lock:
+        conn = _db()
+        with conn:
+            removed = conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),)).rowcount
+    return removed
@@ -0,0 +1,229 @@
+"""
+Full-text search over downloaded judgments and orders
+Text is extracted from every PDF in downloads/ in a process pool and stored in
+a SQLite FTS5 index together with the case metadata from the PDF store
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import db
+import pdf_store
+
+INDEX_PATH = db.DATA_DIR / "search_index.db"
+
+# How often the background indexer rescans downloads/ (seconds)
+INDEX_INTERVAL = int(os.environ.get("SEARCH_INDEX_INTERVAL", "300"))
+INDEX_WORKERS = int(os.environ.get("SEARCH_INDEX_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+BATCH_SIZE = 32
+
+_lock = threading.Lock()
+_conn = None
+_wake = threading.Event()
+_indexer_thread = None
+
+def _db():
+    """Lazily open the index and create its tables"""
+    global _conn
+    if _conn is None:
+        _conn = db.connect(INDEX_PATH)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                filename TEXT,
+                sha256 TEXT,
+                size INTEGER,
+                mtime REAL,
+                cnr TEXT,
+                order_number TEXT,
+                order_date TEXT,
+                download_url TEXT,
+                pages INTEGER,
+                error TEXT,
+                indexed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_cnr ON documents(cnr);
+            CREATE VIRTUAL TABLE IF NOT EXISTS pdf_fts USING fts5(
+                filename, cnr, body,
+                tokenize = 'porter unicode61'
+            );
+        """)
+    return _conn
+
+def extract_text(path):
+    """Extract text from a PDF (runs in a worker process). Returns (path, text, pages, error)."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return path, "", 0, "pypdf not installed"
+
+    try:
+        reader = PdfReader(path)
+        pages = [page.extract_text() or "" for page in reader.pages]
+        return path, "\n".join(pages), len(pages), None
+    except Exception as e:
+        return path, "", 0, f"{type(e).__name__}: {str(e)}"
+
+def _candidates():
+    """Every PDF we hold: store blobs plus legacy flat files in downloads/"""
+    files = {}
+    for record in pdf_store.list_blobs():
+        files[record["local_path"]] = record
+
+    if pdf_store.DOWNLOADS_DIR.exists():
+        for file_path in pdf_store.DOWNLOADS_DIR.glob("*.pdf"):
+            files.setdefault(str(file_path), {
+                "filename": file_path.name,
+                "sha256": None,
+                "cnr": None,
+                "order_number": None,
+                "order_date": None,
+                "download_url": f"/serve-pdf/{file_path.name}",
+            })
+    return files
+
+def _pending(files):
+    """Work out which files are new or changed and drop documents that disappeared"""
+    with _lock:
+        known = {
+            row["path"]: (row["size"], row["mtime"])
+            for row in _db().execute("SELECT path, size, mtime FROM documents")
+        }
+
+    pending = []
+    for path, record in files.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if known.get(path) != (stat.st_size, stat.st_mtime):
+            pending.append((path, record, stat))
+
+    removed = [path for path in known if path not in files]
+    if removed:
+        with _lock:
+            conn = _db()
+            with conn:
+                for path in removed:
+                    row = conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+                    if row:
+                        conn.execute("DELETE FROM pdf_fts WHERE rowid = ?", (row["id"],))
+                        conn.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+        print(f"🗑️ Removed {len(removed)} missing PDF(s) from search index")
+
+    return pending
+
+def _store_batch(batch):
+    with _lock:
+        conn = _db()
+        with conn:
+            for (path, record, stat), (_, text, pages, error) in batch:
+                conn.execute(
+                    "INSERT INTO documents (path, filename, sha256, size, mtime, cnr, order_number, "
+                    "order_date, download_url, pages, error, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (path) DO UPDATE SET filename = excluded.filename, "
+                    "sha256 = excluded.sha256, size = excluded.size, mtime = excluded.mtime, "
+                    "cnr = excluded.cnr, order_number = excluded.order_number, "
+                    "order_date = excluded.order_date, download_url = excluded.download_url, "
+                    "pages = excluded.pages, error = excluded.error, indexed_at = excluded.indexed_at",
+                    (path, record["filename"], record["sha256"], stat.st_size, stat.st_mtime,
+                     record["cnr"], record["order_number"], record["order_date"],
+                     record["download_url"], pages, error, time.time())
+                )
+                doc_id = conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()["id"]
+                conn.execute("DELETE FROM pdf_fts WHERE rowid = ?", (doc_id,))
+                conn.execute(
+                    "INSERT INTO pdf_fts (rowid, filename, cnr, body) VALUES (?, ?, ?, ?)",
+                    (doc_id, record["filename"], record["cnr"] or "", text)
+                )
+
+def index_pending(max_workers=None):
+    """Index new or changed PDFs. Returns the number of documents (re)indexed."""
+    pending = _pending(_candidates())
+    if not pending:
+        return 0
+
+    print(f"📚 Indexing {len(pending)} PDF(s) for full-text search...")
+    started = time.time()
+    by_path = {path: (path, record, stat) for path, record, stat in pending}
+
+    with ProcessPoolExecutor(max_workers=max_workers or INDEX_WORKERS) as pool:
+        batch = []
+        for result in pool.map(extract_text, list(by_path), chunksize=4):
+            batch.append((by_path[result[0]], result))
+            if len(batch) >= BATCH_SIZE:
+                _store_batch(batch)
+                batch = []
+        if batch:
+            _store_batch(batch)
+
+    print(f"✅ Indexed {len(pending)} PDF(s) in {time.time() - started:.1f}s")
+    return len(pending)
+
+def _quote_terms(query):
+    """Fallback for queries that aren't valid FTS5 syntax: match every word literally"""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+def search(query, limit=20, offset=0, cnr=None):
+    """
+    Ranked full-text search. Supports FTS5 syntax: "exact phrase", AND/OR/NOT, prefix*.
+    Returns a list of hits with a highlighted snippet.
+    """
+    sql = (
+        "SELECT d.filename, d.cnr, d.order_number, d.order_date, d.download_url, d.pages, "
+        "snippet(pdf_fts, 2, '<mark>', '</mark>', '…', 16) AS snippet, bm25(pdf_fts) AS rank "
+        "FROM pdf_fts JOIN documents d ON d.id = pdf_fts.rowid "
+        "WHERE pdf_fts MATCH ?"
+    )
+    params = [query]
+    if cnr:
+        sql += " AND d.cnr = ?"
+        params.append(cnr)
+    sql += " ORDER BY rank LIMIT ? OFFSET ?"
+    params += [limit, offset]
+
+    with _lock:
+        conn = _db()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            params[0] = _quote_terms(query)
+            rows = conn.execute(sql, params).fetchall() if params[0] else []
+
+    return [dict(row) for row in rows]
+
+def stats():
+    """Index size and how many documents failed extraction"""
+    with _lock:
+        row = _db().execute(
+            "SELECT COUNT(*) AS documents, SUM(error IS NOT NULL) AS errors, MAX(indexed_at) AS last_indexed "
+            "FROM documents"
+        ).fetchone()
+    return {"documents": row["documents"], "errors": row["errors"] or 0, "last_indexed": row["last_indexed"]}
+
+def request_reindex():
+    """Wake the background indexer (e.g. after a new PDF was stored)"""
+    _wake.set()
+
+def _indexer_loop():
+    while True:
+        try:
+            index_pending()
+        except Exception as e:
+            print(f"❌ Search indexer error: {str(e)}")
+        _wake.wait(INDEX_INTERVAL)
+        _wake.clear()
+
+def start_background_indexer():
+    """Start the incremental indexer thread (idempotent)"""
+    global _indexer_thread
+    if _indexer_thread is None or not _indexer_thread.is_alive():
+        _indexer_thread = threading.Thread(target=_indexer_loop, name="search-indexer", daemon=True)
+        _indexer_thread.start()
+        print("📚 Background PDF search indexer started")
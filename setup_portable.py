@@ -1,162 +1,347 @@
 """
 Portable ChromeDriver Setup Script
-This script ensures the project works on different machines by setting up ChromeDriver
+This script ensures the project works on different machines by setting up ChromeDriver.
+Drivers are resolved for the exact installed Chrome build through the Chrome for
+Testing index, streamed to disk, verified (zip CRCs, SHA-256, `--version`) and kept
+in a versioned cache shared by every checkout on the machine. Installs are atomic
+renames, so several workers can provision at once, and --seed-dir/--offline install
+from a pre-populated directory without network access.
 """
+import argparse
+import hashlib
+import json
 import os
 import platform
+import re
+import shutil
+import subprocess
 import sys
-import requests
+import tempfile
 import zipfile
-import shutil
+from pathlib import Path
+
+import requests
+
+# Chrome for Testing: exact builds and the latest patch per MAJOR.MINOR.BUILD
+KNOWN_GOOD_URL = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
+LATEST_PATCH_URL = "https://googlechromelabs.github.io/chrome-for-testing/latest-patch-versions-per-build-with-downloads.json"
+
+CACHE_DIR = Path(os.environ.get("CHROMEDRIVER_CACHE", Path.home() / ".cache" / "ecourts-chromedriver"))
+SEED_DIR = os.environ.get("CHROMEDRIVER_SEED_DIR")
+CHUNK_SIZE = 1024 * 1024
+VERSION_PATTERN = re.compile(r"(\d+)\.(\d+)\.(\d+)\.(\d+)")
+
+def platform_info():
+    """Chrome for Testing platform string and driver executable name for this machine"""
+    system = platform.system()
+    machine = platform.machine()
+
+    if system == "Windows":
+        return ("win64" if machine.endswith("64") else "win32"), "chromedriver.exe"
+    elif system == "Darwin":  # macOS
+        return ("mac-arm64" if machine == "arm64" else "mac-x64"), "chromedriver"
+    elif system == "Linux":
+        return "linux64", "chromedriver"
+    raise Exception(f"Unsupported platform: {system}")
+
+def _version_from_output(text):
+    match = VERSION_PATTERN.search(text or "")
+    return match.group(0) if match else None
 
 def get_chrome_version():
-    """Get installed Chrome version"""
+    """Full installed Chrome version (e.g. 120.0.6099.109), or None if Chrome can't be found"""
+    override = os.environ.get("CHROME_VERSION")
+    if override:
+        return override
+
     try:
         if platform.system() == "Windows":
             import winreg
-            # Try different registry paths
-            paths = [
-                r"SOFTWARE\Google\Chrome\BLBeacon",
-                r"SOFTWARE\Wow6432Node\Google\Chrome\BLBeacon",
-                r"SOFTWARE\Microsoft\Windows\CurrentVersion\App Paths\chrome.exe"
+            # Per-user installs register under HKCU, system installs under HKLM
+            locations = [
+                (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Google\Chrome\BLBeacon"),
+                (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Google\Chrome\BLBeacon"),
+                (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Wow6432Node\Google\Chrome\BLBeacon"),
             ]
-            
-            for path in paths:
+            for hive, path in locations:
                 try:
-                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, path) as key:
-                        version = winreg.QueryValueEx(key, "version")[0]
-                        return version.split('.')[0]  # Return major version
-                except:
+                    with winreg.OpenKey(hive, path) as key:
+                        return winreg.QueryValueEx(key, "version")[0]
+                except OSError:
                     continue
-        
-        elif platform.system() == "Darwin":  # macOS
-            import subprocess
-            result = subprocess.run(["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "--version"], 
-                                  capture_output=True, text=True)
-            version = result.stdout.split()[-1]
-            return version.split('.')[0]
-        
-        elif platform.system() == "Linux":
-            import subprocess
-            result = subprocess.run(["google-chrome", "--version"], capture_output=True, text=True)
-            version = result.stdout.split()[-1]
-            return version.split('.')[0]
-            
+            return None
+
+        if platform.system() == "Darwin":  # macOS
+            binaries = ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"]
+        else:
+            binaries = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]
+        if os.environ.get("CHROME_BINARY"):
+            binaries.insert(0, os.environ["CHROME_BINARY"])
+
+        for binary in binaries:
+            try:
+                result = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=15)
+            except (OSError, subprocess.SubprocessError):
+                continue
+            version = _version_from_output(result.stdout)
+            if version:
+                return version
     except Exception as e:
         print(f"Could not detect Chrome version: {e}")
-        return "120"  # Default to a stable version
+    return None
 
-def download_chromedriver(version="120"):
-    """Download appropriate ChromeDriver for the system"""
-    
-    system = platform.system()
-    machine = platform.machine()
-    
-    # Determine platform string
-    if system == "Windows":
-        if machine.endswith("64"):
-            platform_str = "win64"
-        else:
-            platform_str = "win32"
-        executable_name = "chromedriver.exe"
-    elif system == "Darwin":  # macOS
-        if machine == "arm64":
-            platform_str = "mac-arm64"
-        else:
-            platform_str = "mac-x64"
-        executable_name = "chromedriver"
-    elif system == "Linux":
-        platform_str = "linux64"
-        executable_name = "chromedriver"
-    else:
-        raise Exception(f"Unsupported platform: {system}")
-    
-    # ChromeDriver download URL (Chrome for Testing)
-    url = f"https://storage.googleapis.com/chrome-for-testing-public/{version}.0.0.0/{platform_str}/chromedriver-{platform_str}.zip"
-    
-    print(f"🔽 Downloading ChromeDriver for {system} {machine} (Chrome {version})...")
+def build_of(version):
+    """MAJOR.MINOR.BUILD - drivers are compatible across patch releases of a build"""
+    return ".".join(version.split(".")[:3])
+
+def resolve_download(chrome_version, platform_str):
+    """(driver_version, url) of the driver for this Chrome build from the Chrome for Testing index"""
+    response = requests.get(KNOWN_GOOD_URL, timeout=30)
+    response.raise_for_status()
+    for entry in response.json()["versions"]:
+        if entry["version"] == chrome_version:
+            for download in entry.get("downloads", {}).get("chromedriver", []):
+                if download["platform"] == platform_str:
+                    return entry["version"], download["url"]
+
+    response = requests.get(LATEST_PATCH_URL, timeout=30)
+    response.raise_for_status()
+    entry = response.json()["builds"].get(build_of(chrome_version))
+    if entry:
+        for download in entry.get("downloads", {}).get("chromedriver", []):
+            if download["platform"] == platform_str:
+                return entry["version"], download["url"]
+    raise Exception(f"No ChromeDriver published for Chrome {chrome_version} on {platform_str}")
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def stream_to_file(url, directory):
+    """Stream a download into a temp file in directory. Returns (path, sha256)."""
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".zip.part")
+    try:
+        with requests.get(url, stream=True, timeout=30) as response, os.fdopen(fd, "wb") as f:
+            response.raise_for_status()
+            expected_size = int(response.headers.get("Content-Length") or 0)
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        if expected_size and size != expected_size:
+            raise Exception(f"Download truncated: {size} of {expected_size} bytes")
+        return tmp_path, digest.hexdigest()
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def driver_reported_version(driver_path):
+    try:
+        result = subprocess.run([str(driver_path), "--version"], capture_output=True, text=True, timeout=15)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return _version_from_output(result.stdout)
+
+def unpack_to_cache(zip_path, zip_sha256, driver_version, platform_str, executable_name, cache_dir=CACHE_DIR):
+    """
+    Verify a driver zip and publish it as cache_dir/<build>/<platform>/ with a manifest.
+    Extraction happens in a private temp dir that is renamed into place, so
+    concurrent installers never see a half-written driver.
+    """
+    target_dir = cache_dir / build_of(driver_version) / platform_str
+    target_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=target_dir.parent, prefix=f".{platform_str}-"))
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            bad_member = archive.testzip()
+            if bad_member:
+                raise Exception(f"Corrupt ChromeDriver zip (CRC mismatch in {bad_member})")
+            member = next((name for name in archive.namelist() if name.endswith("/" + executable_name)), None)
+            if member is None:
+                raise Exception(f"{executable_name} not found in ChromeDriver zip")
+            with archive.open(member) as source, open(staging / executable_name, "wb") as target:
+                shutil.copyfileobj(source, target)
+
+        driver_path = staging / executable_name
+        if platform.system() != "Windows":
+            os.chmod(driver_path, 0o755)
+        # A driver that cannot run or report its version is as unusable as the wrong one
+        reported = driver_reported_version(driver_path)
+        if not reported:
+            raise Exception(f"Could not read the version of the unpacked ChromeDriver (expected {driver_version})")
+        if build_of(reported) != build_of(driver_version):
+            raise Exception(f"Driver reports version {reported}, expected {driver_version}")
+
+        manifest = {
+            "version": driver_version,
+            "platform": platform_str,
+            "zip_sha256": zip_sha256,
+            "driver_sha256": sha256_of(driver_path),
+        }
+        (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+        if target_dir.exists() and not cached_driver(driver_version, platform_str, executable_name, cache_dir):
+            # Replace a damaged entry; renaming it aside first keeps the swap atomic for readers
+            broken = target_dir.with_name(f".{platform_str}-broken-{os.getpid()}")
+            os.rename(target_dir, broken)
+            shutil.rmtree(broken, ignore_errors=True)
+        try:
+            os.rename(staging, target_dir)
+        except OSError:
+            # Another worker published the same build first - use theirs
+            if not cached_driver(driver_version, platform_str, executable_name, cache_dir):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target_dir / executable_name
+
+def cached_driver(chrome_version, platform_str, executable_name, cache_dir=CACHE_DIR):
+    """Path of a verified cached driver for this Chrome build, or None"""
+    entry_dir = cache_dir / build_of(chrome_version) / platform_str
+    driver_path = entry_dir / executable_name
+    try:
+        manifest = json.loads((entry_dir / "manifest.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if not driver_path.exists() or sha256_of(driver_path) != manifest.get("driver_sha256"):
+        print(f"⚠️ Cached ChromeDriver in {entry_dir} failed verification, ignoring it")
+        return None
+    return driver_path
+
+def seeded_zip(seed_dir, chrome_version, platform_str):
+    """
+    Find a driver zip for this Chrome build in a seed directory laid out like the
+    Chrome for Testing bucket: <version>/<platform>/chromedriver-<platform>.zip.
+    An optional SHA256SUMS file ("<sha256>  <relative path>" lines) pins their hashes.
+    Returns (zip_path, driver_version, expected_sha256 or None), or None.
+    """
+    seed_dir = Path(seed_dir)
+    pinned = {}
+    sums_file = seed_dir / "SHA256SUMS"
+    if sums_file.exists():
+        for line in sums_file.read_text().splitlines():
+            parts = line.split()
+            if len(parts) == 2:
+                pinned[parts[1].lstrip("*").replace("\\", "/")] = parts[0].lower()
+
+    candidates = [path for path in seed_dir.glob(f"{build_of(chrome_version)}.*/{platform_str}/chromedriver-{platform_str}.zip")
+                  if VERSION_PATTERN.fullmatch(path.parts[-3])]
+    if not candidates:
+        return None
+    # The exact Chrome version if seeded, else the newest patch of the same build
+    exact = [path for path in candidates if path.parts[-3] == chrome_version]
+    zip_path = exact[0] if exact else max(candidates, key=lambda path: [int(part) for part in path.parts[-3].split(".")])
+    return zip_path, zip_path.parts[-3], pinned.get(zip_path.relative_to(seed_dir).as_posix())
+
+def install_to_project(cached_path, platform_str, executable_name):
+    """Copy the cached driver to chromedriver-<platform>/ and rename it into place"""
+    driver_dir = Path(f"chromedriver-{platform_str}")
+    driver_dir.mkdir(exist_ok=True)
+    target_driver = driver_dir / executable_name
+    fd, tmp_path = tempfile.mkstemp(dir=driver_dir, prefix=f".{executable_name}.")
+    os.close(fd)
+    try:
+        shutil.copy2(cached_path, tmp_path)
+        os.replace(tmp_path, target_driver)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return str(target_driver)
+
+def download_chromedriver(chrome_version, cache_dir=CACHE_DIR, seed_dir=SEED_DIR, offline=False):
+    """Put a verified ChromeDriver for chrome_version in the cache and return its cached path"""
+    platform_str, executable_name = platform_info()
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    cached = cached_driver(chrome_version, platform_str, executable_name, cache_dir)
+    if cached:
+        print(f"📦 Using cached ChromeDriver for Chrome {build_of(chrome_version)}: {cached}")
+        return cached
+
+    if seed_dir:
+        seeded = seeded_zip(seed_dir, chrome_version, platform_str)
+        if seeded:
+            zip_path, driver_version, expected_sha256 = seeded
+            print(f"🌱 Installing ChromeDriver {driver_version} from seed directory: {zip_path}")
+            zip_sha256 = sha256_of(zip_path)
+            if expected_sha256 and zip_sha256 != expected_sha256:
+                raise Exception(f"Checksum mismatch for {zip_path}: {zip_sha256} != {expected_sha256}")
+            return unpack_to_cache(zip_path, zip_sha256, driver_version, platform_str, executable_name, cache_dir)
+        print(f"⚠️ No ChromeDriver for Chrome {build_of(chrome_version)} in seed directory {seed_dir}")
+
+    if offline:
+        raise Exception(f"No cached or seeded ChromeDriver for Chrome {chrome_version} and --offline was given")
+
+    driver_version, url = resolve_download(chrome_version, platform_str)
+    print(f"🔽 Downloading ChromeDriver {driver_version} for {platform_str} (Chrome {chrome_version})...")
     print(f"📥 URL: {url}")
-    
+    zip_path, zip_sha256 = stream_to_file(url, cache_dir)
     try:
-        # Download the zip file
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # Create directory for the specific platform
-        driver_dir = f"chromedriver-{platform_str}"
-        os.makedirs(driver_dir, exist_ok=True)
-        
-        # Save and extract
-        zip_path = f"{driver_dir}.zip"
-        with open(zip_path, "wb") as f:
-            f.write(response.content)
-        
-        # Extract
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall("temp_extract")
-        
-        # Move the executable to the correct location
-        extracted_driver = os.path.join("temp_extract", f"chromedriver-{platform_str}", executable_name)
-        target_driver = os.path.join(driver_dir, executable_name)
-        
-        shutil.move(extracted_driver, target_driver)
-        
-        # Make executable on Unix systems
-        if system != "Windows":
-            os.chmod(target_driver, 0o755)
-        
-        # Cleanup
+        print(f"🔐 SHA-256: {zip_sha256}")
+        return unpack_to_cache(zip_path, zip_sha256, driver_version, platform_str, executable_name, cache_dir)
+    finally:
         os.remove(zip_path)
-        shutil.rmtree("temp_extract")
-        
-        print(f"✅ ChromeDriver installed successfully: {target_driver}")
-        return target_driver
-        
-    except Exception as e:
-        print(f"❌ Failed to download ChromeDriver: {e}")
-        return None
 
-def setup_portable_chromedriver():
+def setup_portable_chromedriver(chrome_version=None, cache_dir=CACHE_DIR, seed_dir=SEED_DIR,
+                                offline=False, force=False):
     """Setup portable ChromeDriver for the current system"""
-    
+
     print("🚀 Setting up portable ChromeDriver...")
     print(f"💻 System: {platform.system()} {platform.machine()}")
-    
+
     # Detect Chrome version
-    chrome_version = get_chrome_version()
+    chrome_version = chrome_version or get_chrome_version()
+    if not chrome_version:
+        print("❌ Could not detect the installed Chrome version. Install Chrome, or pass --chrome-version "
+              "(or set CHROME_VERSION / CHROME_BINARY).")
+        return None
     print(f"🌐 Detected Chrome version: {chrome_version}")
-    
-    # Check if we already have a driver for this platform
-    system = platform.system()
-    machine = platform.machine()
-    
-    if system == "Windows":
-        platform_str = "win64" if machine.endswith("64") else "win32"
-        executable_name = "chromedriver.exe"
-    elif system == "Darwin":
-        platform_str = "mac-arm64" if machine == "arm64" else "mac-x64"
-        executable_name = "chromedriver"
-    else:
-        platform_str = "linux64"
-        executable_name = "chromedriver"
-    
-    driver_dir = f"chromedriver-{platform_str}"
-    driver_path = os.path.join(driver_dir, executable_name)
-    
-    if os.path.exists(driver_path):
-        print(f"✅ ChromeDriver already exists: {driver_path}")
-        return driver_path
-    
-    # Download ChromeDriver
-    return download_chromedriver(chrome_version)
+
+    platform_str, executable_name = platform_info()
+    driver_path = os.path.join(f"chromedriver-{platform_str}", executable_name)
+
+    # An existing driver is kept only if it matches the installed Chrome build
+    if os.path.exists(driver_path) and not force:
+        installed = driver_reported_version(driver_path)
+        if installed and build_of(installed) == build_of(chrome_version):
+            print(f"✅ ChromeDriver {installed} already installed: {driver_path}")
+            return driver_path
+        print(f"🔄 Installed ChromeDriver ({installed or 'unknown version'}) doesn't match Chrome {chrome_version}")
+
+    try:
+        cached_path = download_chromedriver(chrome_version, cache_dir, seed_dir, offline)
+        target_driver = install_to_project(cached_path, platform_str, executable_name)
+    except Exception as e:
+        print(f"❌ Failed to set up ChromeDriver: {e}")
+        return None
+
+    print(f"✅ ChromeDriver installed successfully: {target_driver}")
+    return target_driver
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Install a ChromeDriver matching the installed Chrome")
+    parser.add_argument("--chrome-version", help="Full Chrome version to provision for (default: detect)")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR), help="Versioned driver cache")
+    parser.add_argument("--seed-dir", default=SEED_DIR,
+                        help="Directory of pre-downloaded zips (<version>/<platform>/chromedriver-<platform>.zip)")
+    parser.add_argument("--offline", action="store_true", help="Never download; use the cache or seed dir only")
+    parser.add_argument("--force", action="store_true", help="Reinstall even if the current driver matches")
+    args = parser.parse_args()
+
     print("=" * 50)
     print("   PORTABLE CHROMEDRIVER SETUP")
     print("=" * 50)
-    
-    driver_path = setup_portable_chromedriver()
-    
+
+    driver_path = setup_portable_chromedriver(args.chrome_version, Path(args.cache_dir), args.seed_dir,
+                                              args.offline, args.force)
+
     if driver_path:
         print(f"\n🎉 Setup complete! ChromeDriver is ready at: {driver_path}")
         print("\n📝 To use in your project, the code will automatically detect this driver.")
@@ -0,0 +1,67 @@
+"""
+Browser pool checkouts, including bursts above the pool size
+"""
+
+import threading
+
+import pytest
+
+from browser_pool import BrowserPool, RecyclePolicy
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+@pytest.fixture
+def launched():
+    return []
+
+@pytest.fixture
+def pool(launched):
+    def factory():
+        driver = FakeDriver()
+        launched.append(driver)
+        return driver
+    return BrowserPool(factory, size=2, policy=RecyclePolicy(0, 0, 0, 0))
+
+def test_checkouts_reuse_idle_browsers(pool, launched):
+    with pool.browser() as first:
+        pass
+    with pool.browser() as second:
+        assert second is first
+    assert len(launched) == 1
+
+def test_checkout_waits_at_the_pool_size(pool):
+    with pool.browser(), pool.browser():
+        with pytest.raises(TimeoutError):
+            with pool.browser(timeout=0.05):
+                pass
+
+def test_burst_launches_past_the_size_and_closes_the_extras(pool, launched):
+    with pool.browser(limit=4), pool.browser(limit=4), pool.browser(limit=4), pool.browser(limit=4):
+        assert pool.stats()["in_use"] == 4
+        with pytest.raises(TimeoutError):
+            with pool.browser(limit=4, timeout=0.05):
+                pass
+
+    assert len(launched) == 4
+    assert sum(driver.closed for driver in launched) == 2
+    assert pool.stats()["idle"] == 2 and pool.stats()["in_use"] == 0
+
+def test_ordinary_checkout_waits_while_a_burst_holds_the_pool(pool):
+    got = []
+
+    def checkout():
+        with pool.browser(timeout=5) as driver:
+            got.append(driver)
+
+    with pool.browser(limit=3), pool.browser(limit=3), pool.browser(limit=3):
+        waiter = threading.Thread(target=checkout)
+        waiter.start()
+        waiter.join(0.1)
+        assert not got
+    waiter.join(5)
+    assert len(got) == 1 and not got[0].closed
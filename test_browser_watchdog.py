@@ -0,0 +1,70 @@
+"""
+Replacing a crashed session browser without holding up the watchdog
+"""
+
+import threading
+
+import pytest
+
+import main
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+@pytest.fixture
+def slow_launch(monkeypatch):
+    """create_browser blocks until the test lets it finish"""
+    launched = threading.Event()
+    proceed = threading.Event()
+
+    def create_browser():
+        launched.set()
+        assert proceed.wait(5)
+        return FakeDriver()
+
+    monkeypatch.setattr(main, "create_browser", create_browser)
+    monkeypatch.setattr(main, "open_case_status", lambda driver: (True, True))
+    monkeypatch.setattr(main, "watch_session_browser", lambda driver: None)
+    monkeypatch.setattr(main, "current_selection", {"state": None, "district": None, "court": None})
+    return launched, proceed
+
+def _join_restore():
+    for thread in threading.enumerate():
+        if thread.name == "session-restore":
+            thread.join(5)
+
+def test_restore_returns_before_the_replacement_starts(slow_launch, monkeypatch):
+    launched, proceed = slow_launch
+    dead = FakeDriver()
+    monkeypatch.setattr(main, "browser", dead)
+
+    main.restore_session(dead, "hung")
+    assert main.browser is None
+    assert launched.wait(5)
+
+    proceed.set()
+    _join_restore()
+    assert isinstance(main.browser, FakeDriver) and main.browser is not dead
+
+def test_restore_ignores_browsers_that_are_not_the_session(slow_launch, monkeypatch):
+    launched, _ = slow_launch
+    current = FakeDriver()
+    monkeypatch.setattr(main, "browser", current)
+
+    main.restore_session(FakeDriver(), "hung")
+    assert main.browser is current
+    assert not launched.is_set()
+
+def test_new_session_wins_over_a_late_replacement(slow_launch, monkeypatch):
+    launched, proceed = slow_launch
+    dead = FakeDriver()
+    monkeypatch.setattr(main, "browser", dead)
+
+    main.restore_session(dead, "crashed")
+    assert launched.wait(5)
+    started = FakeDriver()
+    main.browser = started
+    proceed.set()
+    _join_restore()
+    assert main.browser is started
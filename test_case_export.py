@@ -0,0 +1,118 @@
+"""
+Bulk export of stored cases as CSV, JSONL and Parquet, plain or gzipped
+"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import case_export
+import main
+
+def make_case(cnr, next_hearing_date, orders=1):
+    return {
+        "cnr_number": cnr,
+        "case_type": "CS",
+        "case_stage": "Evidence",
+        "court_and_judge": "1-District Judge",
+        "next_hearing_date": next_hearing_date,
+        "petitioner": "1) Asha Rani",
+        "respondent": "1) Union of India",
+        "acts": [{"act": "CPC", "section": "9"}],
+        "orders": [{"order_number": str(n), "order_date": "07-07-2025", "order_details": "Notice",
+                    "pdf_link": None} for n in range(1, orders + 1)],
+        "case_history": [],
+    }
+
+@pytest.fixture
+def stored(case_db):
+    case_db.save_cases([make_case("CNR00000000000A", "05-08-2025", orders=2)], location={"court": "1"})
+    case_db.save_cases([make_case("CNR00000000000B", "20-09-2025")], location={"court": "2"})
+    case_db.save_cases([make_case("CNR00000000000C", "Not found", orders=0)], location={"court": "1"})
+    return case_db
+
+def read(table, fmt="csv", filters=None, compress=False, batch_size=case_export.BATCH_SIZE):
+    chunks, filename, media_type = case_export.export(table, fmt, filters, compress, batch_size)
+    return b"".join(chunks), filename, media_type
+
+def test_csv(stored):
+    data, filename, media_type = read("cases")
+
+    rows = list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+    assert filename == "cases.csv" and media_type == "text/csv"
+    assert [row["cnr"] for row in rows] == ["CNR00000000000A", "CNR00000000000B", "CNR00000000000C"]
+    assert rows[0]["petitioner"] == "1) Asha Rani" and rows[0]["next_hearing_on"] == "2025-08-05"
+
+def test_child_tables_are_keyed_by_cnr(stored):
+    data, _, _ = read("orders", "jsonl")
+
+    orders = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+    assert [(order["cnr"], order["order_number"]) for order in orders] == [
+        ("CNR00000000000A", "1"), ("CNR00000000000A", "2"), ("CNR00000000000B", "1")]
+
+def test_small_batches_give_the_same_output(stored):
+    assert read("orders", batch_size=1)[0] == read("orders")[0]
+    assert read("orders", "jsonl", batch_size=1)[0] == read("orders", "jsonl")[0]
+
+def test_gzip(stored):
+    data, filename, media_type = read("cases", "jsonl", compress=True)
+
+    assert filename == "cases.jsonl.gz" and media_type == "application/gzip"
+    assert gzip.decompress(data) == read("cases", "jsonl")[0]
+
+def test_parquet(stored, monkeypatch):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+    # Several row groups, each written as soon as it fills
+    monkeypatch.setattr(case_export, "ROW_GROUP_SIZE", 1)
+
+    data, filename, _ = read("cases", "parquet", compress=True, batch_size=1)
+
+    # Parquet compresses internally, so gzip is not applied on top
+    assert filename == "cases.parquet"
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(data))
+    assert table.column("cnr").to_pylist() == ["CNR00000000000A", "CNR00000000000B", "CNR00000000000C"]
+    assert table.schema.field("created").type == pyarrow.float64()
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"court_code": "1"}, ["CNR00000000000A", "CNR00000000000C"]),
+    ({"hearing_from": "2025-09-01"}, ["CNR00000000000B"]),
+    ({"hearing_from": "01-08-2025", "hearing_to": "31-08-2025"}, ["CNR00000000000A"]),
+    ({"court": "District", "case_stage": "Arguments"}, []),
+])
+def test_filters(stored, filters, expected):
+    data, _, _ = read("cases", "jsonl", filters)
+
+    assert [json.loads(line)["cnr"] for line in data.decode("utf-8").splitlines()] == expected
+
+def test_filters_apply_to_child_tables(stored):
+    data, _, _ = read("acts", filters={"court_code": "2"})
+
+    assert data.decode("utf-8").splitlines()[1:] == ["CNR00000000000B,CPC,9"]
+
+def test_unknown_table_or_format(stored):
+    with pytest.raises(ValueError):
+        case_export.export("parties")
+    with pytest.raises(ValueError):
+        case_export.export("cases", "xlsx")
+
+def test_export_to_dir(stored, tmp_path):
+    written = case_export.export_to_dir(tmp_path / "exports", "csv", compress=True)
+
+    assert sorted(written) == ["acts.csv.gz", "cases.csv.gz", "history.csv.gz", "orders.csv.gz"]
+    assert sorted(path.name for path in (tmp_path / "exports").iterdir()) == sorted(written)
+    assert gzip.decompress((tmp_path / "exports" / "history.csv.gz").read_bytes()).strip() == (
+        b"cnr,judge,business_date,hearing_date,purpose")
+
+def test_export_endpoint(stored):
+    client = TestClient(main.app)
+
+    response = client.get("/export/cases", params={"format": "jsonl", "court_code": "2"})
+    assert response.headers["content-disposition"] == 'attachment; filename="cases.jsonl"'
+    assert [json.loads(line)["cnr"] for line in response.text.splitlines()] == ["CNR00000000000B"]
+
+    assert client.get("/export/secrets").status_code == 400
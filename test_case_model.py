@@ -0,0 +1,95 @@
+"""
+Typed case model: portal date parsing (ordinals, mixed formats), sentinels,
+and the as_dict()/as_row() round trips
+"""
+
+import json
+from datetime import date
+
+import pytest
+
+import case_model
+import main
+
+RAW_CASE = {
+    "cnr_number": "ABCD010000012025",
+    "case_type": "R.C.S.",
+    "filing_number": "12/2025",
+    "filing_date": "05-01-2025",
+    "registration_number": "34/2025",
+    "registration_date": "Not found",
+    "first_hearing_date": "10th February 2025",
+    "next_hearing_date": "18th July 2025",
+    "case_stage": "Evidence",
+    "court_and_judge": "1-Civil Judge",
+    "petitioner": "A",
+    "respondent": "Not found",
+    "acts": [{"act": "CPC", "section": "9"}],
+    "orders": [{"order_number": "1", "order_date": "01-03-2025", "order_details": "Order", "pdf_link": "x"}],
+    "case_history": [{"judge": "Civil Judge", "business_date": "01-03-2025", "hearing_date": "18-07-2025",
+                      "purpose": "Evidence"}],
+}
+
+@pytest.mark.parametrize("text, expected", [
+    ("18th July 2025", "2025-07-18"),
+    ("1st August 2025", "2025-08-01"),
+    ("22nd Aug 2025", "2025-08-22"),
+    ("3rd March, 2024", "2024-03-03"),
+    ("July 18, 2025", "2025-07-18"),
+    ("07-07-2025", "2025-07-07"),
+    ("07/07/2025", "2025-07-07"),
+    ("07.07.2025", "2025-07-07"),
+    ("2025-07-07", "2025-07-07"),
+    ("  07-07-2025 ", "2025-07-07"),
+])
+def test_iso_date(text, expected):
+    assert case_model.iso_date(text) == expected
+
+@pytest.mark.parametrize("text", [None, "", "Not found", "N/A", "-", "31-02-2025", "next week"])
+def test_unreadable_dates_are_none(text):
+    assert case_model.iso_date(text) is None
+
+def test_ordinals():
+    ordinal = date(2025, 7, 18).toordinal()
+
+    assert case_model.parse_date("18-07-2025") == ordinal
+    assert case_model.parse_date(ordinal) == ordinal
+    assert case_model.display(ordinal) == "18-07-2025"
+    assert case_model.iso(None) is None and case_model.display(None) is None
+
+def test_clean_and_interned():
+    assert case_model.clean("  Smith   vs  State ") == "Smith vs State"
+    assert case_model.clean("Not found") is None
+    assert case_model.clean(None) is None
+    assert case_model.interned("Judge  A") is case_model.interned("Judge A")
+
+def test_error_dicts_give_no_case():
+    assert case_model.Case.from_dict({"error": "portal down"}) is None
+    assert case_model.Case.from_dict(None) is None
+
+def test_as_dict():
+    data = case_model.Case.from_dict(RAW_CASE).as_dict()
+
+    assert data["registration_date"] is None and data["respondent"] is None
+    assert data["next_hearing_date"] == "2025-07-18"
+    assert data["orders"][0]["order_date"] == "2025-03-01"
+    assert data["case_history"][0]["hearing_date"] == "2025-07-18"
+    # The ISO dict parses back to the same case
+    assert case_model.Case.from_dict(data).as_dict() == data
+
+def test_as_row_round_trip():
+    case = case_model.Case.from_dict(RAW_CASE)
+
+    restored = case_model.Case.from_row(json.loads(json.dumps(case.as_row())))
+
+    assert restored.as_dict() == case.as_dict()
+    # Repeated strings come back interned
+    assert restored.case_history[0].judge is case.case_history[0].judge
+
+def test_order_metadata_comes_from_the_last_cases(monkeypatch):
+    case = case_model.Case.from_dict(RAW_CASE)
+    monkeypatch.setattr(main, "last_case_results", [case])
+    order = case.orders[0]
+
+    assert main.get_order_metadata(1, order.order_number) == (case.cnr_number, case_model.iso(order.order_date))
+    assert main.get_order_metadata(2, order.order_number) == (None, None)
@@ -0,0 +1,100 @@
+"""
+Case persistence: extractor dicts in, normalized rows out
+"""
+
+from fastapi.testclient import TestClient
+
+import case_model
+import main
+
+def make_case(cnr="DLHC010000012025", **fields):
+    case_data = {
+        "cnr_number": cnr,
+        "case_type": "CS(OS)",
+        "filing_number": "123/2025",
+        "filing_date": "07-07-2025",
+        "registration_number": "45/2025",
+        "registration_date": "Not found",
+        "first_hearing_date": "10th July 2025",
+        "next_hearing_date": "10th November 2025",
+        "case_stage": "Evidence",
+        "court_and_judge": "1-District Judge",
+        "petitioner": "1) Asha Rani",
+        "respondent": "1) Union of India",
+        "acts": [{"act": "CPC", "section": "9"}],
+        "orders": [{"order_number": "1", "order_date": "07-07-2025",
+                    "order_details": "Notice issued", "pdf_link": "/pdf/1"}],
+        "case_history": [{"judge": "DJ-1", "business_date": "07-07-2025",
+                          "hearing_date": "10-11-2025", "purpose": "Evidence"}],
+    }
+    case_data.update(fields)
+    return case_data
+
+def test_round_trip(case_db):
+    saved = case_db.save_cases([make_case()], location={"state": "26", "district": "1", "court": "3"})
+
+    assert saved == ["DLHC010000012025"]
+    case_data = case_db.get_case("DLHC010000012025")
+    assert case_data["court_code"] == "3"
+    assert case_data["next_hearing_on"] == "2025-11-10"
+    assert case_data["petitioner"] == "1) Asha Rani"
+    # The extractor's sentinel is not stored
+    assert case_data["registration_date"] is None
+    assert case_data["acts"] == [{"act": "CPC", "section": "9"}]
+    assert case_data["orders"][0]["order_details"] == "Notice issued"
+    assert case_data["case_history"][0]["purpose"] == "Evidence"
+
+def test_resave_replaces_child_rows_and_keeps_location(case_db):
+    case_db.save_cases([make_case()], location={"court": "3"})
+    case_db.save_cases([make_case(acts=[], case_stage="Arguments")])
+
+    case_data = case_db.get_case("DLHC010000012025")
+    assert case_data["acts"] == []
+    assert case_data["case_stage"] == "Arguments"
+    assert case_data["court_code"] == "3"
+
+def test_cases_without_cnr_or_with_errors_are_skipped(case_db):
+    saved = case_db.save_cases([make_case(cnr="Not found"), {"error": "timeout"}, None])
+
+    assert saved == []
+    assert case_db.find_cases() == []
+
+def test_find_cases_filters_and_orders_by_next_hearing(case_db):
+    case_db.save_cases([
+        make_case("CNR00000000000A", next_hearing_date="20-11-2025"),
+        make_case("CNR00000000000B", next_hearing_date="05-11-2025", case_stage="Arguments"),
+        make_case("CNR00000000000C", next_hearing_date="Not found"),
+    ])
+
+    assert [c["cnr_number"] for c in case_db.find_cases()] == [
+        "CNR00000000000B", "CNR00000000000A", "CNR00000000000C"]
+    assert [c["cnr_number"] for c in case_db.find_cases(case_stage="Arguments")] == ["CNR00000000000B"]
+    in_range = case_db.find_cases(next_hearing_from="10-11-2025", next_hearing_to="2025-11-30")
+    assert [c["cnr_number"] for c in in_range] == ["CNR00000000000A"]
+    assert case_db.get_case("UNKNOWN") is None
+
+def test_cases_endpoints_answer_from_the_database(case_db):
+    case_db.save_cases([make_case()])
+    client = TestClient(main.app)
+
+    listed = client.get("/cases", params={"case_stage": "Evidence"}).json()
+    assert listed["success"] and listed["count"] == 1
+
+    found = client.get("/cases/DLHC010000012025").json()
+    assert found["case"]["orders"][0]["pdf_link"] == "/pdf/1"
+    assert client.get("/cases/UNKNOWN").json()["success"] is False
+
+def test_date_columns_keep_the_portal_text(case_db):
+    case_db.save_cases([make_case()])
+
+    case_data = case_db.get_case("DLHC010000012025")
+    assert case_data["next_hearing_date"] == "10th November 2025"
+    assert case_data["orders"][0]["order_date"] == "07-07-2025"
+
+def test_case_objects_are_saved_with_portal_style_dates(case_db):
+    case_db.save_cases([case_model.Case.from_dict(make_case())])
+
+    case_data = case_db.get_case("DLHC010000012025")
+    assert case_data["next_hearing_date"] == "10-11-2025"
+    assert case_data["next_hearing_on"] == "2025-11-10"
+    assert case_data["case_history"][0]["hearing_date"] == "10-11-2025"
@@ -0,0 +1,97 @@
+"""
+/list-pdfs keyset pagination: walking every page with each sort order must
+return every catalog row exactly once, in order, even when many rows share
+the sort value
+"""
+
+import base64
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import pdf_store
+
+COUNT = 23
+
+@pytest.fixture
+def catalog(pdf_store_dir):
+    conn = pdf_store._db()
+    with conn:
+        for i in range(COUNT):
+            pdf_store._catalog_upsert(conn, {
+                "local_path": f"/store/{i}.pdf",
+                "sha256": f"{i:064x}",
+                "filename": f"order_{i % 5}.pdf",
+                "download_url": f"/serve-pdf/{i}.pdf",
+                # Lots of ties, so the id tie-breaker matters
+                "size": 1000 * (i % 3),
+                "created": 1700000000.0 + i // 4,
+                "cnr": "ABCD010000012025" if i % 2 else None,
+                "order_number": str(i),
+                "order_date": f"{1 + i % 28:02d}-08-2025" if i % 4 else None,
+            })
+    return COUNT
+
+def walk(limit, **filters):
+    """Every item, one page at a time"""
+    items, cursor = pdf_store.list_catalog(limit=limit, **filters)
+    pages = 1
+    while cursor:
+        page, cursor = pdf_store.list_catalog(limit=limit, cursor=cursor, **filters)
+        items += page
+        pages += 1
+    return items, pages
+
+@pytest.mark.parametrize("value", [1700000000.5, 0, "order_1.pdf", "2025-08-01"])
+def test_cursor_round_trip(value):
+    assert pdf_store._decode_cursor(pdf_store._encode_cursor(value, 42)) == (value, 42)
+
+@pytest.mark.parametrize("sort", ["created", "size", "filename"])
+@pytest.mark.parametrize("order", ["desc", "asc"])
+def test_pages_cover_everything(catalog, sort, order):
+    items, pages = walk(4, sort=sort, order=order)
+
+    paths = [item["download_url"] for item in items]
+    assert len(paths) == catalog and len(set(paths)) == catalog
+    values = [item[sort] for item in items]
+    assert values == sorted(values, reverse=order == "desc")
+    assert pages == (catalog + 3) // 4
+
+def test_order_date_sort_skips_undated_rows(catalog):
+    items, _ = walk(5, sort="order_date", order="asc")
+
+    dates = [item["order_date"] for item in items]
+    assert None not in dates and dates == sorted(dates)
+    # Stored as YYYY-MM-DD
+    assert all(d.startswith("2025-08-") for d in dates)
+
+def test_filters(catalog):
+    items, _ = walk(3, cnr="ABCD010000012025")
+    assert items and all(item["cnr"] == "ABCD010000012025" for item in items)
+
+    items, _ = walk(3, min_size=1000, max_size=1000)
+    assert items and all(item["size"] == 1000 for item in items)
+
+def test_unknown_sort_field_is_rejected(catalog):
+    with pytest.raises(ValueError):
+        pdf_store.list_catalog(sort="sha256")
+
+@pytest.mark.parametrize("value", [5, None, [1, None], [1, 2, 3], ["x", "7"], [True, 1], {"a": 1}])
+def test_cursors_of_the_wrong_shape_are_rejected(value):
+    cursor = base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+    with pytest.raises(ValueError):
+        pdf_store._decode_cursor(cursor)
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm90IGpzb24=", "//79", "é"])
+def test_undecodable_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        pdf_store._decode_cursor(cursor)
+
+def test_list_pdfs_answers_a_bad_cursor_with_400(catalog):
+    response = TestClient(main.app).get("/list-pdfs", params={"cursor": "NQ=="})
+
+    assert response.status_code == 400
+    assert response.json()["pdfs"] == []
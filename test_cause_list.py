@@ -0,0 +1,98 @@
+"""
+Cause list parsing, job planning and the fetch pipeline, on a hand-written
+table shaped like the portal's (section headings spanning the table, CNRs
+in the case cell's links)
+"""
+
+import pytest
+
+import cause_list
+
+CAUSE_LIST_HTML = """
+<table>
+  <thead><tr><th>Sr No</th><th>Cases</th><th>Party Name</th><th>Advocate</th></tr></thead>
+  <tr><td colspan="4">Evidence</td></tr>
+  <tr>
+    <td>1</td>
+    <td><a onclick="viewHistory('ABCD010000012025')">R.C.S./0012/2025</a><br>Next date: 18-07-2025</td>
+    <td>A vs State</td>
+    <td>X. Adv</td>
+  </tr>
+  <tr>
+    <td>2</td>
+    <td>Cri.M.A. / 7 / 2024</td>
+    <td>B vs C</td>
+  </tr>
+  <tr><td colspan="4">Arguments</td></tr>
+  <tr><td>3</td><td>S.C.C./000/2023</td><td>D vs E</td><td></td></tr>
+  <tr><td>Note</td><td>Not a listing</td><td>-</td></tr>
+  <tr><td>4</td><td>only two cells</td></tr>
+</table>
+"""
+
+COURTS = [{"state": 1, "district": 2, "court": 3}, {"state": 1, "district": 2, "court": 4, "court_no": 7}]
+
+def test_parse_cause_list():
+    rows = cause_list.parse_cause_list(CAUSE_LIST_HTML)
+
+    assert [row["sr_no"] for row in rows] == [1, 2, 3]
+    first, second, third = rows
+    assert first["section"] == "Evidence" and first["cnr"] == "ABCD010000012025"
+    assert (first["case_type"], first["case_number"], first["case_year"]) == ("R.C.S.", "12", "2025")
+    assert first["parties"] == "A vs State" and first["advocate"] == "X. Adv"
+    assert second["cnr"] is None and second["advocate"] is None
+    assert (second["case_type"], second["case_number"], second["case_year"]) == ("Cri.M.A.", "7", "2024")
+    assert third["section"] == "Arguments" and third["case_number"] == "0"
+
+def test_parse_empty_page():
+    assert cause_list.parse_cause_list("") == []
+
+def test_parse_case_number():
+    assert cause_list.parse_case_number("R.C.S./123/2020") == ("R.C.S.", "123", "2020")
+    assert cause_list.parse_case_number("no number here") == (None, None, None)
+    assert cause_list.parse_case_number(None) == (None, None, None)
+
+def test_make_jobs():
+    jobs = cause_list.make_jobs(COURTS, ["2025-08-01", "02-08-2025"], ["civ"])
+
+    assert len(jobs) == 4
+    assert [job["list_date"] for job in jobs[:2]] == ["2025-08-01", "2025-08-02"]
+    assert jobs[0]["court_no"] is None and jobs[2]["court_no"] == "7"
+    assert cause_list.portal_date("2025-08-01") == "01-08-2025"
+
+@pytest.mark.parametrize("dates", [["tomorrow"], ["2025-08-01", "31-02-2025"]])
+def test_bad_dates_are_refused_before_any_job_exists(dates):
+    with pytest.raises(ValueError):
+        cause_list.make_jobs(COURTS, dates)
+
+def test_portal_date_refuses_unreadable_dates():
+    with pytest.raises(ValueError):
+        cause_list.portal_date("next monday")
+
+def test_pipeline_indexes_rows_and_skips_fetched_lists(cause_list_db):
+    fetched_jobs = []
+
+    def fetch(job):
+        fetched_jobs.append(job)
+        return {"success": True, "lists": [
+            {"court_no": "7", "court_name": "Civil Judge", "list_type": list_type, "html": CAUSE_LIST_HTML}
+            for list_type in job["list_types"]
+        ]}
+
+    jobs = cause_list_db.make_jobs(COURTS[1:], ["2025-08-01"])
+    summaries = cause_list_db.run_pipeline(jobs, fetch)
+
+    assert summaries[0]["lists"] == 2 and summaries[0]["rows"] == 6
+    listings = cause_list_db.find_listings(list_date="2025-08-01", cnrs=["ABCD010000012025"])
+    assert {listing["case_number"] for listing in listings} == {"12"}
+
+    # A second run finds nothing left to fetch
+    assert cause_list_db.run_pipeline(jobs, fetch)[0]["skipped"] is True
+    assert len(fetched_jobs) == 1
+
+def test_failed_lists_are_fetched_again(cause_list_db):
+    jobs = cause_list_db.make_jobs(COURTS[1:], ["2025-08-01"], ["civ"])
+    cause_list_db.run_pipeline(jobs, lambda job: {"success": True, "lists": [
+        {"court_no": "7", "list_type": "civ", "error": "Captcha failed"}]})
+
+    assert cause_list_db.is_fetched(jobs[0], "civ") is False
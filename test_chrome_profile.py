@@ -0,0 +1,73 @@
+"""
+Cloning the Chrome profile template and cleaning up clones left behind
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import chrome_profile
+
+@pytest.fixture
+def chrome_dirs(tmp_path, monkeypatch):
+    template = tmp_path / "chrome" / "template"
+    monkeypatch.setattr(chrome_profile, "TEMPLATE_DIR", template)
+    monkeypatch.setattr(chrome_profile, "PROFILES_DIR", tmp_path / "chrome" / "profiles")
+    (template / "Default" / "Cache").mkdir(parents=True)
+    (template / "Default" / "Cache" / "data_0").write_bytes(b"x" * 1024)
+    (template / "ShaderCache").mkdir()
+    (template / "Default" / "Preferences").write_text("{}")
+    (template / "Local State").write_text("{}")
+    return template
+
+def _exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def _age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+def test_clone_without_copy_on_write_leaves_caches_out(chrome_dirs, monkeypatch):
+    monkeypatch.setattr(chrome_profile, "_reflink_tree", lambda src, dst: False)
+    profile = chrome_profile.clone()
+    assert (profile / "Local State").is_file()
+    assert (profile / "Default" / "Preferences").is_file()
+    assert not (profile / "Default" / "Cache").exists()
+    assert not (profile / "ShaderCache").exists()
+    assert profile.name.startswith(f"{os.getpid()}-")
+
+def test_clone_keeps_caches_when_blocks_are_shared(chrome_dirs, monkeypatch):
+    monkeypatch.setattr(chrome_profile, "_reflink_tree", lambda src, dst: chrome_profile._clone_tree(src, dst) or True)
+    profile = chrome_profile.clone()
+    assert (profile / "Default" / "Cache" / "data_0").is_file()
+
+def test_remove_stale_skips_profiles_whose_process_is_running(chrome_dirs):
+    profiles = chrome_profile.PROFILES_DIR
+    in_use = profiles / f"{os.getpid()}-aaaaaaaaaaaa"
+    orphaned = profiles / f"{_exited_pid()}-bbbbbbbbbbbb"
+    recent = profiles / f"{_exited_pid()}-cccccccccccc"
+    for path in (in_use, orphaned, recent):
+        path.mkdir(parents=True)
+    _age(in_use, 2 * chrome_profile.STALE_AFTER)
+    _age(orphaned, 2 * chrome_profile.STALE_AFTER)
+
+    assert chrome_profile.remove_stale() == 1
+    assert in_use.exists() and recent.exists()
+    assert not orphaned.exists()
+
+def test_remove_stale_cleans_half_built_templates(chrome_dirs):
+    in_use = chrome_dirs.with_name(f"template.{os.getpid()}-aaaaaaaa.tmp")
+    orphaned = chrome_dirs.with_name(f"template.{_exited_pid()}-bbbbbbbb.old")
+    unowned = chrome_dirs.with_name("template.cccccccc.tmp")
+    for path in (in_use, orphaned, unowned):
+        path.mkdir()
+        _age(path, 2 * chrome_profile.STALE_AFTER)
+
+    assert chrome_profile.remove_stale() == 2
+    assert in_use.exists()
+    assert chrome_dirs.exists()
@@ -0,0 +1,107 @@
+"""
+/lookup-cnr and /lookup-cnr/batch, with the portal lookup itself faked
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from case_model import Case
+
+CNR = "MHAU010012342020"
+
+@pytest.fixture
+def client(cache_db, case_db, fake_pool):
+    return TestClient(main.app)
+
+@pytest.fixture
+def portal(monkeypatch):
+    """Fake run_cnr_lookup: CNRs in `cases` are found, the rest are not"""
+    portal = type("Portal", (), {})()
+    portal.cases = {}
+    portal.lookups = []
+
+    def run_cnr_lookup(browser, cnr, max_captcha_attempts=3):
+        portal.lookups.append(cnr)
+        if cnr not in portal.cases:
+            return {"success": False, "error": f"No case found for CNR {cnr}", "no_cases": True}
+        return {"success": True, "cases": [portal.cases[cnr]]}
+
+    monkeypatch.setattr(main, "run_cnr_lookup", run_cnr_lookup)
+    return portal
+
+@pytest.mark.parametrize("value, expected", [
+    ("MHAU010012342020", CNR),
+    (" mhau-0100-1234-2020 ", CNR),
+    ("MHAU 010012342020", CNR),
+    ("MHAU01001234202", None),
+    ("1234010012342020", None),
+    (None, None),
+])
+def test_normalise_cnr(value, expected):
+    assert main.normalise_cnr(value) == expected
+
+def test_invalid_cnr_is_refused(client, portal):
+    reply = client.post("/lookup-cnr", data={"cnr": "12345"}).json()
+
+    assert reply["success"] is False and "16-character" in reply["error"]
+    assert portal.lookups == []
+
+def test_lookup_runs_in_a_pooled_browser(client, portal):
+    portal.cases[CNR] = Case(cnr_number=CNR, case_stage="Evidence", next_hearing_date="18-07-2025",
+                             filing_date="Not found")
+
+    reply = client.post("/lookup-cnr", data={"cnr": CNR.lower()}).json()
+
+    assert reply["success"] and reply["cached"] is False and reply["cnr"] == CNR
+    case = reply["cases"][0]
+    assert case["case_stage"] == "Evidence" and case["case_index"] == 1
+    # Dates come back as ISO and missing values as null
+    assert case["next_hearing_date"] == "2025-07-18" and case["filing_date"] is None
+    assert portal.lookups == [CNR]
+
+def test_cached_answers_skip_the_portal(client, portal, cache_db):
+    cache_db.put_case_details(cache_db.make_key("cnr", None, None, CNR, ""), [Case(cnr_number=CNR)])
+    cache_db.put_search_results(cache_db.make_key("cnr-search", None, None, "MHAU010012352020", ""), None)
+
+    assert client.post("/lookup-cnr", data={"cnr": CNR}).json()["cached"] is True
+    missing = client.post("/lookup-cnr", data={"cnr": "MHAU010012352020"}).json()
+    assert missing["cached"] is True and missing["no_cases"] is True
+    assert portal.lookups == []
+
+    client.post("/lookup-cnr", data={"cnr": CNR, "use_cache": "0"})
+    assert portal.lookups == [CNR]
+
+def test_batch_keeps_input_order_and_reports_invalid_numbers(client, portal):
+    portal.cases["MHAU010000012020"] = Case(cnr_number="MHAU010000012020")
+    portal.cases["MHAU010000032020"] = Case(cnr_number="MHAU010000032020")
+
+    reply = client.post("/lookup-cnr/batch", data={
+        "cnrs": "MHAU010000032020, MHAU010000022020\nnot-a-cnr MHAU010000012020 mhau010000032020"
+    }).json()
+
+    assert [result["cnr"] for result in reply["results"]] == [
+        "MHAU010000032020", "MHAU010000022020", "MHAU010000012020"]
+    assert reply["found"] == 2 and reply["count"] == 3
+    assert reply["invalid"] == ["not-a-cnr"]
+    # "Not found" is an answer, not an error
+    assert reply["errors"] == []
+
+def test_batch_reports_broken_browsers_per_cnr(client, monkeypatch):
+    def run_cnr_lookup(browser, cnr, max_captcha_attempts=3):
+        raise RuntimeError("chrome not reachable")
+
+    monkeypatch.setattr(main, "run_cnr_lookup", run_cnr_lookup)
+
+    reply = client.post("/lookup-cnr/batch", data={"cnrs": CNR}).json()
+
+    assert reply["results"][0]["error_type"] == "browser_error"
+    assert reply["errors"] == [f"{CNR}: RuntimeError: chrome not reachable"]
+
+def test_batch_limit(client, portal, monkeypatch):
+    monkeypatch.setattr(main, "CNR_BATCH_LIMIT", 1)
+
+    reply = client.post("/lookup-cnr/batch", data={"cnrs": "MHAU010000012020 MHAU010000022020"}).json()
+
+    assert reply["success"] is False
+    assert portal.lookups == []
@@ -0,0 +1,32 @@
+"""
+POST /search/fan-out concurrency, with the portal cascade faked
+"""
+
+import threading
+
+from fastapi.testclient import TestClient
+
+import fan_out
+import main
+from case_model import Case
+
+FORM = {"state": "26", "district": "1", "case_type": "CS", "case_number": "45", "case_year": "2025"}
+
+def test_courts_are_searched_past_the_pool_size(cache_db, fake_pool, monkeypatch):
+    monkeypatch.setattr(fan_out, "WORKERS", 4)
+    # Every lookup waits for all four to be running at once
+    together = threading.Barrier(4, timeout=5)
+
+    def run_case_lookup(browser, spec, max_captcha_attempts=3):
+        together.wait()
+        return {"success": True, "results": {"total_cases": 1},
+                "cases": [Case(cnr_number=f"DLHC0{spec['court']}0000012025")]}
+
+    monkeypatch.setattr(main, "run_case_lookup", run_case_lookup)
+    reply = TestClient(main.app).post("/search/fan-out",
+                                      data=dict(FORM, court=["1", "2", "3", "4"])).json()
+
+    assert reply["success"] and reply["count"] == 4
+    assert reply["errors"] == []
+    stats = fake_pool.stats()
+    assert stats["idle"] == 2 and stats["in_use"] == 0
@@ -0,0 +1,117 @@
+"""
+Hearing calendar: which hearings a case contributes, the index behind
+/hearings, and the iCalendar feed's escaping and line folding
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import case_model
+import hearing_calendar
+import main
+
+CASE = {
+    "cnr_number": "ABCD010000012025",
+    "case_type": "R.C.S.",
+    "registration_number": "34/2025",
+    "case_stage": "Evidence",
+    "court_and_judge": "1-Civil Judge",
+    "petitioner": "A",
+    "respondent": "State",
+    "next_hearing_date": "18-07-2025",
+    "case_history": [
+        {"judge": "Civil Judge", "business_date": "01-03-2025", "hearing_date": "10-04-2025",
+         "purpose": "Appearance"},
+        {"judge": "Civil Judge", "business_date": "10-04-2025", "hearing_date": "18-07-2025",
+         "purpose": "Evidence"},
+    ],
+}
+
+HEARING = {"cnr": "ABCD010000012025", "hearing_on": "2025-07-18", "kind": "next", "case_type": "R.C.S.",
+           "registration_number": "34/2025", "parties": "A, B vs State; Others",
+           "court_and_judge": "1-Civil Judge", "judge": None, "purpose": "Evidence", "case_stage": "Evidence"}
+
+def test_hearings_of():
+    hearings = sorted(hearing_calendar.hearings_of(case_model.Case.from_dict(CASE)))
+
+    assert hearings == [
+        ("2025-03-01", "heard", "Civil Judge", "Appearance"),
+        ("2025-04-10", "heard", "Civil Judge", "Evidence"),
+        ("2025-04-10", "listed", "Civil Judge", "Appearance"),
+        # The next date replaces the same date listed in the history
+        ("2025-07-18", "next", "Civil Judge", "Evidence"),
+    ]
+
+def test_saved_cases_are_indexed(case_db, hearings_db):
+    case_db.save_cases([CASE], location={"state": "1", "district": "2", "court": "3"})
+
+    start, end, hearings = hearings_db.find_hearings("2025-04-01", "2025-07-31", court_code="3")
+    assert (start, end) == ("2025-04-01", "2025-07-31")
+    assert sorted((h["hearing_on"], h["kind"]) for h in hearings) == [
+        ("2025-04-10", "heard"), ("2025-04-10", "listed"), ("2025-07-18", "next")]
+    assert hearings[-1]["parties"] == "A vs State"
+    assert hearings_db.find_hearings("2025-04-01", "2025-07-31", court_code="4")[2] == []
+
+def test_hearings_endpoints(case_db):
+    case_db.save_cases([CASE])
+    client = TestClient(main.app)
+
+    reply = client.get("/hearings", params={"from": "2025-07-01", "to": "2025-07-31"}).json()
+    assert [hearing["hearing_on"] for hearing in reply["hearings"]] == ["2025-07-18"]
+
+    feed = client.get("/hearings.ics", params={"from": "2025-07-01", "to": "2025-07-31"})
+    assert feed.headers["content-type"].startswith("text/calendar")
+    assert "DTSTART;VALUE=DATE:20250718" in feed.text
+
+@pytest.mark.parametrize("date_from, date_to", [
+    ("not a date", None),
+    ("2025-08-01", "soon"),
+    # Reversed range
+    ("2025-08-10", "01-08-2025"),
+])
+def test_bad_bounds_are_refused(hearings_db, date_from, date_to):
+    with pytest.raises(ValueError):
+        hearings_db.find_hearings(date_from, date_to)
+
+    reply = TestClient(main.app).get("/hearings", params={"from": date_from, "to": date_to or ""})
+    assert reply.status_code == 400 and reply.json()["success"] is False
+
+def test_ical_text():
+    text = hearing_calendar._ical_text
+
+    assert text("A, B; C\\D") == "A\\, B\\; C\\\\D"
+    assert text("line 1\r\nline 2\nline 3") == "line 1\\nline 2\\nline 3"
+    assert text(None) == ""
+
+def test_fold_long_lines():
+    line = "DESCRIPTION:" + "x" * 200
+
+    parts = hearing_calendar._fold(line).split("\r\n")
+
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    assert all(part.startswith(" ") for part in parts[1:])
+    assert parts[0] + "".join(part[1:] for part in parts[1:]) == line
+    assert hearing_calendar._fold("SUMMARY:short") == "SUMMARY:short"
+
+def test_fold_never_splits_a_character():
+    line = "SUMMARY:" + "न्यायालय " * 20
+
+    parts = hearing_calendar._fold(line).split("\r\n")
+
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    assert parts[0] + "".join(part[1:] for part in parts[1:]) == line
+
+def test_to_ical():
+    feed = hearing_calendar.to_ical([HEARING])
+
+    lines = feed.split("\r\n")
+    assert feed.endswith("\r\n") and "\n" not in feed.replace("\r\n", "")
+    assert lines[0] == "BEGIN:VCALENDAR" and lines[-2] == "END:VCALENDAR"
+    assert "DTSTART;VALUE=DATE:20250718" in lines and "DTEND;VALUE=DATE:20250719" in lines
+    assert "SUMMARY:R.C.S. 34/2025: A\\, B vs State\\; Others" in lines
+
+def test_same_hearing_keeps_its_uid():
+    # Calendar apps then update the event instead of duplicating it
+    uids = [[line for line in hearing_calendar.to_ical([HEARING]).split("\r\n") if line.startswith("UID:")]
+            for _ in range(2)]
+    assert uids[0] and uids[0] == uids[1]
@@ -0,0 +1,26 @@
+"""
+Prometheus text from /metrics: metric types and scrape-time samples
+"""
+
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+
+client = TestClient(main.app)
+
+def _types(text):
+    return dict(line.split()[2:4] for line in text.splitlines() if line.startswith("# TYPE"))
+
+def test_scraped_samples_skip_missing_values():
+    lines = metrics.counter("jobs_total", "Jobs", [({"kind": "a"}, 3), ({"kind": "b"}, None), ({}, 1)])
+    assert lines == ["# HELP jobs_total Jobs", "# TYPE jobs_total counter", 'jobs_total{kind="a"} 3', "jobs_total 1"]
+
+def test_pool_totals_are_counters(fake_pool):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    types = _types(response.text)
+    assert types["ecourts_browser_recycled_total"] == "counter"
+    assert types["ecourts_browser_killed_total"] == "counter"
+    assert types["ecourts_browser_orphans_reaped_total"] == "counter"
+    assert types["ecourts_browser_pool"] == "gauge"
@@ -0,0 +1,90 @@
+"""
+Resumable PDF downloads against a fake requests.get - no network needed
+"""
+
+import pytest
+import requests
+
+import pdf_download
+from pdf_download import _parse_total, download_resumable, validate_pdf
+
+PDF = b"%PDF-1.4\n" + b"x" * 4000 + b"\n%%EOF\n"
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b"", fail_after=None, **headers):
+        self.status_code = status_code
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+        self.body = body
+        self.fail_after = fail_after
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection reset")
+            yield self.body[start:start + chunk_size]
+
+@pytest.fixture
+def partial_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_download, "PARTIAL_DIR", tmp_path / ".partial")
+    monkeypatch.setattr(pdf_download, "CHUNK_SIZE", 1000)
+    monkeypatch.setattr(pdf_download.time, "sleep", lambda seconds: None)
+    return tmp_path / ".partial"
+
+def test_parse_total():
+    assert _parse_total(FakeResponse(Content_Range="bytes 100-199/1000"), 100) == 1000
+    assert _parse_total(FakeResponse(Content_Range="bytes */1000"), 0) == 1000
+    assert _parse_total(FakeResponse(Content_Range="bytes 100-199/*"), 100) is None
+    # A 200 reply: Content-Length counts from the offset we asked for
+    assert _parse_total(FakeResponse(Content_Length="900"), 100) == 1000
+    assert _parse_total(FakeResponse(Content_Length="abc"), 0) is None
+    assert _parse_total(FakeResponse(), 0) is None
+
+def test_validate_pdf(tmp_path):
+    good = tmp_path / "good.pdf"
+    good.write_bytes(PDF)
+    assert validate_pdf(good) == (True, "ok")
+
+    truncated = tmp_path / "truncated.pdf"
+    truncated.write_bytes(PDF[:2000])
+    assert validate_pdf(truncated)[0] is False
+
+    html = tmp_path / "error.pdf"
+    html.write_bytes(b"<html>Session expired</html>")
+    assert validate_pdf(html)[0] is False
+
+def test_interrupted_download_resumes_with_range(partial_dir, monkeypatch):
+    requests_seen = []
+
+    def fake_get(url, headers=None, **kwargs):
+        requests_seen.append(dict(headers))
+        if "Range" not in headers:
+            return FakeResponse(200, PDF, fail_after=2000, Content_Length=str(len(PDF)), ETag='"v1"')
+        offset = int(headers["Range"][len("bytes="):-1])
+        return FakeResponse(206, PDF[offset:],
+                            Content_Range=f"bytes {offset}-{len(PDF) - 1}/{len(PDF)}")
+
+    monkeypatch.setattr(pdf_download.requests, "get", fake_get)
+
+    path = download_resumable("https://example.test/order.pdf")
+
+    assert path.read_bytes() == PDF
+    assert requests_seen[1] == {"Range": "bytes=2000-", "If-Range": '"v1"'}
+    # The sidecar is removed once the file is complete
+    assert list(partial_dir.glob("*.json")) == []
+
+def test_server_ignoring_range_restarts_from_zero(partial_dir, monkeypatch):
+    part_path, meta_path = pdf_download._paths("https://example.test/order.pdf")
+    partial_dir.mkdir()
+    part_path.write_bytes(b"stale bytes from an older copy")
+
+    monkeypatch.setattr(pdf_download.requests, "get",
+                        lambda url, **kwargs: FakeResponse(200, PDF, Content_Length=str(len(PDF))))
+
+    assert download_resumable("https://example.test/order.pdf").read_bytes() == PDF
+
+def test_invalid_pdf_is_discarded(partial_dir, monkeypatch):
+    monkeypatch.setattr(pdf_download.requests, "get",
+                        lambda url, **kwargs: FakeResponse(200, b"<html>Session expired</html>"))
+
+    assert download_resumable("https://example.test/order.pdf") is None
+    assert list(partial_dir.iterdir()) == []
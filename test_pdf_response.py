@@ -0,0 +1,91 @@
+"""
+Byte ranges and conditional GETs on stored PDFs, served from a bare app so
+no browser or portal session is needed
+"""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import pdf_response
+from pdf_response import file_sha256, parse_range, pdf_file_response
+
+SIZE = 1000
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("items=0-10", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=500-", (500, 999)),
+    # End past the file is clamped
+    ("bytes=900-5000", (900, 999)),
+    # Suffix ranges: the last N bytes
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=-0", "unsatisfiable"),
+    ("bytes=200-100", "unsatisfiable"),
+    ("bytes=1000-", "unsatisfiable"),
+    ("bytes=1000-1200", "unsatisfiable"),
+    # Multipart and garbage fall back to the whole file
+    ("bytes=0-10,20-30", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+def test_empty_file_has_no_satisfiable_range():
+    assert parse_range("bytes=0-0", 0) == "unsatisfiable"
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "order.pdf"
+    path.write_bytes(bytes(range(256)) * 4)
+
+    app = FastAPI()
+
+    @app.get("/pdf")
+    def serve(request: Request):
+        return pdf_file_response(request, path, "order.pdf")
+
+    return TestClient(app)
+
+def test_range_request_returns_partial_content(client):
+    response = client.get("/pdf", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    assert response.content == bytes(range(10, 20))
+
+def test_unsatisfiable_range(client):
+    response = client.get("/pdf", headers={"Range": "bytes=5000-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+def test_matching_etag_is_not_modified(client):
+    etag = client.get("/pdf").headers["etag"]
+
+    assert client.get("/pdf", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/pdf", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+def test_stale_if_range_sends_the_whole_file(client):
+    response = client.get("/pdf", headers={"Range": "bytes=10-19", "If-Range": '"old"'})
+
+    assert response.status_code == 200
+    assert len(response.content) == 1024
+
+def test_hash_cache_keeps_one_entry_per_file_and_drops_the_oldest(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_response, "HASH_CACHE_ENTRIES", 2)
+    monkeypatch.setattr(pdf_response, "_hash_cache", pdf_response.OrderedDict())
+    paths = [tmp_path / f"{n}.pdf" for n in range(3)]
+    for path in paths:
+        path.write_bytes(b"%PDF version 1")
+        file_sha256(path, path.stat())
+
+    assert list(pdf_response._hash_cache) == [str(path) for path in paths[1:]]
+
+    # A rewritten file replaces its own entry with the new hash
+    paths[2].write_bytes(b"%PDF version 2, longer")
+    digest = file_sha256(paths[2], paths[2].stat())
+    assert len(pdf_response._hash_cache) == 2
+    assert pdf_response._hash_cache[str(paths[2])][2] == digest
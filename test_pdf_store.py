@@ -0,0 +1,47 @@
+import pdf_store
+
+def test_same_content_is_stored_once(pdf_store_dir):
+    first = pdf_store.write_stream([b"%PDF-1.4 ", b"order one"], cnr="ABCD010000012025", order_number=1,
+                                   order_date="01-03-2025", source_url="https://portal/1")
+    again = pdf_store.write_stream([b"%PDF-1.4 order one"], cnr="ABCD010000012025", order_number=1,
+                                   order_date="01-03-2025", source_url="https://portal/1")
+    assert first["sha256"] == again["sha256"]
+    assert pdf_store.blob_path(first["sha256"]).read_bytes() == b"%PDF-1.4 order one"
+    assert len(list((pdf_store_dir / "downloads" / "store").rglob("*.pdf"))) == 1
+    assert first["download_url"] == f"/serve-pdf/{first['sha256']}.pdf"
+
+def test_lookup_by_order_and_url(pdf_store_dir):
+    record = pdf_store.write_stream([b"%PDF order"], cnr="ABCD010000012025", order_number=2,
+                                    order_date="02-03-2025", source_url="https://portal/2")
+    assert pdf_store.find_order("ABCD010000012025", 2)["sha256"] == record["sha256"]
+    assert pdf_store.find_order("ABCD010000012025", 2, "02-03-2025")["sha256"] == record["sha256"]
+    assert pdf_store.find_order("ABCD010000012025", 3) is None
+    assert pdf_store.find_order("Not found", 2) is None
+    assert pdf_store.find_by_url("https://portal/2")["sha256"] == record["sha256"]
+
+def test_non_pdf_content_is_rejected(pdf_store_dir):
+    assert pdf_store.write_stream([b"<html>error page</html>"]) is None
+    assert pdf_store.list_blobs() == []
+    assert list((pdf_store_dir / "downloads" / "store").glob("*.tmp")) == []
+
+def test_orders_without_metadata_keep_their_own_rows(pdf_store_dir):
+    first = pdf_store.write_stream([b"%PDF first"], source_url="https://portal/a")
+    second = pdf_store.write_stream([b"%PDF second"], source_url="https://portal/b")
+    assert first["sha256"] != second["sha256"]
+    assert pdf_store.find_by_url("https://portal/a")["sha256"] == first["sha256"]
+    assert pdf_store.find_by_url("https://portal/b")["sha256"] == second["sha256"]
+
+    # Storing the same blob from the same URL again reuses its row
+    pdf_store.write_stream([b"%PDF first"], source_url="https://portal/a", display_name="first.pdf")
+    assert pdf_store.display_name_for(first["sha256"]) == "first.pdf"
+    orders = pdf_store._db().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    assert orders == 2
+
+def test_every_blob_is_listed(pdf_store_dir):
+    old = pdf_store.write_stream([b"%PDF old"], cnr="ABCD010000012025", order_number=1)
+    new = pdf_store.write_stream([b"%PDF new"], cnr="ABCD010000012025", order_number=1)
+    # The order now points at the new content, but the old blob is still in the store
+    assert pdf_store.find_order("ABCD010000012025", 1)["sha256"] == new["sha256"]
+    listed = {record["sha256"]: record for record in pdf_store.list_blobs()}
+    assert set(listed) == {old["sha256"], new["sha256"]}
+    assert listed[old["sha256"]]["cnr"] is None
@@ -0,0 +1,105 @@
+"""
+Adaptive token buckets: AIMD rate changes, the throttle ceiling and waiting
+for tokens, on a fake monotonic clock
+"""
+
+import pytest
+
+import rate_limiter
+from rate_limiter import AdaptiveBucket
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+def test_burst_then_wait_for_refill(clock):
+    bucket = AdaptiveBucket("test", rate=2.0, max_rate=2.0, burst=2)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    clock.now += 2
+    assert bucket.reserve() == 0.0
+
+def test_additive_increase_up_to_max_rate(clock):
+    bucket = AdaptiveBucket("test", rate=1.0, max_rate=1.05)
+
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(1.0 + rate_limiter.INCREASE_STEP)
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 1.05
+
+def test_trouble_halves_the_rate_once_per_burst_of_errors(clock):
+    bucket = AdaptiveBucket("test", rate=1.0, max_rate=3.0)
+
+    bucket.on_trouble()
+    # Other requests already in flight report the same trouble
+    bucket.on_trouble()
+    assert bucket.rate == 0.5 and bucket.backoffs == 1
+
+    clock.now += 10
+    bucket.on_trouble()
+    assert bucket.rate == 0.25
+
+def test_rate_never_drops_below_min_rate(clock):
+    bucket = AdaptiveBucket("test", rate=0.06, max_rate=3.0, min_rate=0.05)
+
+    bucket.on_trouble()
+    assert bucket.rate == 0.05
+
+def test_throttle_sets_a_ceiling_until_a_quiet_period(clock):
+    bucket = AdaptiveBucket("test", rate=2.0, max_rate=3.0)
+
+    bucket.on_trouble(throttled=True)
+    assert bucket.ceiling == 2.0
+    for _ in range(100):
+        clock.now += 1
+        bucket.on_success()
+    assert bucket.rate == pytest.approx(2.0 * rate_limiter.CEILING_MARGIN)
+
+    clock.now += rate_limiter.CEILING_RELAX + 1
+    bucket.on_success()
+    assert bucket.ceiling > 2.0
+
+def test_limited_charges_host_and_court_buckets(clock):
+    with rate_limiter.limited("page", court="3"):
+        pass
+
+    buckets = rate_limiter.stats()["buckets"]
+    assert set(buckets) == {rate_limiter.PORTAL_HOST, "court 3"}
+    assert all(bucket["requests"] == 1 for bucket in buckets.values())
+    assert rate_limiter.stats()["requests_by_kind"] == {"page": 1}
+
+def test_court_bucket_holds_back_a_busy_court(clock):
+    for _ in range(int(rate_limiter.BURST) + 1):
+        rate_limiter.acquire("search", court="3")
+
+    assert clock.slept == [pytest.approx(1 / rate_limiter.COURT_RATE)]
+
+def test_exceptions_count_as_trouble(clock):
+    with pytest.raises(TimeoutError):
+        with rate_limiter.limited("page"):
+            raise TimeoutError
+
+    bucket = rate_limiter.stats()["buckets"][rate_limiter.PORTAL_HOST]
+    assert bucket["backoffs"] == 1 and bucket["rate"] == rate_limiter.HOST_RATE * rate_limiter.BACKOFF_FACTOR
+
+def test_throttle_detection():
+    assert rate_limiter.looks_throttled("<h1>503 Service Unavailable</h1>")
+    assert not rate_limiter.looks_throttled("Case Status : Disposed")
+    assert rate_limiter.is_throttle_status(429) and not rate_limiter.is_throttle_status(404)
+    assert rate_limiter.host_of("https://example.test/a.pdf") == "example.test"
@@ -0,0 +1,100 @@
+"""
+Portal error handling: error classification, circuit breaker states and the
+shared retry budget, with backoff sleeps zeroed
+"""
+
+import pytest
+
+import resilience
+
+class TimeoutException(Exception):
+    """Stands in for selenium's exception of the same name (classify matches by name)"""
+
+class WebDriverException(Exception):
+    pass
+
+class NoSuchElementException(WebDriverException):
+    pass
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt, category=resilience.TRANSIENT: 0)
+
+@pytest.fixture
+def flaky():
+    """A portal step that fails a given number of times before succeeding"""
+    calls = []
+
+    def step(failures):
+        calls.append(1)
+        if len(calls) <= failures:
+            raise resilience.PortalError("portal hiccup")
+        return "ok"
+
+    step.calls = calls
+    return step
+
+@pytest.mark.parametrize("error, category", [
+    (resilience.PortalError("x"), resilience.TRANSIENT),
+    (resilience.PortalThrottled("x"), resilience.THROTTLED),
+    (resilience.PermanentPortalError("x"), resilience.PERMANENT),
+    (resilience.CircuitOpenError("search", 10), resilience.PERMANENT),
+    (TimeoutException("slow"), resilience.TRANSIENT),
+    (NoSuchElementException("no #captcha"), resilience.TRANSIENT),
+    (WebDriverException("unknown error: net::ERR_CONNECTION_RESET"), resilience.TRANSIENT),
+    (WebDriverException("invalid session id"), resilience.PERMANENT),
+    (NoSuchElementException("chrome not reachable"), resilience.PERMANENT),
+    (ValueError("bad date"), resilience.PERMANENT),
+])
+def test_classify(error, category):
+    assert resilience.classify(error) == category
+
+def test_circuit_breaker_cycle():
+    breaker = resilience.CircuitBreaker("check", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        breaker.before()
+        breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(resilience.CircuitOpenError):
+        breaker.before()
+
+    # Once the reset timeout has passed, exactly one probe goes through
+    breaker.opened_at -= 61
+    breaker.before()
+    assert breaker.state == "half_open"
+    with pytest.raises(resilience.CircuitOpenError):
+        breaker.before()
+    breaker.failure()
+    assert breaker.state == "open"
+
+    breaker.opened_at -= 61
+    breaker.before()
+    breaker.success()
+    assert breaker.stats() == {"state": "closed", "failures": 0, "rejected": 2}
+
+def test_retry_recovers_from_transient_errors(no_backoff, flaky):
+    assert resilience.retry(flaky, 2, label="flaky") == "ok"
+    assert len(flaky.calls) == 3
+
+def test_steps_of_one_request_share_the_budget(no_backoff, flaky):
+    with resilience.budget(retries=2):
+        with pytest.raises(resilience.PortalError):
+            resilience.retry(flaky, 5, label="flaky")
+    assert len(flaky.calls) == 3
+
+def test_permanent_errors_are_not_retried(no_backoff):
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise resilience.PermanentPortalError("bad input")
+
+    with pytest.raises(resilience.PermanentPortalError):
+        resilience.retry(broken)
+    assert len(calls) == 1
+
+def test_spent_budget_hands_out_no_more_waits():
+    with resilience.budget(seconds=0):
+        with pytest.raises(resilience.PermanentPortalError):
+            resilience.wait_timeout(10)
+    assert resilience.wait_timeout(10) == 10
@@ -0,0 +1,117 @@
+"""
+Result cache tiers, expiry and negative entries, plus /cached-lookup
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from case_model import Case
+
+LOCATION = {"state": "26", "district": "1", "court": "3"}
+RESULTS = {"cases": [{"case_number": "45/2025", "petitioner": "Asha Rani"}]}
+
+class Clock:
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(cache_db, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_db.time, "time", clock)
+    return clock
+
+def test_make_key_normalizes_the_case_number(cache_db):
+    assert (cache_db.make_key("search", LOCATION, "CS", "0045", "2025")
+            == cache_db.make_key("search", LOCATION, "CS", 45, " 2025"))
+    assert (cache_db.make_key("search", LOCATION, "CS", 45, 2025)
+            != cache_db.make_key("search", dict(LOCATION, court="4"), "CS", 45, 2025))
+
+def test_negative_entry_is_a_hit_until_it_expires(cache_db, clock):
+    key = cache_db.make_key("search", LOCATION, "CS", 45, 2025)
+    cache_db.put_search_results(key, None)
+
+    assert cache_db.get_search_results(key) == (True, None)
+    clock.now += cache_db.NEGATIVE_TTL + 1
+    assert cache_db.get_search_results(key) == (False, None)
+
+def test_search_results_outlive_negative_entries(cache_db, clock):
+    key = cache_db.make_key("search", LOCATION, "CS", 45, 2025)
+    cache_db.put_search_results(key, RESULTS)
+
+    clock.now += cache_db.NEGATIVE_TTL + 1
+    assert cache_db.get_search_results(key) == (True, RESULTS)
+    clock.now += cache_db.SEARCH_RESULTS_TTL
+    assert cache_db.get_search_results(key) == (False, None)
+
+def test_case_details_expire_as_a_whole(cache_db, clock):
+    key = cache_db.make_key("details", LOCATION, "CS", 45, 2025)
+    case = Case(cnr_number="DLHC010000012025", case_stage="Evidence")
+    cache_db.put_case_details(key, [case])
+
+    clock.now += cache_db.DETAILS_TTL - 1
+    assert cache_db.get_case_details(key) == [case]
+    clock.now += 2
+    assert cache_db.get_case_details(key) is None
+
+def test_disk_tier_survives_memory_eviction(cache_db, clock, monkeypatch):
+    monkeypatch.setattr(cache_db, "MEMORY_ENTRIES", 2)
+    keys = [cache_db.make_key("search", LOCATION, "CS", n, 2025) for n in range(1, 4)]
+    for key in keys:
+        cache_db.put_search_results(key, RESULTS)
+
+    # Least recently used entry left memory but is still answered from SQLite
+    assert keys[0] not in cache_db._memory
+    assert cache_db.get_search_results(keys[0]) == (True, RESULTS)
+    assert list(cache_db._memory) == keys[2:] + keys[:1]
+
+def test_disk_tier_keeps_case_rows(cache_db, clock):
+    key = cache_db.make_key("details", LOCATION, "CS", 45, 2025)
+    case = Case(cnr_number="DLHC010000012025", next_hearing_date="18-07-2025",
+                orders=[{"order_number": "1", "order_date": "01-03-2025"}])
+    cache_db.put_case_details(key, [case])
+    cache_db._memory.clear()
+
+    payload = cache_db._db().execute("SELECT payload FROM cache WHERE key = ?", (key,)).fetchone()["payload"]
+    assert json.loads(payload)["cases"] == [case.as_row()]
+    restored = cache_db.get_case_details(key)
+    assert isinstance(restored[0], Case)
+    assert restored[0].as_dict() == case.as_dict()
+
+def test_purge_expired(cache_db, clock):
+    cache_db.put_search_results("negative", None)
+    cache_db.put_search_results("positive", RESULTS)
+    clock.now += cache_db.NEGATIVE_TTL + 1
+
+    assert cache_db.purge_expired() == 1
+
+def test_cached_lookup_reports_cached_negatives(cache_db, clock):
+    cache_db.put_search_results(cache_db.make_key("search", LOCATION, "CS", 45, 2025), None)
+    form = dict(LOCATION, case_type="CS", case_number="45", case_year="2025")
+    client = TestClient(main.app)
+
+    reply = client.post("/cached-lookup", data=form).json()
+    assert reply["cached"] is True and reply["success"] is False
+
+    reply = client.post("/cached-lookup", data=dict(form, case_number="46")).json()
+    assert reply == {"success": False, "cached": False, "message": "Not in cache"}
+
+def test_cached_lookup_returns_results_and_details(cache_db, clock, monkeypatch):
+    monkeypatch.setattr(main, "last_case_results", [])
+    case_details = [Case(cnr_number="DLHC010000012025", case_stage="Evidence", next_hearing_date="18-07-2025")]
+    cache_db.put_search_results(cache_db.make_key("search", LOCATION, "CS", 45, 2025), RESULTS)
+    cache_db.put_case_details(cache_db.make_key("details", LOCATION, "CS", 45, 2025), case_details)
+
+    reply = TestClient(main.app).post(
+        "/cached-lookup", data=dict(LOCATION, case_type="CS", case_number="45", case_year="2025")).json()
+
+    assert reply["success"] and reply["cached"]
+    assert reply["results"] == RESULTS
+    assert reply["cases"] == [dict(case_details[0].as_dict(), case_index=1)]
+    assert reply["cases"][0]["next_hearing_date"] == "2025-07-18"
+    assert main.last_case_results == case_details
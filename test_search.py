@@ -0,0 +1,80 @@
+"""
+One-shot POST /search, with the portal cascade faked
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from case_model import Case
+
+SPEC = {"state": "26", "district": "1", "court": "3", "case_type": "CS", "case_number": "45", "case_year": "2025"}
+RESULTS = {"total_cases": 1, "cases": [{"case_number": "CS/45/2025"}]}
+CASES = [Case(cnr_number="DLHC010000012025", case_stage="Evidence", next_hearing_date="18th July 2025")]
+# What the API makes of CASES
+CASE_DICTS = [dict(CASES[0].as_dict(), case_index=1)]
+
+@pytest.fixture
+def client(cache_db, fake_pool):
+    return TestClient(main.app)
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Specs that reached the (fake) portal"""
+    seen = []
+
+    def run_case_lookup(browser, spec, max_captcha_attempts=3):
+        seen.append(spec)
+        return {"success": True, "results": RESULTS, "cases": CASES}
+
+    monkeypatch.setattr(main, "run_case_lookup", run_case_lookup)
+    return seen
+
+def cache_answer(cache_db, results, cases=None):
+    location = {field: SPEC[field] for field in ("state", "district", "court")}
+    args = (location, SPEC["case_type"], SPEC["case_number"], SPEC["case_year"])
+    cache_db.put_search_results(cache_db.make_key("search", *args), results)
+    if cases is not None:
+        cache_db.put_case_details(cache_db.make_key("details", *args), cases)
+
+def test_missing_fields_are_named(client, lookups):
+    reply = client.post("/search", data=dict(SPEC, court="", case_year=" ")).json()
+
+    assert reply == {"success": False, "error": "Missing fields: court, case_year"}
+    assert lookups == []
+
+def test_miss_runs_the_whole_lookup_in_a_pooled_browser(client, lookups):
+    reply = client.post("/search", data=SPEC).json()
+
+    assert reply["success"] and reply["cached"] is False
+    assert reply["results"] == RESULTS and reply["cases"] == CASE_DICTS
+    assert "seconds" in reply
+    assert lookups == [SPEC]
+
+def test_cached_answer_skips_the_portal(client, lookups, cache_db):
+    cache_answer(cache_db, RESULTS, CASES)
+
+    reply = client.post("/search", data=SPEC).json()
+
+    assert reply["success"] and reply["cached"] is True and reply["cases"] == CASE_DICTS
+    assert lookups == []
+
+def test_cached_no_cases(client, lookups, cache_db):
+    cache_answer(cache_db, None)
+
+    reply = client.post("/search", data=SPEC).json()
+
+    assert reply["cached"] is True and reply["no_cases"] is True
+    assert lookups == []
+
+def test_results_without_details_go_to_the_portal(client, lookups, cache_db):
+    cache_answer(cache_db, RESULTS)
+
+    assert client.post("/search", data=SPEC).json()["cached"] is False
+    assert len(lookups) == 1
+
+def test_use_cache_off_forces_a_lookup(client, lookups, cache_db):
+    cache_answer(cache_db, RESULTS, CASES)
+
+    assert client.post("/search", data=dict(SPEC, use_cache="0")).json()["cached"] is False
+    assert len(lookups) == 1
@@ -0,0 +1,78 @@
+"""
+Watchlist diffs between two polls of a case, and the changes feed they produce
+"""
+
+from case_model import Case
+from watchlist import diff_case
+
+SNAPSHOT = {
+    "cnr_number": "ABCD010000012025",
+    "next_hearing_date": "18-07-2025",
+    "case_stage": "Evidence",
+    "court_and_judge": "1-Civil Judge",
+    "orders": [{"order_number": "1", "order_date": "01-03-2025", "order_details": "Order"}],
+    "case_history": [{"judge": "Civil Judge", "business_date": "01-03-2025", "hearing_date": "18-07-2025",
+                      "purpose": "Evidence"}],
+}
+
+ORDER = {"order_number": "2", "order_date": "18-07-2025", "order_details": "Interim order"}
+
+def test_identical_polls_have_no_changes():
+    assert diff_case(SNAPSHOT, dict(SNAPSHOT)) == []
+
+def test_untracked_fields_and_list_order_are_ignored():
+    reordered = dict(SNAPSHOT, court_and_judge="2-Civil Judge", orders=list(reversed(SNAPSHOT["orders"])))
+    assert diff_case(SNAPSHOT, reordered) == []
+
+def test_field_changes():
+    new = dict(SNAPSHOT, next_hearing_date="25-08-2025", case_stage="Arguments")
+    assert diff_case(SNAPSHOT, new) == [
+        ("field_changed", "next_hearing_date", "18-07-2025", "25-08-2025"),
+        ("field_changed", "case_stage", "Evidence", "Arguments"),
+    ]
+
+def test_new_orders_and_history():
+    # Same number on a different date is a different order
+    reissued = {"order_number": "1", "order_date": "02-03-2025", "order_details": "Order"}
+    entry = {"judge": "Civil Judge", "business_date": "18-07-2025", "hearing_date": "25-08-2025",
+             "purpose": "Arguments"}
+    new = dict(SNAPSHOT, orders=SNAPSHOT["orders"] + [ORDER, reissued],
+               case_history=SNAPSHOT["case_history"] + [entry])
+
+    assert diff_case(SNAPSHOT, new) == [
+        ("new_order", "orders", None, ORDER),
+        ("new_order", "orders", None, reissued),
+        ("new_history", "case_history", None, entry),
+    ]
+
+def test_empty_snapshot_reports_everything():
+    changes = diff_case({}, SNAPSHOT)
+    assert [kind for kind, *_ in changes] == ["field_changed", "field_changed", "new_order", "new_history"]
+
+def test_first_poll_is_the_baseline_and_later_polls_feed_changes(watchlist_db):
+    entry = watchlist_db.add("26", "1", "3", "CS", "45", "2025", label="Rani v. UoI")
+    results = [
+        {"success": True, "cases": [Case(**SNAPSHOT)]},
+        {"success": True, "cases": [Case(**dict(SNAPSHOT, orders=SNAPSHOT["orders"] + [ORDER]))]},
+    ]
+    lookup = lambda spec: results.pop(0)
+
+    assert watchlist_db.poll(entry["id"], lookup) == {"success": True, "changes": []}
+    second = watchlist_db.poll(entry["id"], lookup)
+
+    assert [change["kind"] for change in second["changes"]] == ["new_order"]
+    feed = watchlist_db.list_changes()
+    assert feed[0]["label"] == "Rani v. UoI"
+    # The order isn't in the PDF store yet, so clients know to fetch it; dates are ISO
+    assert feed[0]["new_value"] == dict(ORDER, order_date="2025-07-18", pdf_link=None,
+                                        stored=False, download_url=None)
+    assert watchlist_db.list_changes(since=feed[0]["id"]) == []
+
+def test_failed_poll_records_the_error(watchlist_db):
+    entry = watchlist_db.add("26", "1", "3", "CS", "45", "2025")
+
+    def lookup(spec):
+        raise TimeoutError("portal down")
+
+    assert watchlist_db.poll(entry["id"], lookup)["success"] is False
+    assert watchlist_db.get(entry["id"])["last_error"] == "TimeoutError: portal down"
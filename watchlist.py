@@ -0,0 +1,285 @@
+"""
+Watchlist of cases that are re-polled in the background
+Each poll is compared with the last snapshot of the case and only the deltas
+(new history rows, new orders, changed next hearing date or stage) are stored
+in a changes feed. Polls are spread evenly over the interval so the portal
+sees a steady trickle of lookups rather than bursts.
+"""
+
+import json
+import os
+import threading
+import time
+
+import case_model
+import db
+import pdf_store
+
+DB_PATH = db.DATA_DIR / "watchlist.db"
+
+# Every watched case is polled once per interval (seconds)
+POLL_INTERVAL = int(os.environ.get("WATCHLIST_POLL_INTERVAL", str(24 * 3600)))
+# Never poll faster than this, however many cases are watched (seconds)
+MIN_SPACING = float(os.environ.get("WATCHLIST_MIN_SPACING", "10"))
+
+SPEC_FIELDS = ("state", "district", "court", "case_type", "case_number", "case_year")
+TRACKED_FIELDS = ("next_hearing_date", "case_stage")
+
+_lock = threading.Lock()
+_conn = None
+_wake = threading.Event()
+_poller_thread = None
+
+def _db():
+    """Lazily open the database and create its tables"""
+    global _conn
+    if _conn is None:
+        _conn = db.connect(DB_PATH)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watched (
+                id INTEGER PRIMARY KEY,
+                state TEXT NOT NULL,
+                district TEXT NOT NULL,
+                court TEXT NOT NULL,
+                case_type TEXT NOT NULL,
+                case_number TEXT NOT NULL,
+                case_year TEXT NOT NULL,
+                label TEXT,
+                cnr TEXT,
+                created REAL NOT NULL,
+                last_polled REAL,
+                last_error TEXT,
+                UNIQUE (state, district, court, case_type, case_number, case_year)
+            );
+            CREATE INDEX IF NOT EXISTS idx_watched_polled ON watched(last_polled);
+
+            CREATE TABLE IF NOT EXISTS snapshots (
+                watch_id INTEGER NOT NULL REFERENCES watched(id) ON DELETE CASCADE,
+                cnr TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                taken REAL NOT NULL,
+                PRIMARY KEY (watch_id, cnr)
+            );
+
+            CREATE TABLE IF NOT EXISTS changes (
+                id INTEGER PRIMARY KEY,
+                watch_id INTEGER NOT NULL REFERENCES watched(id) ON DELETE CASCADE,
+                cnr TEXT,
+                kind TEXT NOT NULL,
+                field TEXT,
+                old_value TEXT,
+                new_value TEXT,
+                detected REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_changes_watch ON changes(watch_id, id);
+        """)
+    return _conn
+
+def add(state, district, court, case_type, case_number, case_year, label=None):
+    """Watch a case (idempotent). Returns the watch entry."""
+    spec = dict(zip(SPEC_FIELDS, (state, district, court, case_type, case_number, case_year)))
+    spec = {field: str(value).strip() for field, value in spec.items()}
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "INSERT INTO watched (state, district, court, case_type, case_number, case_year, label, created) "
+                "VALUES (:state, :district, :court, :case_type, :case_number, :case_year, :label, :now) "
+                "ON CONFLICT (state, district, court, case_type, case_number, case_year) "
+                "DO UPDATE SET label = COALESCE(excluded.label, label)",
+                dict(spec, label=label, now=time.time())
+            )
+        row = conn.execute(
+            "SELECT * FROM watched WHERE state = :state AND district = :district AND court = :court "
+            "AND case_type = :case_type AND case_number = :case_number AND case_year = :case_year",
+            spec
+        ).fetchone()
+
+    # A new entry should get its baseline snapshot soon rather than at the end of the cycle
+    _wake.set()
+    return dict(row)
+
+def remove(watch_id):
+    with _lock:
+        conn = _db()
+        with conn:
+            return conn.execute("DELETE FROM watched WHERE id = ?", (watch_id,)).rowcount > 0
+
+def get(watch_id):
+    with _lock:
+        row = _db().execute("SELECT * FROM watched WHERE id = ?", (watch_id,)).fetchone()
+    return dict(row) if row else None
+
+def list_watched():
+    with _lock:
+        rows = _db().execute(
+            "SELECT w.*, (SELECT COUNT(*) FROM changes c WHERE c.watch_id = w.id) AS change_count "
+            "FROM watched w ORDER BY w.id"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def spec_of(entry):
+    """The run_case_lookup() spec for a watch entry"""
+    return {field: entry[field] for field in SPEC_FIELDS}
+
+def _order_key(order):
+    return (order.get("order_number"), order.get("order_date"))
+
+def _history_key(row):
+    return (row.get("business_date"), row.get("hearing_date"), row.get("purpose"), row.get("judge"))
+
+def diff_case(old, new):
+    """
+    Compare two Case.as_dict() forms of a case.
+    Returns a list of (kind, field, old_value, new_value) tuples.
+    """
+    changes = []
+    for field in TRACKED_FIELDS:
+        if old.get(field) != new.get(field):
+            changes.append(("field_changed", field, old.get(field), new.get(field)))
+
+    known_orders = {_order_key(order) for order in old.get("orders") or []}
+    for order in new.get("orders") or []:
+        if _order_key(order) not in known_orders:
+            changes.append(("new_order", "orders", None, order))
+
+    known_history = {_history_key(row) for row in old.get("case_history") or []}
+    for row in new.get("case_history") or []:
+        if _history_key(row) not in known_history:
+            changes.append(("new_history", "case_history", None, row))
+
+    return changes
+
+def _with_store_status(cnr, order):
+    """Flag whether an order PDF is already in the store, so clients only fetch what is new"""
+    record = pdf_store.find_order(cnr, order.get("order_number"), order.get("order_date"))
+    return dict(order, stored=record is not None,
+                download_url=record["download_url"] if record else None)
+
+def record_poll(watch_id, cases, error=None):
+    """
+    Store the result of one poll: diff every case against its snapshot, append
+    the deltas to the changes feed and replace the snapshots.
+    cases are case_model.Case objects; snapshots keep their as_row() form.
+    Returns the list of changes recorded.
+    """
+    now = time.time()
+    recorded = []
+    with _lock:
+        conn = _db()
+        with conn:
+            if error:
+                conn.execute("UPDATE watched SET last_polled = ?, last_error = ? WHERE id = ?",
+                             (now, error, watch_id))
+                return recorded
+
+            cnr = None
+            for case in cases:
+                if not case.cnr_number:
+                    continue
+                cnr = case.cnr_number
+
+                row = conn.execute("SELECT payload FROM snapshots WHERE watch_id = ? AND cnr = ?",
+                                   (watch_id, cnr)).fetchone()
+                # The first poll only establishes the baseline
+                old = case_model.Case.from_row(json.loads(row["payload"])).as_dict() if row else None
+                changes = diff_case(old, case.as_dict()) if old else []
+                for kind, field, old_value, new_value in changes:
+                    if kind == "new_order":
+                        new_value = _with_store_status(cnr, new_value)
+                    conn.execute(
+                        "INSERT INTO changes (watch_id, cnr, kind, field, old_value, new_value, detected) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (watch_id, cnr, kind, field, json.dumps(old_value, ensure_ascii=False),
+                         json.dumps(new_value, ensure_ascii=False), now)
+                    )
+                    recorded.append({"cnr": cnr, "kind": kind, "field": field,
+                                     "old_value": old_value, "new_value": new_value})
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (watch_id, cnr, payload, taken) VALUES (?, ?, ?, ?)",
+                    (watch_id, cnr, json.dumps(case.as_row(), ensure_ascii=False), now)
+                )
+
+            conn.execute("UPDATE watched SET last_polled = ?, last_error = NULL, cnr = COALESCE(?, cnr) "
+                         "WHERE id = ?", (now, cnr, watch_id))
+
+    if recorded:
+        print(f"🔔 Watch #{watch_id}: {len(recorded)} change(s) detected")
+    return recorded
+
+def list_changes(since=0, limit=100, watch_id=None):
+    """Changes feed in detection order. since is the last change id the client has seen."""
+    sql = ("SELECT c.*, w.label FROM changes c JOIN watched w ON w.id = c.watch_id "
+           "WHERE c.id > ?")
+    params = [since]
+    if watch_id is not None:
+        sql += " AND c.watch_id = ?"
+        params.append(watch_id)
+    sql += " ORDER BY c.id LIMIT ?"
+    params.append(limit)
+
+    with _lock:
+        rows = _db().execute(sql, params).fetchall()
+
+    changes = []
+    for row in rows:
+        change = dict(row)
+        change["old_value"] = json.loads(change["old_value"]) if change["old_value"] else None
+        change["new_value"] = json.loads(change["new_value"]) if change["new_value"] else None
+        changes.append(change)
+    return changes
+
+def poll(watch_id, lookup_fn):
+    """Poll one watched case now. lookup_fn(spec) returns a run_case_lookup() result."""
+    entry = get(watch_id)
+    if entry is None:
+        return None
+
+    try:
+        result = lookup_fn(spec_of(entry))
+    except Exception as e:
+        result = {"success": False, "error": f"{type(e).__name__}: {str(e)}"}
+
+    if not result.get("success"):
+        record_poll(watch_id, [], error=result.get("error") or "Lookup failed")
+        return {"success": False, "error": result.get("error")}
+
+    changes = record_poll(watch_id, result.get("cases") or [])
+    return {"success": True, "changes": changes}
+
+def _next_due():
+    """The watch entry polled longest ago and how many entries there are"""
+    with _lock:
+        conn = _db()
+        count = conn.execute("SELECT COUNT(*) FROM watched").fetchone()[0]
+        row = conn.execute(
+            "SELECT id, last_polled FROM watched ORDER BY last_polled IS NOT NULL, last_polled, id LIMIT 1"
+        ).fetchone()
+    return (dict(row) if row else None), count
+
+def _poller_loop(lookup_fn):
+    while True:
+        spacing = POLL_INTERVAL
+        try:
+            entry, count = _next_due()
+            if entry:
+                spacing = max(MIN_SPACING, POLL_INTERVAL / count)
+                due_at = (entry["last_polled"] or 0) + POLL_INTERVAL
+                if due_at <= time.time():
+                    poll(entry["id"], lookup_fn)
+                else:
+                    spacing = min(spacing, due_at - time.time())
+        except Exception as e:
+            print(f"❌ Watchlist poller error: {str(e)}")
+        _wake.wait(spacing)
+        _wake.clear()
+
+def start_poller(lookup_fn):
+    """Start the background poller thread (idempotent)"""
+    global _poller_thread
+    if _poller_thread is None or not _poller_thread.is_alive():
+        _poller_thread = threading.Thread(target=_poller_loop, args=(lookup_fn,),
+                                          name="watchlist-poller", daemon=True)
+        _poller_thread.start()
+        print(f"👀 Watchlist poller started (every case once per {POLL_INTERVAL}s)")